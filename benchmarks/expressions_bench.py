@@ -0,0 +1,31 @@
+import timeit
+
+from feature_gate import expressions
+
+EXPRESSION = {
+  "Any": [
+    {"Equal": [{"Property": ["plan"]}, "enterprise"]},
+    {"All": [
+      {"Equal": [{"Property": ["plan"]}, "pro"]},
+      {"GreaterThanOrEqualTo": [{"Property": ["seats"]}, 10]},
+      {"NotEqual": [{"Property": ["country"]}, "XX"]},
+    ]},
+  ]
+}
+PROPERTIES = {"plan": "pro", "seats": 25, "country": "US"}
+NUMBER = 200_000
+
+def ns_per_call(fn):
+  return min(timeit.repeat(fn, number=NUMBER, repeat=5)) / NUMBER * 1e9
+
+def main():
+  compiled = expressions.compile(EXPRESSION)
+  interpreted = ns_per_call(lambda: expressions.evaluate(EXPRESSION, PROPERTIES))
+  closure = ns_per_call(lambda: compiled(PROPERTIES))
+  print(f"{'path':>12} {'ns/op':>10}")
+  print(f"{'interpreter':>12} {interpreted:>10.1f}")
+  print(f"{'compiled':>12} {closure:>10.1f}")
+  print(f"speedup {interpreted / closure:.1f}x")
+
+if __name__ == "__main__":
+  main()
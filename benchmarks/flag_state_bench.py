@@ -0,0 +1,75 @@
+import gc
+import timeit
+import tracemalloc
+
+from feature_gate.adapters.memory import MemoryAdapter
+from feature_gate.feature import Feature
+from feature_gate.flag_state import FlagState
+
+FLAGS = 100_000
+LOOKUPS = 1_000_000
+
+# The representations this replaced, kept here for comparison.
+class DictFeature:
+  def __init__(self, name, key, description):
+    self._name = name
+    self._key = key
+    self._description = description
+
+  @property
+  def key(self):
+    return self._key
+
+def nested_dict(key):
+  return {
+    "name": key,
+    "key": key,
+    "description": key,
+    "gates": {
+      "boolean": {"enabled": False},
+      "actors": {"ids": set()},
+      "groups": {"names": frozenset(), "compiled": None},
+      "expression": {"value": None, "compiled": None},
+      "percentage_of_actors": {"percentage": 0},
+    },
+  }
+
+def footprint(build):
+  # Keys are built up front so only the objects themselves are measured.
+  keys = [f"flag_{i}" for i in range(FLAGS)]
+  gc.collect()
+  tracemalloc.start()
+  objects = [build(key) for key in keys]
+  size, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  del objects
+  return size / FLAGS
+
+def per_lookup(call):
+  return min(timeit.repeat(call, number=LOOKUPS, repeat=5)) / LOOKUPS * 1e9
+
+def main():
+  print(f"bytes per flag at {FLAGS} flags")
+  print(f"{'Feature with __dict__':>28} {footprint(lambda key: DictFeature(key, key, key)):>8.1f}")
+  print(f"{'Feature with __slots__':>28} {footprint(lambda key: Feature(key, key, key)):>8.1f}")
+  print(f"{'nested gates dict':>28} {footprint(nested_dict):>8.1f}")
+  print(f"{'FlagState':>28} {footprint(FlagState):>8.1f}")
+
+  entry = nested_dict("flag_0")
+  state = FlagState("flag_0")
+  old_feature = DictFeature("flag_0", "flag_0", "flag_0")
+  feature = Feature("flag_0", "flag_0", "flag_0")
+  adapter = MemoryAdapter()
+  with adapter.batch():
+    for i in range(FLAGS):
+      adapter.add(Feature(f"flag_{i}", f"flag_{i}", ""))
+  print()
+  print("ns per access")
+  print(f"{'Feature.key, __dict__':>28} {per_lookup(lambda: old_feature.key):>8.1f}")
+  print(f"{'Feature.key, __slots__':>28} {per_lookup(lambda: feature.key):>8.1f}")
+  print(f"{'gates boolean, nested dict':>28} {per_lookup(lambda: entry['gates']['boolean']['enabled']):>8.1f}")
+  print(f"{'FlagState.enabled':>28} {per_lookup(lambda: state.enabled):>8.1f}")
+  print(f"{'MemoryAdapter.is_enabled':>28} {per_lookup(lambda: adapter.is_enabled('flag_99999', 'alice')):>8.1f}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,30 @@
+import timeit
+
+from feature_gate import log
+from feature_gate.adapters.memory import MemoryAdapter
+from feature_gate.client import Client
+from feature_gate.feature import Feature
+from feature_gate.instrumentation import Metrics
+
+LOOKUPS = 100_000
+
+def build_client(instrumenter):
+  adapter = MemoryAdapter()
+  adapter.add(Feature("flag", "flag", "flag"))
+  adapter.enable("flag")
+  return Client(adapter, instrumenter=instrumenter)
+
+def bench_is_enabled(instrumenter):
+  client = build_client(instrumenter)
+  seconds = min(timeit.repeat(lambda: client.is_enabled("flag"), number=LOOKUPS, repeat=5))
+  return seconds / LOOKUPS * 1e9
+
+def main():
+  log.configure("null")
+  print(f"{'instrumenter':>14} {'is_enabled ns/op':>18}")
+  # "none" is the disabled path; "noop" is the cost of the hook calls alone.
+  for name, instrumenter in [("none", None), ("noop", lambda event, payload: None), ("metrics", Metrics())]:
+    print(f"{name:>14} {bench_is_enabled(instrumenter):>18.1f}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,66 @@
+import io
+import json
+import time
+import tracemalloc
+
+from feature_gate.clients import json_stream
+
+FLAG_COUNTS = [100, 1_000, 10_000]
+CHUNK_SIZE = 16384
+
+def build_body(flag_count):
+  results = []
+  for i in range(flag_count):
+    results.append({
+      "id": i,
+      "key": f"flag_{i}",
+      "name": f"Flag {i}",
+      "active": i % 2 == 0,
+      "deleted": False,
+      "filters": {"groups": [{"properties": [{"key": "email", "type": "person", "operator": "icontains", "value": "@example.com"}], "rollout_percentage": 50}]},
+      "created_by": {"id": 1, "uuid": "018c6fd5-f1e1-0000-1728-e179216d89d8", "first_name": "Patrick", "email": "patrick@deft.services"},
+      "created_at": "2024-02-20T23:07:56.702511Z",
+      "experiment_set": [],
+      "surveys": [],
+      "features": [],
+      "analytics_dashboards": [],
+      "tags": [],
+    })
+  return json.dumps({"count": flag_count, "next": None, "previous": None, "results": results}).encode()
+
+def chunks(raw):
+  stream = io.BytesIO(raw)
+  while True:
+    chunk = stream.read(CHUNK_SIZE)
+    if not chunk:
+      return
+    yield chunk
+
+# The whole-body path reads the response into memory first, as requests does.
+def whole_body(raw):
+  return json.loads(b"".join(chunks(raw)))["results"]
+
+def streamed(raw):
+  return json_stream.load_list(chunks(raw))["results"]
+
+def measure(parse, raw):
+  tracemalloc.start()
+  started = time.perf_counter()
+  result = parse(raw)
+  seconds = time.perf_counter() - started
+  _, peak = tracemalloc.get_traced_memory()
+  retained = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  del result
+  return seconds, peak, retained
+
+def main():
+  print(f"{'flags':>7} {'parser':>8} {'ms':>9} {'peak KiB':>10} {'kept KiB':>10}")
+  for flag_count in FLAG_COUNTS:
+    raw = build_body(flag_count)
+    for name, parse in [("json", whole_body), ("stream", streamed)]:
+      seconds, peak, retained = measure(parse, raw)
+      print(f"{flag_count:>7} {name:>8} {seconds * 1000:>9.1f} {peak / 1024:>10.0f} {retained / 1024:>10.0f}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,30 @@
+import timeit
+
+from feature_gate.adapters.memory import MemoryAdapter
+from feature_gate.feature import Feature
+
+FLAG_COUNTS = [10, 100, 1_000, 10_000, 100_000]
+LOOKUPS = 100_000
+
+def build_adapter(flag_count):
+  adapter = MemoryAdapter()
+  with adapter.batch():
+    for i in range(flag_count):
+      key = f"flag_{i}"
+      adapter.add(Feature(key, key, key))
+  return adapter
+
+def bench_is_enabled(flag_count):
+  adapter = build_adapter(flag_count)
+  # The last flag added was the worst case for the old linear scan.
+  key = f"flag_{flag_count - 1}"
+  seconds = min(timeit.repeat(lambda: adapter.is_enabled(key), number=LOOKUPS, repeat=5))
+  return seconds / LOOKUPS * 1e9
+
+def main():
+  print(f"{'flags':>10} {'is_enabled ns/op':>18}")
+  for flag_count in FLAG_COUNTS:
+    print(f"{flag_count:>10} {bench_is_enabled(flag_count):>18.1f}")
+
+if __name__ == "__main__":
+  main()
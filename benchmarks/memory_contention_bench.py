@@ -0,0 +1,88 @@
+import threading
+import time
+
+from feature_gate.adapters.memory import MemoryAdapter
+from feature_gate.feature import Feature
+
+FLAGS = 1_000
+READERS = [1, 4, 16]
+SECONDS = 1.0
+
+# A global lock around every call, what copy-on-write snapshots avoid.
+class LockedAdapter:
+  def __init__(self, adapter):
+    self.adapter = adapter
+    self.lock = threading.Lock()
+
+  def is_enabled(self, feature_key):
+    with self.lock:
+      return self.adapter.is_enabled(feature_key)
+
+  def enable(self, feature_key):
+    with self.lock:
+      return self.adapter.enable(feature_key)
+
+  def disable(self, feature_key):
+    with self.lock:
+      return self.adapter.disable(feature_key)
+
+def build_adapter(read_only=False):
+  adapter = MemoryAdapter()
+  with adapter.batch():
+    for i in range(FLAGS):
+      key = f"flag_{i}"
+      adapter.add(Feature(key, key, key))
+  adapter.read_only = read_only
+  return adapter
+
+def run(adapter, readers, writers):
+  stop = threading.Event()
+  reads = [0] * readers
+  writes = [0] * writers
+  keys = [f"flag_{i}" for i in range(FLAGS)]
+
+  def read(index):
+    count = 0
+    is_enabled = adapter.is_enabled
+    while not stop.is_set():
+      for key in keys:
+        is_enabled(key)
+      count += len(keys)
+    reads[index] = count
+
+  def write(index):
+    count = 0
+    while not stop.is_set():
+      key = keys[count % FLAGS]
+      adapter.enable(key)
+      adapter.disable(key)
+      count += 2
+    writes[index] = count
+
+  threads = [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+  threads += [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+  for thread in threads:
+    thread.start()
+  time.sleep(SECONDS)
+  stop.set()
+  for thread in threads:
+    thread.join()
+  return sum(reads) / SECONDS, sum(writes) / SECONDS
+
+def main():
+  print(f"{FLAGS} flags, {SECONDS}s per case")
+  print(f"{'adapter':>15} {'readers':>8} {'writers':>8} {'reads/sec':>12} {'writes/sec':>12}")
+  for readers in READERS:
+    cases = [
+      ("read_only", build_adapter(read_only=True), 0),
+      ("copy_on_write", build_adapter(), 0),
+      ("copy_on_write", build_adapter(), 1),
+      ("global_lock", LockedAdapter(build_adapter()), 0),
+      ("global_lock", LockedAdapter(build_adapter()), 1),
+    ]
+    for name, adapter, writers in cases:
+      reads, writes = run(adapter, readers, writers)
+      print(f"{name:>15} {readers:>8} {writers:>8} {reads:>12.0f} {writes:>12.0f}", flush=True)
+
+if __name__ == "__main__":
+  main()
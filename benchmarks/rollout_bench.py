@@ -0,0 +1,34 @@
+import time
+
+from feature_gate import rollout
+from feature_gate.adapters import posthog_evaluation
+
+ACTORS = [f"user_{i}" for i in range(1_000_000)]
+PERCENTAGE = 25
+
+def evaluations_per_second(fn):
+  started = time.perf_counter()
+  fn()
+  return len(ACTORS) / (time.perf_counter() - started)
+
+def scalar():
+  is_actor_enabled = rollout.is_actor_enabled
+  for actor_id in ACTORS:
+    is_actor_enabled("search", PERCENTAGE, actor_id)
+
+def vectorized():
+  rollout.enabled_actors("search", PERCENTAGE, ACTORS)
+
+def posthog():
+  flag = {"key": "search", "active": True, "filters": {"groups": [{"properties": [], "rollout_percentage": PERCENTAGE}]}}
+  is_enabled_for = posthog_evaluation.is_enabled_for
+  for actor_id in ACTORS:
+    is_enabled_for(flag, actor_id)
+
+def main():
+  print(f"{'path':>12} {'evaluations/s':>15}")
+  for name, fn in [("scalar", scalar), ("vectorized", vectorized), ("posthog", posthog)]:
+    print(f"{name:>12} {evaluations_per_second(fn):>15,.0f}")
+
+if __name__ == "__main__":
+  main()
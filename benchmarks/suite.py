@@ -0,0 +1,203 @@
+import argparse
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+from feature_gate import log
+from feature_gate.adapters.memory import MemoryAdapter
+from feature_gate.adapters.posthog import PosthogAdapter
+from feature_gate.client import Client
+from feature_gate.feature import Feature
+from feature_gate.testing.fake_posthog import FakePosthogServer
+
+ADAPTERS = ["memory", "posthog", "posthog_cached"]
+OPERATIONS = ["is_enabled", "features", "enable", "add"]
+FLAG_COUNTS = [10, 100, 1_000, 10_000, 100_000]
+CONCURRENCY = [1, 4, 16]
+# Fields that identify a case when comparing against a baseline.
+CASE = ("adapter", "operation", "flags", "concurrency")
+
+@contextmanager
+def build_client(adapter, flag_count, pool_size, max_retries, server_options):
+  if adapter == "memory":
+    memory = MemoryAdapter()
+    with memory.batch():
+      for i in range(flag_count):
+        key = f"flag_{i}"
+        memory.add(Feature(key, key, key))
+        if i % 2 == 0:
+          memory.enable(key)
+    yield Client(memory)
+    return
+  with FakePosthogServer(**server_options) as server:
+    server.seed(flag_count)
+    posthog = PosthogAdapter(
+      api_key="benchmark",
+      project_id="1",
+      api_base=server.url,
+      cache=adapter == "posthog_cached",
+      background_refresh=False,
+      pool_size=pool_size,
+      max_retries=max_retries,
+    )
+    if posthog.cache is not None:
+      posthog.refresh()
+    try:
+      yield Client(posthog)
+    finally:
+      posthog.close()
+
+def operation(client, name, flag_count, added):
+  if name == "is_enabled":
+    return lambda rng: client.is_enabled(f"flag_{rng.randrange(flag_count)}")
+  if name == "features":
+    return lambda rng: client.features()
+  if name == "enable":
+    return lambda rng: client.enable(f"flag_{rng.randrange(flag_count)}")
+  if name == "add":
+    def add(rng):
+      key = f"added_{next(added)}"
+      client.add(Feature(key, key, key))
+    return add
+  raise ValueError(f"Unknown operation {name}")
+
+def run_case(client, name, flag_count, concurrency, ops, max_seconds, seed, added):
+  call = operation(client, name, flag_count, added)
+  per_thread = max(ops // concurrency, 1)
+  latencies = [[] for _ in range(concurrency)]
+  errors = [0] * concurrency
+  barrier = threading.Barrier(concurrency + 1)
+
+  def worker(index):
+    rng = random.Random(seed + index)
+    timings = latencies[index]
+    barrier.wait()
+    deadline = time.perf_counter() + max_seconds
+    for _ in range(per_thread):
+      started = time.perf_counter()
+      try:
+        call(rng)
+      except Exception:
+        # Injected server errors and exhausted retries surface here.
+        errors[index] += 1
+      finished = time.perf_counter()
+      timings.append(finished - started)
+      if finished > deadline:
+        break
+
+  threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+  for thread in threads:
+    thread.start()
+  barrier.wait()
+  started = time.perf_counter()
+  for thread in threads:
+    thread.join()
+  seconds = time.perf_counter() - started
+  timings = sorted(itertools.chain.from_iterable(latencies))
+  return {
+    "ops": len(timings),
+    "errors": sum(errors),
+    "seconds": seconds,
+    "ops_per_sec": len(timings) / seconds,
+    "p50_us": percentile(timings, 50) * 1e6,
+    "p95_us": percentile(timings, 95) * 1e6,
+    "p99_us": percentile(timings, 99) * 1e6,
+  }
+
+def percentile(sorted_values, pct):
+  if not sorted_values:
+    return 0.0
+  index = min(int(len(sorted_values) * pct / 100), len(sorted_values) - 1)
+  return sorted_values[index]
+
+def run(adapters, operations, flag_counts, concurrency, ops, max_seconds, seed, max_retries=3, server_options=None):
+  for adapter in adapters:
+    for flag_count in flag_counts:
+      # One fleet of flags per adapter and size; "add" runs last since it grows it.
+      with build_client(adapter, flag_count, max(concurrency), max_retries, server_options or {}) as client:
+        # Shared across cases so every "add" creates a new flag.
+        added = itertools.count()
+        for name in operations:
+          for threads in concurrency:
+            result = {"adapter": adapter, "operation": name, "flags": flag_count, "concurrency": threads}
+            result.update(run_case(client, name, flag_count, threads, ops, max_seconds, seed, added))
+            yield result
+
+def compare(results, baseline, tolerance):
+  previous = {tuple(entry[field] for field in CASE): entry for entry in baseline}
+  regressions = []
+  for result in results:
+    before = previous.get(tuple(result[field] for field in CASE))
+    if before is not None and result["ops_per_sec"] < before["ops_per_sec"] * (1 - tolerance):
+      regressions.append((result, before))
+  return regressions
+
+def read_jsonl(path):
+  with open(path) as fp:
+    return [json.loads(line) for line in fp if line.strip()]
+
+def parse_list(value, cast=str):
+  return [cast(item) for item in value.split(",") if item]
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Benchmark Client against MemoryAdapter and PosthogAdapter")
+  parser.add_argument("--adapters", type=parse_list, default=ADAPTERS)
+  parser.add_argument("--operations", type=parse_list, default=OPERATIONS)
+  parser.add_argument("--flags", type=lambda value: parse_list(value, int), default=FLAG_COUNTS)
+  parser.add_argument("--concurrency", type=lambda value: parse_list(value, int), default=CONCURRENCY)
+  parser.add_argument("--ops", type=int, default=10_000, help="operations per case, split across threads")
+  parser.add_argument("--max-seconds", type=float, default=1.0, help="stop a case early after this long")
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--latency", type=float, default=0, help="seconds the fake Posthog server adds to each request")
+  parser.add_argument("--jitter", type=float, default=0, help="up to this many extra seconds per request")
+  parser.add_argument("--rate-limit", type=float, help="requests per second before the server answers 429")
+  parser.add_argument("--page-size", type=int, default=100)
+  parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered with a 500")
+  parser.add_argument("--max-retries", type=int, default=3, help="PosthogAPIClient retries")
+  parser.add_argument("--output", help="write results as JSON lines to this file")
+  parser.add_argument("--baseline", help="JSON lines from an earlier run to compare against")
+  parser.add_argument("--tolerance", type=float, default=0.2, help="allowed ops/sec drop before a case is a regression")
+  args = parser.parse_args(argv)
+
+  for name in args.operations:
+    if name not in OPERATIONS:
+      parser.error(f"unknown operation {name}")
+  for adapter in args.adapters:
+    if adapter not in ADAPTERS:
+      parser.error(f"unknown adapter {adapter}")
+
+  log.configure("null")
+  results = []
+  print(f"{'adapter':>15} {'operation':>10} {'flags':>7} {'threads':>7} {'ops/sec':>12} {'p50 us':>10} {'p99 us':>10} {'errors':>7}")
+  server_options = {
+    "latency": args.latency,
+    "jitter": args.jitter,
+    "rate_limit": args.rate_limit,
+    "page_size": args.page_size,
+    "error_rate": args.error_rate,
+    "seed": args.seed,
+  }
+  for result in run(args.adapters, args.operations, args.flags, args.concurrency, args.ops, args.max_seconds, args.seed, args.max_retries, server_options):
+    results.append(result)
+    print(f"{result['adapter']:>15} {result['operation']:>10} {result['flags']:>7} {result['concurrency']:>7} {result['ops_per_sec']:>12.1f} {result['p50_us']:>10.1f} {result['p99_us']:>10.1f} {result['errors']:>7}", flush=True)
+
+  if args.output:
+    with open(args.output, "w") as fp:
+      for result in results:
+        fp.write(json.dumps(result) + "\n")
+
+  if args.baseline:
+    regressions = compare(results, read_jsonl(args.baseline), args.tolerance)
+    for result, before in regressions:
+      case = " ".join(f"{field}={result[field]}" for field in CASE)
+      print(f"regression: {case} {before['ops_per_sec']:.1f} -> {result['ops_per_sec']:.1f} ops/sec", file=sys.stderr)
+    if regressions:
+      return 1
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,15 @@
+class Actor:
+  def __init__(self, id, properties=None):
+    self._id = str(id)
+    self._properties = dict(properties or {})
+
+  @property
+  def id(self):
+    return self._id
+
+  @property
+  def properties(self):
+    return self._properties
+
+def actor_id(actor):
+  return str(getattr(actor, "id", actor))
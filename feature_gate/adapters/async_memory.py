@@ -0,0 +1,36 @@
+from feature_gate.adapters.memory import MemoryAdapter
+
+class AsyncMemoryAdapter:
+  def __init__(self, adapter=None):
+    if adapter is None:
+      self.adapter = MemoryAdapter()
+    else:
+      self.adapter = adapter
+    self.logger = self.adapter.logger
+
+  def logger(self):
+    return self.logger
+
+  async def add(self, feature):
+    return self.adapter.add(feature)
+
+  async def remove(self, feature_key):
+    return self.adapter.remove(feature_key)
+
+  async def features(self):
+    return self.adapter.features()
+
+  async def is_enabled(self, feature_key):
+    return self.adapter.is_enabled(feature_key)
+
+  async def is_enabled_many(self, feature_keys):
+    return self.adapter.is_enabled_many(feature_keys)
+
+  async def evaluate_all(self):
+    return self.adapter.evaluate_all()
+
+  async def enable(self, feature_key):
+    return self.adapter.enable(feature_key)
+
+  async def disable(self, feature_key):
+    return self.adapter.disable(feature_key)
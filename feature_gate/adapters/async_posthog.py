@@ -0,0 +1,51 @@
+from feature_gate.adapters.posthog import PosthogAdapter
+from feature_gate.clients.async_posthog_api_client import AsyncPosthogAPIClient
+
+class AsyncPosthogAdapter:
+  def __init__(self, api_key=None, project_id=None, max_concurrency=10, cache=False, refresh_interval=30, max_stale=300, background_refresh=True, **client_options):
+    self.client = AsyncPosthogAPIClient(api_key=api_key, project_id=project_id, max_concurrency=max_concurrency, **client_options)
+    self.adapter = PosthogAdapter(
+      client=self.client.client,
+      cache=cache,
+      refresh_interval=refresh_interval,
+      max_stale=max_stale,
+      background_refresh=background_refresh,
+    )
+    self.logger = self.adapter.logger
+
+  def client(self):
+    return self.client
+
+  def logger(self):
+    return self.logger
+
+  async def add(self, feature):
+    return await self.client.run(self.adapter.add, feature)
+
+  async def remove(self, feature_key):
+    return await self.client.run(self.adapter.remove, feature_key)
+
+  async def features(self):
+    return await self.client.run(self.adapter.features)
+
+  async def is_enabled(self, feature_key):
+    return await self.client.run(self.adapter.is_enabled, feature_key)
+
+  async def is_enabled_many(self, feature_keys):
+    return await self.client.run(self.adapter.is_enabled_many, feature_keys)
+
+  async def evaluate_all(self):
+    return await self.client.run(self.adapter.evaluate_all)
+
+  async def enable(self, feature_key):
+    return await self.client.run(self.adapter.enable, feature_key)
+
+  async def disable(self, feature_key):
+    return await self.client.run(self.adapter.disable, feature_key)
+
+  def snapshot_age(self):
+    return self.adapter.snapshot_age()
+
+  def close(self):
+    self.adapter.close()
+    self.client.close()
@@ -1,79 +1,147 @@
-import structlog
-from pathlib import Path
-from feature_gate.client import FeatureNotFound
+import threading
 
-from structlog.contextvars import (
-    bind_contextvars,
-    merge_contextvars,
-    bound_contextvars,
-)
+from contextlib import contextmanager
+from feature_gate import expressions, groups, log, rollout
+from feature_gate.actor import actor_id
+from feature_gate.client import FeatureNotFound, ReadOnlyError
+from feature_gate.flag_state import FlagState
 
 class MemoryAdapter:
-  def __init__(self):
-    self._features = []
-    bind_contextvars(klass="MemoryAdapter")
-    log_path = Path("logs").joinpath("feature_gate").with_suffix(".log")
-    Path.mkdir(Path("logs"), exist_ok=True)
-    Path.touch(log_path)
-    structlog.configure(
-      processors=[
-        merge_contextvars,
-        structlog.processors.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.dict_tracebacks,
-        structlog.processors.JSONRenderer(),
-      ],
-      logger_factory=structlog.WriteLoggerFactory(
-        file=log_path.open("wt")
-      ),
-    )
-    self.logger = structlog.get_logger()
+  def __init__(self, logger=None, read_only=False, rollout=rollout):
+    # Readers use whichever dict self._features points at and never lock.
+    # Writers copy it, change the copy and swap it in, so a published dict
+    # is never mutated.
+    self._features = {}
+    self._write_lock = threading.RLock()
+    self._pending = None
+    self.read_only = read_only
+    # How actors are bucketed for percentage gates, see feature_gate.rollout.
+    self.rollout = rollout
+    if logger is None:
+      logger = log.get_logger()
+    self.logger = logger.bind(klass="MemoryAdapter")
 
   def logger(self):
     return self.logger
 
+  def is_read_only(self):
+    return self.read_only
+
+  # Applies every write made inside the block as one new snapshot, or none
+  # of them if the block raises. Other writers wait until it is done.
+  @contextmanager
+  def batch(self):
+    self._check_writable()
+    with self._write_lock:
+      if self._pending is not None:
+        yield
+        return
+      self._pending = dict(self._features)
+      try:
+        yield
+        self._features = self._pending
+      finally:
+        self._pending = None
+
   def add(self, feature):
-    if feature.key not in self._features:
-      self._features.append({
-        "name": feature.name,
-        "key": feature.key,
-        "description": feature.description,
-        "gates": {
-          "boolean": {
-            "enabled": False
-          }
-        }
-      })
+    with self._writing() as features:
+      if feature.key not in features:
+        features[feature.key] = FlagState(feature.key, feature.name, feature.description)
     return True
 
   def remove(self, feature_key):
-    for feature in self._features:
-      if feature["key"] == feature_key:
-        self._features.remove(feature)
-        return True
-    raise FeatureNotFound("Feature {feature_key} not found.")
+    with self._writing() as features:
+      if features.pop(feature_key, None) is None:
+        raise FeatureNotFound(f"Feature {feature_key} not found.")
+    return True
 
   def features(self):
-    features = [feature["key"] for feature in self._features]
-    return features
+    return list(self._features)
+
+  def is_enabled(self, feature_key, actor=None):
+    return self._fetch(self._features, feature_key).is_enabled(actor, self.rollout)
+
+  def is_enabled_many(self, feature_keys):
+    features = self._features
+    return {feature_key: self._fetch(features, feature_key).enabled for feature_key in feature_keys}
+
+  def is_enabled_for_actors(self, feature_key, actors):
+    return self._fetch(self._features, feature_key).is_enabled_for_actors(actors, self.rollout)
 
-  def is_enabled(self, feature_key):
-    for feature in self._features:
-      if feature["key"] == feature_key:
-        is_enabled = feature["gates"]["boolean"]["enabled"]
-        return is_enabled
-    raise FeatureNotFound("Feature {feature_key} not found.")
+  def evaluate_all(self):
+    return {key: state.enabled for key, state in self._features.items()}
+
+  def export(self):
+    for state in self._features.values():
+      yield state.to_record()
 
   def enable(self, feature_key):
-    for feature in self._features:
-      if feature["key"] == feature_key:
-        feature["gates"]["boolean"]["enabled"] = True
-        return True
-    raise FeatureNotFound("Feature {feature_key} not found.")
+    return self._update(feature_key, lambda state: state.replace(enabled=True))
 
   def disable(self, feature_key):
-    for feature in self._features:
-      if feature["key"] == feature_key:
-        feature["gates"]["boolean"]["enabled"] = False
-        return True
-    raise FeatureNotFound("Feature {feature_key} not found.")
+    return self._update(feature_key, lambda state: state.disabled())
+
+  def enable_percentage_of_actors(self, feature_key, percentage):
+    rollout.validate_percentage(percentage)
+    return self._update(feature_key, lambda state: state.replace(percentage=percentage))
+
+  def disable_percentage_of_actors(self, feature_key):
+    return self._update(feature_key, lambda state: state.replace(percentage=0))
+
+  def enable_actor(self, feature_key, actor):
+    id = actor_id(actor)
+    return self._update(feature_key, lambda state: state.with_actor(id))
+
+  def disable_actor(self, feature_key, actor):
+    id = actor_id(actor)
+    return self._update(feature_key, lambda state: state.without_actor(id))
+
+  def enable_group(self, feature_key, group):
+    groups.check_registered(group)
+    return self._update(feature_key, lambda state: state.replace(groups=state.groups | {group}))
+
+  def disable_group(self, feature_key, group):
+    return self._update(feature_key, lambda state: state.replace(groups=state.groups - {group}))
+
+  def enable_expression(self, feature_key, expression):
+    return self._update(feature_key, lambda state: state.replace(expression=expression))
+
+  def disable_expression(self, feature_key):
+    return self.enable_expression(feature_key, None)
+
+  def expression(self, feature_key):
+    return self._fetch(self._features, feature_key).expression
+
+  def add_expression(self, feature_key, expression):
+    return self._update(feature_key, lambda state: state.replace(expression=expressions.add(state.expression, expression)))
+
+  def remove_expression(self, feature_key, expression):
+    return self._update(feature_key, lambda state: state.replace(expression=expressions.remove(state.expression, expression)))
+
+  def _update(self, feature_key, change):
+    with self._writing() as features:
+      features[feature_key] = change(self._fetch(features, feature_key))
+    return True
+
+  # Yields the dict to write to: the open batch's, or a copy that is
+  # published once the write succeeds.
+  @contextmanager
+  def _writing(self):
+    self._check_writable()
+    with self._write_lock:
+      if self._pending is not None:
+        yield self._pending
+        return
+      features = dict(self._features)
+      yield features
+      self._features = features
+
+  def _check_writable(self):
+    if self.read_only:
+      raise ReadOnlyError("MemoryAdapter is read only.")
+
+  def _fetch(self, features, feature_key):
+    try:
+      return features[feature_key]
+    except KeyError:
+      raise FeatureNotFound(f"Feature {feature_key} not found.") from None
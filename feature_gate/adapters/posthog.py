@@ -1,8 +1,42 @@
+import random
+
+from feature_gate import groups, transfer
+from feature_gate.actor import actor_id
+from feature_gate.adapters import posthog_evaluation
+from feature_gate.cache import SnapshotCache
+from feature_gate.client import FeatureNotFound
 from feature_gate.clients.posthog_api_client import PosthogAPIClient
+
 class PosthogAdapter:
-  def __init__(self, api_key=None, project_id=None):
-    self.client = PosthogAPIClient(api_key=api_key, project_id=project_id)
+  # Percentage gates are bucketed the way Posthog does it.
+  rollout = posthog_evaluation.ROLLOUT
+
+  def __init__(self, api_key=None, project_id=None, cache=False, refresh_interval=30, max_stale=300, background_refresh=True, client=None, instrumenter=None, cross_check=0, incremental=False, **client_options):
+    if client is None:
+      self.client = PosthogAPIClient(api_key=api_key, project_id=project_id, instrumenter=instrumenter, **client_options)
+    else:
+      self.client = client
     self.logger = self.client.logger
+    self._compiled = {}
+    # Cached refreshes only list flags updated since the newest updated_at
+    # seen, when incremental is set.
+    self.incremental = incremental
+    self._updated_at = None
+    self._refresh_stats = {"full": 0, "incremental": 0, "not_modified": 0, "fallbacks": 0}
+    # Share of actor evaluations also sent to Posthog's /decide to validate
+    # local evaluation. Inconclusive local answers always are, when enabled.
+    self.cross_check = cross_check
+    self._cross_check_stats = {"checked": 0, "mismatches": 0, "inconclusive": 0, "errors": 0}
+    self.cache = None
+    if cache:
+      self.cache = SnapshotCache(
+        self._load_snapshot,
+        refresh_interval=refresh_interval,
+        max_stale=max_stale,
+        background=background_refresh,
+        logger=self.logger,
+        instrumenter=instrumenter,
+      )
 
   def client(self):
     return self.client
@@ -11,63 +45,251 @@ class PosthogAdapter:
     return self.logger
 
   def add(self, feature):
-    if self.client.fetch_feature(feature.key) is None:
-      self.client.create_feature(feature.key, feature.description)
+    if self.client.verified_feature_id(feature.key) is None:
+      resp = self.client.create_feature(feature.key, feature.description)
+      self._cache_update(resp)
     return True
 
   def remove(self, feature_key):
-    if not self.client.fetch_feature(feature_key) is None:
+    try:
       self.client.delete_feature(feature_key)
+    except FeatureNotFound:
+      pass
+    if self.cache is not None:
+      self.cache.discard(feature_key)
     return True
 
   def features(self):
-    resp = self.client.list_features()
+    if self.cache is not None:
+      return list(self.cache.get())
     key='key'
-    return [item[key] for item in resp["data"] if key in item]
-
-  def is_enabled(self, feature_key):
-    return self.client.is_enabled(feature_key)
+    return [item[key] for item in self.client.iter_features() if key in item]
+
+  def is_enabled(self, feature_key, actor=None):
+    if actor is not None:
+      return self._evaluate(feature_key, self._compile(self._fetch(feature_key)), actor)
+    return posthog_evaluation.is_enabled_for_everyone(self._fetch(feature_key))
+
+  def is_enabled_for_actors(self, feature_key, actors):
+    evaluate = self._compile(self._fetch(feature_key))
+    return [self._evaluate(feature_key, evaluate, actor) for actor in actors]
+
+  def is_enabled_many(self, feature_keys):
+    if self.cache is not None:
+      flags = self.cache.get()
+    else:
+      flags = self._fetch_many(set(feature_keys))
+    response = {}
+    for feature_key in feature_keys:
+      feature = flags.get(feature_key)
+      if feature is None:
+        raise FeatureNotFound(f"Feature {feature_key} not found")
+      response[feature_key] = posthog_evaluation.is_enabled_for_everyone(feature)
+    return response
+
+  def evaluate_all(self):
+    if self.cache is not None:
+      flags = self.cache.get()
+    else:
+      flags = self._load_snapshot()
+    return {key: posthog_evaluation.is_enabled_for_everyone(feature) for key, feature in flags.items()}
+
+  def export(self):
+    for item in self.client.iter_features():
+      if "key" not in item or item.get("deleted"):
+        continue
+      yield transfer.record(item["key"], item["key"], item.get("name"), **posthog_evaluation.gates_from_flag(item))
 
   def enable(self, feature_key):
     resp = self.client.enable_feature(feature_key)
+    # Only rollout or actor conditions left means the flag is not on for
+    # everyone until it has one without filters again.
+    if "data" in resp and not posthog_evaluation.is_enabled_for_everyone(resp["data"]):
+      resp = self.client.update_feature(feature_key, {"filters": posthog_evaluation.with_catch_all(resp["data"])})
+    self._cache_update(resp)
     return resp["data"]["active"]
 
   def disable(self, feature_key):
     resp = self.client.disable_feature(feature_key)
+    self._cache_update(resp)
     return resp["data"]["active"] == False
 
-  # def enable_expression(self, expression):
-  #   raise NotImplementedError
-
-  # def disable_expression(self, expression):
-  #   raise NotImplementedError
-
-  # def expression(self):
-  #   raise NotImplementedError
-
-  # def add_expression(self, expression):
-  #   raise NotImplementedError
-
-  # def remove_expression(self, expression):
-  #   raise NotImplementedError
-
-  # def enable_actor(self, feature, actor):
-  #   raise NotImplementedError
-
-  # def disable_actor(self, feature, actor):
-  #   raise NotImplementedError
-
-  # def enable_group(self, feature, group):
-  #   raise NotImplementedError
-
-  # def disable_group(self, feature, group):
-  #   raise NotImplementedError
-
-  # def enable_percentage_of_actors(self, feature, percentage):
-  #   raise NotImplementedError
-
-  # def disable_percentage_of_actors(self, feature, percentage):
-  #   raise NotImplementedError
+  def enable_percentage_of_actors(self, feature_key, percentage):
+    feature = self._fetch(feature_key)
+    filters = posthog_evaluation.with_rollout_percentage(feature, percentage)
+    resp = self.client.update_feature(feature_key, {"active": True, "filters": filters})
+    self._cache_update(resp)
+    return "data" in resp
+
+  def disable_percentage_of_actors(self, feature_key):
+    feature = self._fetch(feature_key)
+    filters = posthog_evaluation.with_rollout_percentage(feature, 0)
+    resp = self.client.update_feature(feature_key, {"filters": filters})
+    self._cache_update(resp)
+    return "data" in resp
+
+  def enable_actor(self, feature_key, actor):
+    return self._update_gate_condition(feature_key, posthog_evaluation.ACTORS_PROPERTY, actor_id(actor), True)
+
+  def disable_actor(self, feature_key, actor):
+    return self._update_gate_condition(feature_key, posthog_evaluation.ACTORS_PROPERTY, actor_id(actor), False)
+
+  def enable_group(self, feature_key, group):
+    groups.check_registered(group)
+    return self._update_gate_condition(feature_key, posthog_evaluation.GROUPS_PROPERTY, group, True)
+
+  def disable_group(self, feature_key, group):
+    return self._update_gate_condition(feature_key, posthog_evaluation.GROUPS_PROPERTY, group, False)
+
+  # Sets every gate of a flag with one fetch and one PATCH; imports use it
+  # instead of a fetch and a PATCH per gate.
+  def write_gates(self, feature_key, gates):
+    filters, active = posthog_evaluation.with_gates(self._fetch(feature_key), gates)
+    resp = self.client.update_feature(feature_key, {"active": active, "filters": filters})
+    self._cache_update(resp)
+    return "data" in resp
+
+  def refresh_stats(self):
+    return dict(self._refresh_stats)
+
+  def cross_check_stats(self):
+    return dict(self._cross_check_stats)
+
+  def snapshot_age(self):
+    if self.cache is None:
+      return None
+    return self.cache.age()
+
+  def refresh(self):
+    if self.cache is not None:
+      self.cache.refresh()
+
+  def close(self):
+    if self.cache is not None:
+      self.cache.stop()
+
+  def _load_snapshot(self):
+    previous = self.cache.peek() if self.cache is not None else None
+    if previous is not None and self.incremental and self._updated_at is not None:
+      snapshot = self._load_changes(previous)
+      if snapshot is not None:
+        return snapshot
+      self._refresh_stats["fallbacks"] += 1
+    return self._load_all(previous)
+
+  def _load_all(self, previous):
+    snapshot = {}
+    not_modified = True
+    for page in self.client.iter_pages(conditional=True):
+      not_modified = not_modified and page.get("not_modified", False)
+      for item in page["data"] or []:
+        if "key" in item and not item.get("deleted"):
+          snapshot[item["key"]] = item
+    self._refresh_stats["full"] += 1
+    if not_modified and previous is not None:
+      # Every page was a 304; keeping the same snapshot keeps the compiled flags.
+      self._refresh_stats["not_modified"] += 1
+      return previous
+    updated = [item["updated_at"] for item in snapshot.values() if item.get("updated_at")]
+    self._updated_at = max(updated) if updated else None
+    return snapshot
+
+  def _load_changes(self, previous):
+    snapshot = dict(previous)
+    changed = False
+    updated_at = self._updated_at
+    for item in self.client.iter_features_updated_since(self._updated_at):
+      if "key" not in item:
+        continue
+      # A server that filters and orders by updated_at never lists anything
+      # older than the last one; otherwise this is the full list, and every
+      # incremental refresh would cost more than a plain one.
+      if (item.get("updated_at") or "") < updated_at:
+        self.incremental = False
+        self.logger.warning("posthog ignored the incremental list filter, refreshing in full", updated_after=self._updated_at)
+        return None
+      updated_at = item["updated_at"]
+      if item.get("deleted"):
+        changed = snapshot.pop(item["key"], None) is not None or changed
+      elif snapshot.get(item["key"]) != item:
+        snapshot[item["key"]] = item
+        changed = True
+    # A flag deleted without a tombstone, or a change missed while paging,
+    # leaves the merged snapshot out of step with the server's count.
+    if len(snapshot) != self.client.count_features():
+      return None
+    self._refresh_stats["incremental"] += 1
+    self._updated_at = updated_at
+    return snapshot if changed else previous
+
+  def _update_gate_condition(self, feature_key, property_key, value, enabled):
+    feature = self._fetch(feature_key)
+    filters = posthog_evaluation.with_property_value(feature, property_key, value, enabled)
+    payload = {"filters": filters}
+    if enabled:
+      payload["active"] = True
+    resp = self.client.update_feature(feature_key, payload)
+    self._cache_update(resp)
+    return "data" in resp
+
+  def _evaluate(self, feature_key, evaluate, actor):
+    result = evaluate(actor)
+    if self.cross_check and (result is None or random.random() < self.cross_check):
+      result = self._cross_check(feature_key, actor, result)
+    return result is True
+
+  def _cross_check(self, feature_key, actor, local):
+    distinct_id = actor_id(actor)
+    try:
+      resp = self.client.decide(distinct_id, posthog_evaluation.person_properties(actor, distinct_id))
+    except Exception as err:
+      resp = {"errors": [str(err)]}
+    self._cross_check_stats["checked"] += 1
+    if "data" not in resp:
+      self._cross_check_stats["errors"] += 1
+      self.logger.error("posthog decide failed", feature=feature_key, errors=resp.get("errors"))
+      return local
+    remote = bool((resp["data"].get("featureFlags") or {}).get(feature_key, False))
+    if local is None:
+      self._cross_check_stats["inconclusive"] += 1
+      return remote
+    if local != remote:
+      self._cross_check_stats["mismatches"] += 1
+      self.logger.warning("posthog evaluation mismatch", feature=feature_key, actor=distinct_id, local=local, remote=remote)
+    return local
+
+  def _compile(self, feature):
+    # Compiled evaluators are reused for as long as the flag definition is
+    # the same object, which is the lifetime of a cached snapshot.
+    compiled = self._compiled.get(feature["key"])
+    if compiled is None or compiled[0] is not feature:
+      compiled = (feature, posthog_evaluation.compile_flag(feature))
+      self._compiled[feature["key"]] = compiled
+    return compiled[1]
+
+  def _fetch(self, feature_key):
+    if self.cache is not None:
+      feature = self.cache.get().get(feature_key)
+    else:
+      feature = self.client.fetch_feature(feature_key)
+    if feature is None:
+      raise FeatureNotFound(f"Feature {feature_key} not found")
+    return feature
+
+  def _fetch_many(self, feature_keys):
+    found = {}
+    if not feature_keys:
+      return found
+    for item in self.client.iter_features():
+      if item.get("key") in feature_keys and not item.get("deleted"):
+        found[item["key"]] = item
+        if len(found) == len(feature_keys):
+          break
+    return found
+
+  def _cache_update(self, resp):
+    if self.cache is not None and "data" in resp:
+      self.cache.update(resp["data"]["key"], resp["data"])
 
   # def enable_percentage_of_time(self, feature, percentage):
   #   raise NotImplementedError
@@ -0,0 +1,318 @@
+import calendar
+import hashlib
+import re
+
+from datetime import date, datetime, timedelta, timezone
+from operator import ge, gt, le, lt
+from feature_gate import expressions, rollout
+from feature_gate.actor import actor_id
+from feature_gate.groups import GroupSet
+
+# Posthog hashes "<flag key>.<distinct id>" with sha1 and compares the first
+# 15 hex digits, scaled to [0, 1], against the condition's rollout percentage.
+LONG_SCALE = float(0xFFFFFFFFFFFFFFF)
+
+# Actor and group gates are stored as single-property release conditions.
+# Group membership is the person property below on the Posthog side, and the
+# registered group predicates when evaluated locally.
+ACTORS_PROPERTY = "distinct_id"
+GROUPS_PROPERTY = "feature_gate_groups"
+
+def rollout_hash(feature_key, distinct_id, salt=""):
+  hash_key = f"{feature_key}.{distinct_id}{salt}"
+  return int(hashlib.sha1(hash_key.encode("utf-8")).hexdigest()[:15], 16) / LONG_SCALE
+
+# Percentage bucketing with the interface of feature_gate.rollout, so
+# adapters mirroring Posthog flags enable the same actors Posthog does.
+class Rollout:
+  NAME = "posthog"
+
+  def is_actor_enabled(self, feature_key, percentage, actor_id):
+    return rollout_hash(feature_key, actor_id) <= percentage / 100
+
+  def enabled_actors(self, feature_key, percentage, actor_ids):
+    if percentage <= 0:
+      return [False] * len(actor_ids)
+    threshold = percentage / 100
+    return [rollout_hash(feature_key, actor_id) <= threshold for actor_id in actor_ids]
+
+ROLLOUT = Rollout()
+
+def is_enabled_for(flag, actor):
+  return compile_flag(flag)(actor) is True
+
+# Compiled flags return True or False, or None when the answer depends on
+# something only Posthog's servers know (cohorts, group properties, missing
+# person properties, experience continuity). That matches the Posthog SDKs,
+# which fall back to the server for those flags.
+def compile_flag(flag):
+  if not flag.get("active") or flag.get("deleted"):
+    return lambda actor: False
+  filters = flag.get("filters") or {}
+  if filters.get("aggregation_group_type_index") is not None or flag.get("ensure_experience_continuity"):
+    return lambda actor: None
+  matchers = [compile_condition(flag["key"], condition) for condition in conditions(flag)]
+  needs_properties = any(condition.get("properties") for condition in conditions(flag))
+  def evaluate(actor):
+    distinct_id = actor_id(actor)
+    properties = person_properties(actor, distinct_id) if needs_properties else None
+    inconclusive = False
+    for matcher in matchers:
+      matched = matcher(actor, distinct_id, properties)
+      if matched:
+        return True
+      if matched is None:
+        inconclusive = True
+    return None if inconclusive else False
+  return evaluate
+
+def person_properties(actor, distinct_id):
+  properties = dict(expressions.properties_for(actor))
+  properties[ACTORS_PROPERTY] = distinct_id
+  return properties
+
+def compile_condition(feature_key, condition):
+  property_matchers = [compile_property(property) for property in condition.get("properties") or []]
+  rollout_percentage = condition.get("rollout_percentage")
+  threshold = None if rollout_percentage is None else rollout_percentage / 100
+  def match(actor, distinct_id, properties):
+    inconclusive = False
+    for property_matcher in property_matchers:
+      matched = property_matcher(actor, properties)
+      if matched is False:
+        return False
+      if matched is None:
+        inconclusive = True
+    if inconclusive:
+      return None
+    return threshold is None or rollout_hash(feature_key, distinct_id) <= threshold
+  return match
+
+def compile_property(property):
+  key = property.get("key")
+  operator = property.get("operator") or "exact"
+  value = property.get("value")
+  if property.get("type", "person") != "person":
+    # Cohorts and group properties are resolved on the server.
+    return _inconclusive
+  if key == GROUPS_PROPERTY and operator == "exact":
+    group_set = GroupSet(_as_list(value))
+    return lambda actor, properties: group_set(actor)
+  # Like Posthog's local evaluation, a missing property is inconclusive, and
+  # so is is_not_set since only the server knows every property a person has.
+  if operator == "is_set":
+    return lambda actor, properties: True if key in properties else None
+  if operator == "is_not_set":
+    return _inconclusive
+  test = compile_operator(operator, value)
+  if test is None:
+    return _inconclusive
+  def match(actor, properties):
+    if key not in properties:
+      return None
+    return test(properties[key])
+  return match
+
+def compile_operator(operator, value):
+  if operator in ("exact", "is_not"):
+    values = frozenset(str(item).lower() for item in _as_list(value))
+    if operator == "exact":
+      return lambda actual: str(actual).lower() in values
+    return lambda actual: str(actual).lower() not in values
+  if operator in ("icontains", "not_icontains"):
+    needle = str(value).lower()
+    if operator == "icontains":
+      return lambda actual: needle in str(actual).lower()
+    return lambda actual: needle not in str(actual).lower()
+  if operator in ("regex", "not_regex"):
+    try:
+      pattern = re.compile(str(value))
+    except re.error:
+      # Posthog treats an invalid pattern as matching nothing, either way.
+      return lambda actual: False
+    if operator == "regex":
+      return lambda actual: pattern.search(str(actual)) is not None
+    return lambda actual: pattern.search(str(actual)) is None
+  if operator in NUMERIC_COMPARISONS:
+    return _compile_comparison(NUMERIC_COMPARISONS[operator], value)
+  if operator in DATE_COMPARISONS:
+    return _compile_date_comparison(DATE_COMPARISONS[operator], value)
+  return None
+
+NUMERIC_COMPARISONS = {
+  "gt": gt,
+  "gte": ge,
+  "lt": lt,
+  "lte": le,
+}
+
+DATE_COMPARISONS = {
+  "is_date_before": lt,
+  "is_date_after": gt,
+}
+
+RELATIVE_DATE = re.compile(r"^-?(?P<number>[0-9]+)(?P<interval>[hdwmy])$")
+
+def _compile_comparison(compare, value):
+  try:
+    number = float(value)
+  except (TypeError, ValueError):
+    number = None
+  text = str(value)
+  def test(actual):
+    # Same coercions as Posthog: numbers compare as numbers, strings and
+    # anything that is not a number compare as strings.
+    if number is not None and actual is not None and not isinstance(actual, str):
+      try:
+        return compare(actual, number)
+      except TypeError:
+        return None
+    return compare(str(actual), text)
+  return test
+
+def _compile_date_comparison(compare, value):
+  relative = RELATIVE_DATE.match(str(value))
+  if relative is None:
+    target = _parse_date(value)
+    if target is None:
+      return None
+  def test(actual):
+    actual = _parse_date(actual)
+    if actual is None:
+      return None
+    if relative is None:
+      return compare(actual, target)
+    return compare(actual, _relative_date(int(relative["number"]), relative["interval"]))
+  return test
+
+def _parse_date(value):
+  if isinstance(value, datetime):
+    parsed = value
+  elif isinstance(value, date):
+    parsed = datetime(value.year, value.month, value.day)
+  else:
+    try:
+      parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+      return None
+  if parsed.tzinfo is None:
+    parsed = parsed.replace(tzinfo=timezone.utc)
+  return parsed
+
+def _relative_date(number, interval, now=None):
+  now = now or datetime.now(timezone.utc)
+  if interval == "h":
+    return now - timedelta(hours=number)
+  if interval == "d":
+    return now - timedelta(days=number)
+  if interval == "w":
+    return now - timedelta(weeks=number)
+  months = number if interval == "m" else number * 12
+  year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+  day = min(now.day, calendar.monthrange(year, month + 1)[1])
+  return now.replace(year=year, month=month + 1, day=day)
+
+def _as_list(value):
+  return value if isinstance(value, list) else [value]
+
+def _inconclusive(actor, properties):
+  return None
+
+def conditions(flag):
+  return (flag.get("filters") or {}).get("groups") or []
+
+# The boolean gate: an inactive flag is off for everyone, whatever its
+# conditions say, and an active one is on for everyone when it has no
+# conditions or one without filters that rolls out to all actors.
+def is_enabled_for_everyone(flag):
+  if not flag.get("active") or flag.get("deleted"):
+    return False
+  return not conditions(flag) or any(_is_catch_all(condition) for condition in conditions(flag))
+
+def _is_catch_all(condition):
+  rollout_percentage = condition.get("rollout_percentage")
+  return not condition.get("properties") and (rollout_percentage is None or rollout_percentage >= 100)
+
+def gates_from_flag(flag):
+  gates = {"boolean": False, "actors": [], "groups": [], "percentage_of_actors": 0, "expression": None}
+  if not flag.get("active"):
+    return gates
+  gates["boolean"] = is_enabled_for_everyone(flag)
+  for condition in conditions(flag):
+    if not condition.get("properties"):
+      if not _is_catch_all(condition):
+        gates["percentage_of_actors"] = condition.get("rollout_percentage")
+    elif _is_gate_condition(condition, ACTORS_PROPERTY):
+      gates["actors"] = sorted(str(value) for value in condition["properties"][0]["value"])
+    elif _is_gate_condition(condition, GROUPS_PROPERTY):
+      gates["groups"] = sorted(condition["properties"][0]["value"])
+  return gates
+
+# Conditions on an inactive flag are all off, so a write that activates it
+# keeps none of them, the way FlagState.disabled() clears every gate.
+def _active_conditions(flag):
+  return conditions(flag) if flag.get("active") else []
+
+def with_rollout_percentage(flag, percentage):
+  # The percentage gate is the condition without property filters, the one
+  # Posthog shows as "roll out to N% of all users". One without filters or a
+  # rollout is the boolean gate, and stays.
+  rollout.validate_percentage(percentage)
+  filters = dict(flag.get("filters") or {})
+  groups = [condition for condition in _active_conditions(flag) if condition.get("properties") or condition.get("rollout_percentage") is None]
+  groups.append({"properties": [], "rollout_percentage": percentage})
+  filters["groups"] = groups
+  return filters
+
+def with_catch_all(flag):
+  filters = dict(flag.get("filters") or {})
+  filters["groups"] = conditions(flag) + [{"properties": [], "rollout_percentage": None}]
+  return filters
+
+def with_property_value(flag, property_key, value, enabled):
+  filters = dict(flag.get("filters") or {})
+  groups = []
+  values = []
+  for condition in _active_conditions(flag) if enabled else conditions(flag):
+    if _is_gate_condition(condition, property_key):
+      values = list(condition["properties"][0]["value"])
+    else:
+      groups.append(condition)
+  if enabled and value not in values:
+    values.append(value)
+  elif not enabled and value in values:
+    values.remove(value)
+  if values:
+    groups.append(_gate_condition(property_key, values))
+  filters["groups"] = groups
+  return filters
+
+# The filters and active state for a whole set of gates, as one write. Other
+# conditions on an active flag are kept.
+def with_gates(flag, gates):
+  filters = dict(flag.get("filters") or {})
+  groups = [
+    condition for condition in _active_conditions(flag)
+    if condition.get("properties") and not _is_gate_condition(condition, ACTORS_PROPERTY) and not _is_gate_condition(condition, GROUPS_PROPERTY)
+  ]
+  if gates["actors"]:
+    groups.append(_gate_condition(ACTORS_PROPERTY, sorted(str(actor) for actor in gates["actors"])))
+  if gates["groups"]:
+    groups.append(_gate_condition(GROUPS_PROPERTY, sorted(gates["groups"])))
+  if gates["percentage_of_actors"]:
+    groups.append({"properties": [], "rollout_percentage": rollout.validate_percentage(gates["percentage_of_actors"])})
+  if gates["boolean"]:
+    groups.append({"properties": [], "rollout_percentage": None})
+  filters["groups"] = groups
+  active = bool(gates["boolean"] or gates["actors"] or gates["groups"] or gates["percentage_of_actors"])
+  return filters, active
+
+def _gate_condition(property_key, values):
+  return {
+    "properties": [{"key": property_key, "type": "person", "operator": "exact", "value": values}],
+    "rollout_percentage": 100
+  }
+
+def _is_gate_condition(condition, property_key):
+  properties = condition.get("properties") or []
+  return len(properties) == 1 and properties[0].get("key") == property_key and properties[0].get("operator", "exact") == "exact"
@@ -0,0 +1,186 @@
+import multiprocessing
+import struct
+
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from feature_gate import log, rollout
+from feature_gate.actor import actor_id
+from feature_gate.client import FeatureNotFound
+from feature_gate.rollout import SCALE, by_name
+
+# Header: magic, version, capacity, count, the name of the rollout that
+# buckets actors, then the layout generation on its own at an 8-byte
+# aligned offset so it is written in one store.
+# Slots: seqlock counter, used flag, boolean gate, percentage of actors in
+# thousandths of a percent, key length, key. The generation is bumped
+# whenever a key is added or removed, so readers know to rebuild their
+# key-to-slot index.
+MAGIC = b"FGSM"
+VERSION = 3
+HEADER = struct.Struct("<4sHxxII16s")
+SLOT = struct.Struct("<IBBxxIH64sxx")
+SEQ = struct.Struct("<I")
+GENERATION = struct.Struct("<Q")
+GENERATION_OFFSET = 32
+TABLE_OFFSET = 40
+KEY_SIZE = 64
+
+class SharedMemoryAdapter:
+  # rollout buckets actors for percentage gates, see feature_gate.rollout.
+  # Attaching processes use the one the creator recorded.
+  def __init__(self, name=None, capacity=1024, create=True, lock=None, logger=None, rollout=rollout):
+    if create:
+      self.shm = SharedMemory(name=name, create=True, size=TABLE_OFFSET + SLOT.size * capacity)
+      HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, capacity, 0, rollout.NAME.encode("ascii"))
+      GENERATION.pack_into(self.shm.buf, GENERATION_OFFSET, 0)
+    else:
+      # A private lock would not serialize writers across processes.
+      if lock is None:
+        raise ValueError("Attaching to a shared memory table requires the creator's lock.")
+      self.shm = SharedMemory(name=name)
+      # Attaching processes must not unlink the segment when they exit.
+      resource_tracker.unregister(self.shm._name, "shared_memory")
+      magic, version, capacity, _, rollout_name = HEADER.unpack_from(self.shm.buf, 0)
+      if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{name} is not a feature_gate shared memory table")
+      rollout = by_name(rollout_name.rstrip(b"\0").decode("ascii"))
+    self.name = self.shm.name
+    self.capacity = capacity
+    self.rollout = rollout
+    # Writers serialize on this lock; it is inherited by forked workers.
+    self.lock = lock or multiprocessing.Lock()
+    if logger is None:
+      logger = log.get_logger()
+    self.logger = logger.bind(klass="SharedMemoryAdapter")
+    self._generation = None
+    self._index = {}
+
+  def logger(self):
+    return self.logger
+
+  def add(self, feature):
+    key = self._encode(feature.key)
+    with self.lock:
+      if feature.key in self._slots():
+        return True
+      for slot in range(self.capacity):
+        if not self._read(slot)[1]:
+          self._write(slot, 1, 0, 0, key)
+          self._bump_generation(1)
+          return True
+    raise RuntimeError(f"Shared memory flag table is full (capacity {self.capacity}).")
+
+  def remove(self, feature_key):
+    with self.lock:
+      slot = self._slot(feature_key)
+      self._write(slot, 0, 0, 0, b"")
+      self._bump_generation(-1)
+    return True
+
+  def features(self):
+    return list(self._slots())
+
+  def is_enabled(self, feature_key, actor=None):
+    _, _, enabled, percentage, _, _ = self._lookup(feature_key)
+    if enabled:
+      return True
+    if actor is None or not percentage:
+      return False
+    return self.rollout.is_actor_enabled(feature_key, percentage / SCALE, actor_id(actor))
+
+  def is_enabled_many(self, feature_keys):
+    return {feature_key: self.is_enabled(feature_key) for feature_key in feature_keys}
+
+  def evaluate_all(self):
+    return {feature_key: bool(self._lookup(feature_key)[2]) for feature_key in list(self._slots())}
+
+  def enable(self, feature_key):
+    return self._update(feature_key, enabled=1)
+
+  def disable(self, feature_key):
+    return self._update(feature_key, enabled=0, percentage=0)
+
+  def enable_percentage_of_actors(self, feature_key, percentage):
+    rollout.validate_percentage(percentage)
+    return self._update(feature_key, percentage=round(percentage * SCALE))
+
+  def disable_percentage_of_actors(self, feature_key):
+    return self._update(feature_key, percentage=0)
+
+  def close(self):
+    self.shm.close()
+
+  def unlink(self):
+    self.shm.unlink()
+
+  def _update(self, feature_key, enabled=None, percentage=None):
+    with self.lock:
+      slot = self._slot(feature_key)
+      _, used, current_enabled, current_percentage, key_length, key = self._read(slot)
+      self._write(
+        slot,
+        used,
+        current_enabled if enabled is None else enabled,
+        current_percentage if percentage is None else percentage,
+        key[:key_length],
+      )
+    return True
+
+  def _lookup(self, feature_key):
+    values = self._read(self._slot(feature_key))
+    # The slot may have been reused between reading the generation and the
+    # slot, in which case the index is rebuilt and the lookup retried.
+    if values[5][:values[4]].decode("utf-8") != feature_key:
+      self._generation = None
+      values = self._read(self._slot(feature_key))
+      if values[5][:values[4]].decode("utf-8") != feature_key:
+        raise FeatureNotFound(f"Feature {feature_key} not found.")
+    return values
+
+  def _slot(self, feature_key):
+    slot = self._slots().get(feature_key)
+    if slot is None:
+      raise FeatureNotFound(f"Feature {feature_key} not found.")
+    return slot
+
+  def _slots(self):
+    generation = GENERATION.unpack_from(self.shm.buf, GENERATION_OFFSET)[0]
+    if generation != self._generation:
+      index = {}
+      for slot in range(self.capacity):
+        _, used, _, _, key_length, key = self._read(slot)
+        if used:
+          index[key[:key_length].decode("utf-8")] = slot
+      self._index = index
+      self._generation = generation
+    return self._index
+
+  def _read(self, slot):
+    buffer = self.shm.buf
+    offset = TABLE_OFFSET + slot * SLOT.size
+    while True:
+      values = SLOT.unpack_from(buffer, offset)
+      # An odd sequence means a write is in progress; a changed sequence
+      # means one finished while we were reading. Either way, read again.
+      if values[0] & 1 == 0 and SEQ.unpack_from(buffer, offset)[0] == values[0]:
+        return values
+
+  def _write(self, slot, used, enabled, percentage, key):
+    buffer = self.shm.buf
+    offset = TABLE_OFFSET + slot * SLOT.size
+    seq = SEQ.unpack_from(buffer, offset)[0]
+    SEQ.pack_into(buffer, offset, seq + 1)
+    SLOT.pack_into(buffer, offset, seq + 1, used, enabled, percentage, len(key), key)
+    SEQ.pack_into(buffer, offset, seq + 2)
+
+  def _bump_generation(self, delta):
+    _, _, capacity, count, rollout_name = HEADER.unpack_from(self.shm.buf, 0)
+    HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, capacity, count + delta, rollout_name)
+    generation = GENERATION.unpack_from(self.shm.buf, GENERATION_OFFSET)[0]
+    GENERATION.pack_into(self.shm.buf, GENERATION_OFFSET, generation + 1)
+
+  def _encode(self, feature_key):
+    key = feature_key.encode("utf-8")
+    if len(key) > KEY_SIZE:
+      raise ValueError(f"Feature key {feature_key} is longer than {KEY_SIZE} bytes.")
+    return key
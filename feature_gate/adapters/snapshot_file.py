@@ -0,0 +1,254 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from feature_gate import expressions, groups, log, rollout, transfer
+from feature_gate.actor import actor_id
+from feature_gate.client import FeatureNotFound, ReadOnlyError
+from feature_gate.rollout import SCALE
+
+# Layout, all little endian:
+#   header   magic, version, record count, hash slot count, and the name of
+#            the rollout that buckets actors for percentage gates
+#   slots    one u32 per slot, record index + 1 (0 is an empty slot)
+#   records  key offset/length, boolean flag, percentage in thousandths of a
+#            percent, and offset/length of a JSON blob with the other gates
+#   blob     keys and JSON blobs referenced by the records
+MAGIC = b"FGS1"
+VERSION = 2
+HEADER = struct.Struct("<4sHxxII16s")
+SLOT = struct.Struct("<I")
+RECORD = struct.Struct("<IHBxIII")
+BOOLEAN = 1
+
+# rollout is the source's, so readers enable the same actors it does.
+def write_snapshot(path, records, rollout=rollout):
+  keys = []
+  extras = []
+  fixed = []
+  for entry in records:
+    gates = entry["gates"]
+    keys.append(entry["key"].encode("utf-8"))
+    extras.append(json.dumps({
+      "name": entry["name"],
+      "description": entry["description"],
+      "actors": gates["actors"],
+      "groups": gates["groups"],
+      "expression": gates["expression"],
+    }, sort_keys=True).encode("utf-8"))
+    fixed.append((BOOLEAN if gates["boolean"] else 0, round(gates["percentage_of_actors"] * SCALE)))
+
+  count = len(keys)
+  slots = 1
+  while slots < count * 2:
+    slots *= 2
+  table = [0] * slots
+  for index, key in enumerate(keys):
+    slot = zlib.crc32(key) & (slots - 1)
+    while table[slot]:
+      slot = (slot + 1) & (slots - 1)
+    table[slot] = index + 1
+
+  blob_offset = HEADER.size + SLOT.size * slots + RECORD.size * count
+  body = bytearray()
+  record_bytes = bytearray()
+  for key, extra, (flags, percentage) in zip(keys, extras, fixed):
+    key_offset = blob_offset + len(body)
+    body += key
+    extra_offset = blob_offset + len(body)
+    body += extra
+    record_bytes += RECORD.pack(key_offset, len(key), flags, percentage, extra_offset, len(extra))
+
+  tmp_path = f"{path}.tmp.{os.getpid()}"
+  with open(tmp_path, "wb") as fp:
+    fp.write(HEADER.pack(MAGIC, VERSION, count, slots, rollout.NAME.encode("ascii")))
+    fp.write(struct.pack(f"<{slots}I", *table))
+    fp.write(record_bytes)
+    fp.write(body)
+    fp.flush()
+    os.fsync(fp.fileno())
+  # Readers either see the old file or the new one, never a partial write.
+  os.replace(tmp_path, path)
+  return count
+
+def refresh_snapshot(source, path, interval=30, stop=None, logger=None):
+  stop = stop or threading.Event()
+  logger = logger or log.get_logger()
+  while True:
+    try:
+      write_snapshot(path, transfer.records(source), getattr(source, "rollout", rollout))
+    except Exception as err:
+      logger.error(f"Snapshot refresh failed - {err}")
+    if stop.wait(interval):
+      return
+
+class Snapshot:
+  def __init__(self, buffer, identity):
+    self.buffer = buffer
+    self.identity = identity
+    if buffer is None:
+      self.count = 0
+      self.slots = 0
+      self.rollout = rollout
+    else:
+      magic, version, self.count, self.slots, name = HEADER.unpack_from(buffer, 0)
+      if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a feature_gate snapshot file")
+      self.rollout = rollout.by_name(name.rstrip(b"\0").decode("ascii"))
+    self._records_offset = HEADER.size + SLOT.size * self.slots
+    self._compiled = {}
+
+  def find(self, key):
+    if not self.count:
+      return None
+    encoded = key.encode("utf-8")
+    mask = self.slots - 1
+    slot = zlib.crc32(encoded) & mask
+    buffer = self.buffer
+    while True:
+      index = SLOT.unpack_from(buffer, HEADER.size + slot * SLOT.size)[0]
+      if not index:
+        return None
+      record = RECORD.unpack_from(buffer, self._records_offset + (index - 1) * RECORD.size)
+      key_offset, key_length = record[0], record[1]
+      if key_length == len(encoded) and buffer[key_offset:key_offset + key_length] == encoded:
+        return record
+      slot = (slot + 1) & mask
+
+  def records(self):
+    for index in range(self.count):
+      yield RECORD.unpack_from(self.buffer, self._records_offset + index * RECORD.size)
+
+  def key(self, record):
+    return self.buffer[record[0]:record[0] + record[1]].decode("utf-8")
+
+  def extra(self, record):
+    return json.loads(self.buffer[record[4]:record[4] + record[5]])
+
+  def compiled(self, key, record):
+    # Actor, group and expression gates are decoded once per snapshot.
+    compiled = self._compiled.get(key)
+    if compiled is None:
+      extra = self.extra(record)
+      expression = extra["expression"]
+      compiled = (
+        frozenset(extra["actors"]),
+        groups.GroupSet(extra["groups"]),
+        None if expression is None else expressions.compile(expression),
+      )
+      self._compiled[key] = compiled
+    return compiled
+
+def _open_snapshot(path):
+  try:
+    fd = os.open(path, os.O_RDONLY)
+  except FileNotFoundError:
+    return Snapshot(None, None)
+  try:
+    stat = os.fstat(fd)
+    buffer = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+  finally:
+    os.close(fd)
+  return Snapshot(buffer, (stat.st_ino, stat.st_mtime_ns, stat.st_size))
+
+class SnapshotFileAdapter:
+  def __init__(self, path, check_interval=1, logger=None):
+    self.path = path
+    self.check_interval = check_interval
+    if logger is None:
+      logger = log.get_logger()
+    self.logger = logger.bind(klass="SnapshotFileAdapter")
+    self._snapshot = _open_snapshot(path)
+    self._checked_at = time.monotonic()
+
+  def logger(self):
+    return self.logger
+
+  def is_read_only(self):
+    return True
+
+  def add(self, feature):
+    raise ReadOnlyError("SnapshotFileAdapter is read only.")
+
+  def remove(self, feature_key):
+    raise ReadOnlyError("SnapshotFileAdapter is read only.")
+
+  def enable(self, feature_key):
+    raise ReadOnlyError("SnapshotFileAdapter is read only.")
+
+  def disable(self, feature_key):
+    raise ReadOnlyError("SnapshotFileAdapter is read only.")
+
+  def features(self):
+    snapshot = self.snapshot()
+    return [snapshot.key(record) for record in snapshot.records()]
+
+  def is_enabled(self, feature_key, actor=None):
+    snapshot = self.snapshot()
+    record = self._find(snapshot, feature_key)
+    if record[2] & BOOLEAN:
+      return True
+    if actor is None:
+      return False
+    id = actor_id(actor)
+    actor_ids, group_set, expression = snapshot.compiled(feature_key, record)
+    if id in actor_ids:
+      return True
+    if group_set and group_set(actor):
+      return True
+    if expression is not None and expression(expressions.properties_for(actor)):
+      return True
+    percentage = record[3] / SCALE
+    return percentage > 0 and snapshot.rollout.is_actor_enabled(feature_key, percentage, id)
+
+  def is_enabled_many(self, feature_keys):
+    snapshot = self.snapshot()
+    return {feature_key: bool(self._find(snapshot, feature_key)[2] & BOOLEAN) for feature_key in feature_keys}
+
+  def evaluate_all(self):
+    snapshot = self.snapshot()
+    return {snapshot.key(record): bool(record[2] & BOOLEAN) for record in snapshot.records()}
+
+  def export(self):
+    snapshot = self.snapshot()
+    for record in snapshot.records():
+      extra = snapshot.extra(record)
+      yield transfer.record(
+        snapshot.key(record),
+        extra["name"],
+        extra["description"],
+        boolean=bool(record[2] & BOOLEAN),
+        actors=extra["actors"],
+        groups=extra["groups"],
+        percentage_of_actors=record[3] / SCALE,
+        expression=extra["expression"],
+      )
+
+  def snapshot(self):
+    now = time.monotonic()
+    if now - self._checked_at >= self.check_interval:
+      self._checked_at = now
+      self.reload()
+    return self._snapshot
+
+  def reload(self):
+    try:
+      stat = os.stat(self.path)
+      identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+      identity = None
+    if identity != self._snapshot.identity:
+      # The previous mapping stays valid for readers still holding it and is
+      # unmapped once it is garbage collected.
+      self._snapshot = _open_snapshot(self.path)
+    return self._snapshot
+
+  def _find(self, snapshot, feature_key):
+    record = snapshot.find(feature_key)
+    if record is None:
+      raise FeatureNotFound(f"Feature {feature_key} not found.")
+    return record
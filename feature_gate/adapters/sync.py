@@ -0,0 +1,179 @@
+import threading
+import time
+
+from contextlib import nullcontext
+from feature_gate import transfer
+from feature_gate.client import FeatureNotFound
+
+class Synchronizer:
+  def __init__(self, local, remote, logger=None):
+    self.local = local
+    self.remote = remote
+    self.logger = logger
+    self._lock = threading.Lock()
+    # Remote records as of the last successful sync, used to diff the next one.
+    self._last = None
+    # Keys written through SyncAdapter since then. Their local copy may not
+    # match _last (the remote write failed, or was reverted elsewhere), so
+    # the next sync applies their remote state whether or not it changed.
+    self._written = set()
+    self._written_lock = threading.Lock()
+    self.last_synced_at = None
+    self.last_diff_size = None
+    self.last_duration = None
+    self.last_error = None
+
+  def mark_written(self, key):
+    with self._written_lock:
+      self._written.add(key)
+
+  def sync(self):
+    with self._lock:
+      started = time.monotonic()
+      with self._written_lock:
+        written, self._written = self._written, set()
+      try:
+        remote = {entry["key"]: entry for entry in transfer.records(self.remote)}
+        if self._last is None:
+          summary = transfer.apply(self.local, remote.values(), max_workers=1, prune=True)
+          diff_size = summary["added"] + summary["updated"] + summary["removed"]
+        else:
+          changed = [entry for key, entry in remote.items() if key in written or self._last.get(key) != entry]
+          removed = [key for key in self._last.keys() | written if key not in remote]
+          # Readers of the local copy see the whole diff at once, or none of it.
+          with self.local.batch() if hasattr(self.local, "batch") else nullcontext():
+            transfer.apply(self.local, changed, max_workers=1)
+            for key in removed:
+              try:
+                self.local.remove(key)
+              except FeatureNotFound:
+                # Already removed locally, by a write through SyncAdapter.
+                pass
+          diff_size = len(changed) + len(removed)
+      except Exception as err:
+        with self._written_lock:
+          self._written |= written
+        self.last_error = err
+        raise
+      self._last = remote
+      self.last_error = None
+      self.last_synced_at = time.time()
+      self.last_diff_size = diff_size
+      self.last_duration = time.monotonic() - started
+      return diff_size
+
+  def stats(self):
+    return {
+      "last_synced_at": self.last_synced_at,
+      "last_diff_size": self.last_diff_size,
+      "last_duration": self.last_duration,
+      "last_error": None if self.last_error is None else str(self.last_error)
+    }
+
+class SyncAdapter:
+  def __init__(self, local, remote, interval=10, background=True, sync_on_start=True):
+    self.local = local
+    self.remote = remote
+    self.logger = local.logger
+    self.interval = interval
+    # Mirrored percentage gates must bucket actors the way the remote does.
+    if hasattr(remote, "rollout") and hasattr(local, "rollout"):
+      local.rollout = remote.rollout
+      self.rollout = remote.rollout
+    self.synchronizer = Synchronizer(local, remote, logger=self.logger)
+    self._stop = threading.Event()
+    self._thread = None
+    if sync_on_start:
+      self._sync_quietly()
+    if background:
+      self.start()
+
+  def logger(self):
+    return self.logger
+
+  def sync(self):
+    return self.synchronizer.sync()
+
+  def sync_stats(self):
+    return self.synchronizer.stats()
+
+  def start(self):
+    if self._thread is None or not self._thread.is_alive():
+      self._stop.clear()
+      self._thread = threading.Thread(target=self._run, name="feature_gate-sync", daemon=True)
+      self._thread.start()
+
+  def stop(self):
+    self._stop.set()
+    if self._thread is not None:
+      self._thread.join()
+      self._thread = None
+
+  def add(self, feature):
+    return self._write("add", feature)
+
+  def remove(self, feature_key):
+    return self._write("remove", feature_key)
+
+  def features(self):
+    return self.local.features()
+
+  def is_enabled(self, feature_key, actor=None):
+    if actor is None:
+      return self.local.is_enabled(feature_key)
+    return self.local.is_enabled(feature_key, actor)
+
+  def is_enabled_many(self, feature_keys):
+    return self.local.is_enabled_many(feature_keys)
+
+  def is_enabled_for_actors(self, feature_key, actors):
+    return self.local.is_enabled_for_actors(feature_key, actors)
+
+  def evaluate_all(self):
+    return self.local.evaluate_all()
+
+  def export(self):
+    return transfer.records(self.local)
+
+  def enable(self, feature_key):
+    return self._write("enable", feature_key)
+
+  def disable(self, feature_key):
+    return self._write("disable", feature_key)
+
+  def enable_actor(self, feature_key, actor):
+    return self._write("enable_actor", feature_key, actor)
+
+  def disable_actor(self, feature_key, actor):
+    return self._write("disable_actor", feature_key, actor)
+
+  def enable_group(self, feature_key, group):
+    return self._write("enable_group", feature_key, group)
+
+  def disable_group(self, feature_key, group):
+    return self._write("disable_group", feature_key, group)
+
+  def enable_percentage_of_actors(self, feature_key, percentage):
+    return self._write("enable_percentage_of_actors", feature_key, percentage)
+
+  def disable_percentage_of_actors(self, feature_key):
+    return self._write("disable_percentage_of_actors", feature_key)
+
+  def _write(self, method, *args):
+    # Writes go to the source of truth first, then to the local copy so reads
+    # see them before the next sync.
+    key = args[0].key if method == "add" else args[0]
+    self.synchronizer.mark_written(key)
+    response = getattr(self.remote, method)(*args)
+    getattr(self.local, method)(*args)
+    return response
+
+  def _run(self):
+    while not self._stop.wait(self.interval):
+      self._sync_quietly()
+
+  def _sync_quietly(self):
+    try:
+      self.sync()
+    except Exception as err:
+      self.logger.error(f"Sync failed - {err}")
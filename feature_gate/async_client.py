@@ -0,0 +1,55 @@
+from feature_gate.client import logs_debug
+
+class AsyncClient:
+  def __init__(self, adapter):
+    self.adapter = adapter
+    self.logger = adapter.logger
+
+  def adapter(self):
+    return self.adapter
+
+  def logger(self):
+    return self.logger
+
+  async def add(self, feature):
+    response = await self.adapter.add(feature)
+    self.logger.info("add feature", feature=feature, response=response)
+    return response
+
+  async def remove(self, feature):
+    response = await self.adapter.remove(feature)
+    self.logger.info("remove feature", feature=feature, response=response)
+    return response
+
+  async def features(self):
+    return await self.adapter.features()
+
+  async def is_enabled(self, feature):
+    response = await self.adapter.is_enabled(feature)
+    if logs_debug(self.logger):
+      self.logger.debug("feature is_enabled", feature=feature, response=response)
+    return response
+
+  async def is_enabled_many(self, features):
+    if hasattr(self.adapter, "is_enabled_many"):
+      response = await self.adapter.is_enabled_many(features)
+    else:
+      response = {feature: await self.adapter.is_enabled(feature) for feature in features}
+    if logs_debug(self.logger):
+      self.logger.debug("features is_enabled_many", features=features, response=response)
+    return response
+
+  async def evaluate_all(self):
+    if hasattr(self.adapter, "evaluate_all"):
+      return await self.adapter.evaluate_all()
+    return await self.is_enabled_many(await self.adapter.features())
+
+  async def enable(self, feature):
+    response = await self.adapter.enable(feature)
+    self.logger.info("enable feature", feature=feature, response=response)
+    return response
+
+  async def disable(self, feature):
+    response = await self.adapter.disable(feature)
+    self.logger.info("disable feature", feature=feature, response=response)
+    return response
@@ -0,0 +1,120 @@
+import threading
+import time
+
+class SnapshotCache:
+  def __init__(self, loader, refresh_interval=30, max_stale=300, background=True, logger=None, clock=time.monotonic, instrumenter=None):
+    self._loader = loader
+    self.refresh_interval = refresh_interval
+    self.max_stale = max_stale
+    self.logger = logger
+    self._clock = clock
+    self.instrumenter = instrumenter
+    # (snapshot, loaded_at) is swapped as one tuple so readers never see a torn pair.
+    self._state = None
+    self._refresh_lock = threading.Lock()
+    self._stop = threading.Event()
+    self._thread = None
+    if background:
+      self.start()
+
+  def get(self):
+    state = self._state
+    if state is None:
+      self._instrument("miss")
+      return self._reload()
+    snapshot, loaded_at = state
+    age = self._clock() - loaded_at
+    if age <= self.refresh_interval:
+      self._instrument("hit")
+      return snapshot
+    if age <= self.max_stale:
+      self._instrument("stale")
+      self._revalidate()
+      return snapshot
+    self._instrument("miss")
+    return self._reload()
+
+  def peek(self):
+    state = self._state
+    return None if state is None else state[0]
+
+  def age(self):
+    state = self._state
+    if state is None:
+      return None
+    return self._clock() - state[1]
+
+  def refresh(self):
+    with self._refresh_lock:
+      return self._load()
+
+  def update(self, key, value):
+    self._replace(lambda snapshot: snapshot.__setitem__(key, value))
+
+  def discard(self, key):
+    self._replace(lambda snapshot: snapshot.pop(key, None))
+
+  def invalidate(self):
+    self._state = None
+
+  def start(self):
+    if self._thread is None or not self._thread.is_alive():
+      self._stop.clear()
+      self._thread = threading.Thread(target=self._run, name="feature_gate-snapshot-refresh", daemon=True)
+      self._thread.start()
+
+  def stop(self):
+    self._stop.set()
+    if self._thread is not None:
+      self._thread.join()
+      self._thread = None
+
+  def _reload(self):
+    with self._refresh_lock:
+      # Readers that queued behind another reader's load reuse its snapshot.
+      state = self._state
+      if state is not None and self._clock() - state[1] <= self.max_stale:
+        return state[0]
+      return self._load()
+
+  def _load(self):
+    snapshot = self._loader()
+    self._state = (snapshot, self._clock())
+    return snapshot
+
+  def _replace(self, change):
+    with self._refresh_lock:
+      state = self._state
+      if state is None:
+        return
+      snapshot = dict(state[0])
+      change(snapshot)
+      self._state = (snapshot, state[1])
+
+  def _revalidate(self):
+    if not self._refresh_lock.acquire(blocking=False):
+      return
+    threading.Thread(target=self._revalidate_locked, daemon=True).start()
+
+  def _revalidate_locked(self):
+    try:
+      self._load()
+    except Exception as err:
+      self._log_refresh_error(err)
+    finally:
+      self._refresh_lock.release()
+
+  def _run(self):
+    while not self._stop.wait(self.refresh_interval):
+      try:
+        self.refresh()
+      except Exception as err:
+        self._log_refresh_error(err)
+
+  def _instrument(self, result):
+    if self.instrumenter is not None:
+      self.instrumenter("cache", {"result": result})
+
+  def _log_refresh_error(self, error):
+    if self.logger is not None:
+      self.logger.error(f"Snapshot refresh failed - {error}")
@@ -1,10 +1,66 @@
+import logging
+import threading
+import time
+import weakref
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from feature_gate.actor import actor_id
+
+# Memos of the clients memoizing in the current context, keyed by client.
+# One module-level variable, since contexts keep every ContextVar alive.
+_memos = ContextVar("feature_gate_memos", default=None)
+
+# Adapter loggers only have to provide info(). Debug lines are written when
+# the logger has debug(), and skipped when it can say debug is disabled.
+def logs_debug(logger):
+  is_enabled_for = getattr(logger, "is_enabled_for", None)
+  if is_enabled_for is None:
+    return hasattr(logger, "debug")
+  return is_enabled_for(logging.DEBUG)
+
+# Holds one thread's check counts in Client._checks; when the thread ends
+# and drops it, _retire_checks folds the counts into the client's totals.
+class _ThreadChecks:
+  __slots__ = ("counts", "__weakref__")
+
+  def __init__(self):
+    self.counts = {}
+
+def _add_checks(totals, checks):
+  for feature, counts in checks.copy().items():
+    total = totals.setdefault(feature, [0, 0])
+    total[0] += counts[0]
+    total[1] += counts[1]
+
+def _retire_checks(lock, live, retired, key):
+  with lock:
+    _add_checks(retired, live.pop(key))
+
 class FeatureNotFound(ValueError):
   pass
 
+class ReadOnlyError(RuntimeError):
+  pass
+
+class UnsupportedGateError(NotImplementedError):
+  pass
+
 class Client:
-  def __init__(self, adapter):
+  def __init__(self, adapter, sampler=None, instrumenter=None):
     self.adapter = adapter
     self.logger = adapter.logger
+    self.sampler = sampler
+    self.instrumenter = instrumenter
+    # Feature key to [checks, enabled], one dict per thread so checks never
+    # contend on a lock; check_stats merges them with the counts of threads
+    # that have ended.
+    self._checks = threading.local()
+    self._thread_checks = {}
+    self._retired_checks = {}
+    self._checks_lock = threading.Lock()
+    # Totals as of the last reset, subtracted by check_stats.
+    self._checks_reset = {}
 
   def adapter(self):
     return self.adapter
@@ -14,64 +70,272 @@ class Client:
 
   def add(self, feature):
     response = self.adapter.add(feature)
+    self._expire_memo()
     self.logger.info("add feature", feature=feature, response=response)
     return response
 
   def remove(self, feature):
     response = self.adapter.remove(feature)
+    self._expire_memo()
     self.logger.info("remove feature", feature=feature, response=response)
     return response
 
   def features(self):
-    return self.adapter.features()
+    memo = self._memo()
+    if memo is None:
+      return self.adapter.features()
+    if memo["features"] is None:
+      memo["features"] = self.adapter.features()
+    return list(memo["features"])
+
+  def is_enabled(self, feature, actor=None):
+    memo = self._memo()
+    memo_key = feature if actor is None else (feature, actor_id(actor))
+    if memo is not None and memo_key in memo["flags"]:
+      response = memo["flags"][memo_key]
+    else:
+      started = None if self.instrumenter is None else time.perf_counter()
+      if actor is None:
+        response = self.adapter.is_enabled(feature)
+      else:
+        response = self.adapter.is_enabled(feature, actor)
+      if started is not None:
+        self.instrumenter("adapter_call", {"operation": "is_enabled", "duration": time.perf_counter() - started})
+      if memo is not None:
+        memo["flags"][memo_key] = response
+    if self.instrumenter is not None:
+      self.instrumenter("evaluation", {"feature": feature, "result": bool(response)})
+    checks = self._local_checks()
+    counts = checks.get(feature)
+    if counts is None:
+      counts = checks[feature] = [0, 0]
+    counts[0] += 1
+    if response:
+      counts[1] += 1
+    if logs_debug(self.logger) and (self.sampler is None or self.sampler(feature)):
+      self.logger.debug("feature is_enabled", feature=feature, actor=actor, response=response)
+    return response
 
-  def is_enabled(self, feature):
-    response = self.adapter.is_enabled(feature)
-    self.logger.info("feature is_enabled", feature=feature, response=response)
+  def check_stats(self, reset=False):
+    with self._checks_lock:
+      totals = {}
+      _add_checks(totals, self._retired_checks)
+      for checks in self._thread_checks.values():
+        _add_checks(totals, checks)
+      previous = self._checks_reset
+      if reset:
+        self._checks_reset = totals
+    stats = {}
+    for feature, (checks, enabled) in totals.items():
+      before = previous.get(feature, (0, 0))
+      if checks > before[0]:
+        stats[feature] = {"checks": checks - before[0], "enabled": enabled - before[1]}
+    return stats
+
+  def log_check_stats(self):
+    stats = self.check_stats(reset=True)
+    self.logger.info("feature checks", checks=stats)
+    return stats
+
+  def is_enabled_for_actors(self, feature, actors):
+    if hasattr(self.adapter, "is_enabled_for_actors"):
+      return self.adapter.is_enabled_for_actors(feature, actors)
+    return [self.adapter.is_enabled(feature, actor) for actor in actors]
+
+  def is_enabled_many(self, features):
+    memo = self._memo()
+    if memo is None:
+      response = self._is_enabled_many(features)
+    else:
+      missing = [feature for feature in features if feature not in memo["flags"]]
+      if missing:
+        memo["flags"].update(self._is_enabled_many(missing))
+      response = {feature: memo["flags"][feature] for feature in features}
+    if logs_debug(self.logger):
+      self.logger.debug("features is_enabled_many", features=features, response=response)
+    return response
+
+  def evaluate_all(self):
+    memo = self._memo()
+    if memo is not None and memo["all"]:
+      return {feature: memo["flags"][feature] for feature in memo["features"]}
+    if hasattr(self.adapter, "evaluate_all"):
+      response = self._instrument("evaluate_all", self.adapter.evaluate_all)
+    else:
+      response = self._is_enabled_many(self.features())
+    if memo is not None:
+      memo["flags"].update(response)
+      memo["features"] = list(response)
+      memo["all"] = True
     return response
 
   def enable(self, feature):
     response = self.adapter.enable(feature)
+    self._expire_memo()
     self.logger.info("enable feature", feature=feature, response=response)
     return response
 
   def disable(self, feature):
     response = self.adapter.disable(feature)
+    self._expire_memo()
     self.logger.info("disable feature", feature=feature, response=response)
     return response
 
-  # def enable_expression(self, expression):
-  #   raise NotImplementedError
+  def enable_expression(self, feature, expression):
+    self._check_supports("expression")
+    response = self.adapter.enable_expression(feature, expression)
+    self._expire_memo()
+    self.logger.info("enable expression", feature=feature, expression=expression, response=response)
+    return response
 
-  # def disable_expression(self, expression):
-  #   raise NotImplementedError
+  def disable_expression(self, feature):
+    self._check_supports("expression")
+    response = self.adapter.disable_expression(feature)
+    self._expire_memo()
+    self.logger.info("disable expression", feature=feature, response=response)
+    return response
 
-  # def expression(self):
-  #   raise NotImplementedError
+  def expression(self, feature):
+    self._check_supports("expression")
+    return self.adapter.expression(feature)
 
-  # def add_expression(self, expression):
-  #   raise NotImplementedError
+  def add_expression(self, feature, expression):
+    self._check_supports("expression")
+    response = self.adapter.add_expression(feature, expression)
+    self._expire_memo()
+    self.logger.info("add expression", feature=feature, expression=expression, response=response)
+    return response
 
-  # def remove_expression(self, expression):
-  #   raise NotImplementedError
+  def remove_expression(self, feature, expression):
+    self._check_supports("expression")
+    response = self.adapter.remove_expression(feature, expression)
+    self._expire_memo()
+    self.logger.info("remove expression", feature=feature, expression=expression, response=response)
+    return response
 
-  # def enable_actor(self, feature, actor):
-  #   raise NotImplementedError
+  def enable_actor(self, feature, actor):
+    response = self.adapter.enable_actor(feature, actor)
+    self._expire_memo()
+    self.logger.info("enable actor", feature=feature, actor=actor, response=response)
+    return response
 
-  # def disable_actor(self, feature, actor):
-  #   raise NotImplementedError
+  def disable_actor(self, feature, actor):
+    response = self.adapter.disable_actor(feature, actor)
+    self._expire_memo()
+    self.logger.info("disable actor", feature=feature, actor=actor, response=response)
+    return response
 
-  # def enable_group(self, feature, group):
-  #   raise NotImplementedError
+  def enable_group(self, feature, group):
+    response = self.adapter.enable_group(feature, group)
+    self._expire_memo()
+    self.logger.info("enable group", feature=feature, group=group, response=response)
+    return response
 
-  # def disable_group(self, feature, group):
-  #   raise NotImplementedError
+  def disable_group(self, feature, group):
+    response = self.adapter.disable_group(feature, group)
+    self._expire_memo()
+    self.logger.info("disable group", feature=feature, group=group, response=response)
+    return response
 
-  # def enable_percentage_of_actors(self, feature, percentage):
-  #   raise NotImplementedError
+  def enable_percentage_of_actors(self, feature, percentage):
+    response = self.adapter.enable_percentage_of_actors(feature, percentage)
+    self._expire_memo()
+    self.logger.info("enable percentage of actors", feature=feature, percentage=percentage, response=response)
+    return response
 
-  # def disable_percentage_of_actors(self, feature, percentage):
-  #   raise NotImplementedError
+  def disable_percentage_of_actors(self, feature):
+    response = self.adapter.disable_percentage_of_actors(feature)
+    self._expire_memo()
+    self.logger.info("disable percentage of actors", feature=feature, response=response)
+    return response
+
+  def do_export(self, fp):
+    # Imported here since transfer depends on the Posthog client, which
+    # imports FeatureNotFound from this module.
+    from feature_gate import transfer
+    count = transfer.dump(transfer.records(self.adapter), fp)
+    self.logger.info("export features", count=count)
+    return count
+
+  def do_import(self, fp, batch_size=100, max_workers=4, prune=False):
+    from feature_gate import transfer
+    response = transfer.apply(self.adapter, transfer.load(fp), batch_size=batch_size, max_workers=max_workers, prune=prune)
+    self._expire_memo()
+    self.logger.info("import features", response=response)
+    return response
+
+  def sync(self):
+    response = self.adapter.sync()
+    self._expire_memo()
+    self.logger.info("sync features", response=response)
+    return response
+
+  @contextmanager
+  def memoize(self):
+    if self._memo() is not None:
+      yield
+      return
+    memos = _memos.get() or {}
+    token = _memos.set({**memos, self: self._empty_memo()})
+    try:
+      yield
+    finally:
+      _memos.reset(token)
+
+  def is_memoizing(self):
+    return self._memo() is not None
+
+  def is_read_only(self):
+    if hasattr(self.adapter, "is_read_only"):
+      return self.adapter.is_read_only()
+    return False
+
+  def preload(self, features):
+    return self.is_enabled_many(features)
+
+  def preload_all(self):
+    return self.evaluate_all()
+
+  def _is_enabled_many(self, features):
+    if hasattr(self.adapter, "is_enabled_many"):
+      return self._instrument("is_enabled_many", self.adapter.is_enabled_many, features)
+    return {feature: self._instrument("is_enabled", self.adapter.is_enabled, feature) for feature in features}
+
+  def _instrument(self, operation, call, *args):
+    if self.instrumenter is None:
+      return call(*args)
+    started = time.perf_counter()
+    try:
+      return call(*args)
+    finally:
+      self.instrumenter("adapter_call", {"operation": operation, "duration": time.perf_counter() - started})
+
+  def _check_supports(self, gate):
+    if not hasattr(self.adapter, f"enable_{gate}"):
+      raise UnsupportedGateError(f"{type(self.adapter).__name__} does not support {gate} gates.")
+
+  def _local_checks(self):
+    try:
+      return self._checks.holder.counts
+    except AttributeError:
+      holder = self._checks.holder = _ThreadChecks()
+      with self._checks_lock:
+        self._thread_checks[id(holder)] = holder.counts
+      # The finalizer must not hold the client, or it would outlive it.
+      weakref.finalize(holder, _retire_checks, self._checks_lock, self._thread_checks, self._retired_checks, id(holder))
+      return holder.counts
+
+  def _memo(self):
+    memos = _memos.get()
+    return None if memos is None else memos.get(self)
+
+  def _empty_memo(self):
+    return {"flags": {}, "features": None, "all": False}
+
+  def _expire_memo(self):
+    memo = self._memo()
+    if memo is not None:
+      memo.update(self._empty_memo())
 
   # def enable_percentage_of_time(self, feature, percentage):
   #   raise NotImplementedError
@@ -85,32 +349,8 @@ class Client:
   # # def [](self):
   # #   raise NotImplementedError
 
-  # def preload(self):
-  #   raise NotImplementedError
-
-  # def preload_all(self):
-  #   raise NotImplementedError
-
   # def adapter(self):
   #   raise NotImplementedError
 
-  # def do_import(self):
-  #   raise NotImplementedError
-
-  # def do_export(self):
-  #   raise NotImplementedError
-
-  # def memoize(self):
-  #   raise NotImplementedError
-
-  # def is_memorizing(self):
-  #   raise NotImplementedError
-
-  # def is_read_only(self):
-  #   raise NotImplementedError
-
-  # def sync(self):
-  #   raise NotImplementedError
-
   # def sync_secret(self):
   #   raise NotImplementedError
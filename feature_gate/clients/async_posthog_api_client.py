@@ -0,0 +1,48 @@
+import asyncio
+import functools
+
+from concurrent.futures import ThreadPoolExecutor
+from feature_gate.clients.posthog_api_client import PosthogAPIClient
+
+class AsyncPosthogAPIClient:
+  def __init__(self, api_base=None, api_key=None, project_id=None, max_concurrency=10, **options):
+    # Requests run on a worker pool sized to the HTTP connection pool, so
+    # every in-flight call has a pooled keep-alive connection available.
+    self.client = PosthogAPIClient(api_base=api_base, api_key=api_key, project_id=project_id, pool_size=max_concurrency, **options)
+    self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="feature_gate")
+    self.logger = self.client.logger
+
+  def logger(self):
+    return self.logger
+
+  async def list_features(self, path=None):
+    return await self.run(self.client.list_features, path)
+
+  async def create_feature(self, name, description, deleted=False, active=False):
+    return await self.run(self.client.create_feature, name, description, deleted, active)
+
+  async def fetch_feature(self, key):
+    return await self.run(self.client.fetch_feature, key)
+
+  async def delete_feature(self, key):
+    return await self.run(self.client.delete_feature, key)
+
+  async def is_enabled(self, key):
+    return await self.run(self.client.is_enabled, key)
+
+  async def enable_feature(self, key):
+    return await self.run(self.client.enable_feature, key)
+
+  async def disable_feature(self, key):
+    return await self.run(self.client.disable_feature, key)
+
+  def connection_stats(self):
+    return self.client.connection_stats()
+
+  async def run(self, fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(self.executor, functools.partial(fn, *args))
+
+  def close(self):
+    self.executor.shutdown(wait=True)
+    self.client.close()
@@ -0,0 +1,121 @@
+import codecs
+import json
+
+# The flag fields adapters read; everything else in a list response is
+# dropped as each flag is decoded.
+FLAG_FIELDS = ("id", "key", "name", "active", "deleted", "filters", "updated_at", "ensure_experience_continuity")
+
+WHITESPACE = " \t\n\r"
+
+class IncompleteJSON(ValueError):
+  pass
+
+# Decodes a {"count": ..., "next": ..., "results": [...]} body from an
+# iterable of byte chunks, one result at a time, so no more than one flag's
+# worth of text and objects is held beyond the kept fields.
+def load_list(chunks, fields=FLAG_FIELDS, array="results"):
+  reader = _Reader(chunks)
+  reader.expect("{")
+  data = {}
+  if reader.peek() == "}":
+    reader.advance(1)
+    return data
+  while True:
+    key = reader.value()
+    reader.expect(":")
+    if key == array and reader.peek() == "[":
+      reader.advance(1)
+      data[key] = [_project(item, fields) for item in _items(reader)]
+    else:
+      data[key] = reader.value()
+    separator = reader.next_char()
+    if separator == "}":
+      return data
+    if separator != ",":
+      raise json.JSONDecodeError("Expecting ',' delimiter", reader.buffer, reader.pos - 1)
+
+def _items(reader):
+  if reader.peek() == "]":
+    reader.advance(1)
+    return
+  while True:
+    yield reader.value()
+    separator = reader.next_char()
+    if separator == "]":
+      return
+    if separator != ",":
+      raise json.JSONDecodeError("Expecting ',' delimiter", reader.buffer, reader.pos - 1)
+
+def _project(item, fields):
+  if not isinstance(item, dict) or fields is None:
+    return item
+  return {field: item[field] for field in fields if field in item}
+
+class _Reader:
+  def __init__(self, chunks):
+    self._chunks = iter(chunks)
+    self._decoder = codecs.getincrementaldecoder("utf-8")()
+    self._json = json.JSONDecoder()
+    self._exhausted = False
+    self.buffer = ""
+    self.pos = 0
+
+  def peek(self):
+    self._skip_whitespace()
+    return self.buffer[self.pos]
+
+  def advance(self, count):
+    self.pos += count
+
+  def next_char(self):
+    char = self.peek()
+    self.pos += 1
+    return char
+
+  def expect(self, char):
+    found = self.next_char()
+    if found != char:
+      raise json.JSONDecodeError(f"Expecting '{char}'", self.buffer, self.pos - 1)
+
+  def value(self):
+    self._skip_whitespace()
+    while True:
+      try:
+        value, end = self._json.raw_decode(self.buffer, self.pos)
+      except json.JSONDecodeError:
+        if not self._fill():
+          raise
+        continue
+      # A number at the very end of the buffer may continue in the next chunk.
+      if end == len(self.buffer) and self._fill():
+        continue
+      self.pos = end
+      self._compact()
+      return value
+
+  def _skip_whitespace(self):
+    while True:
+      while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+        self.pos += 1
+      if self.pos < len(self.buffer):
+        return
+      if not self._fill():
+        raise IncompleteJSON("Unexpected end of JSON stream")
+
+  def _compact(self):
+    # Drop decoded text so the buffer only ever holds the value in progress.
+    if self.pos > 65536 or self.pos * 2 > len(self.buffer):
+      self.buffer = self.buffer[self.pos:]
+      self.pos = 0
+
+  def _fill(self):
+    if self._exhausted:
+      return False
+    for chunk in self._chunks:
+      text = self._decoder.decode(chunk)
+      if text:
+        self.buffer += text
+        return True
+    self.buffer += self._decoder.decode(b"", final=True)
+    self._exhausted = True
+    return False
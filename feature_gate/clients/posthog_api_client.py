@@ -1,25 +1,40 @@
 import json
 import os
 import requests
-import structlog
+import time
 
-from pathlib import Path
+from datetime import date
+from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from feature_gate import log
 from feature_gate.client import FeatureNotFound
+from feature_gate.clients import json_stream
 
-from structlog.contextvars import (
-    bind_contextvars,
-    merge_contextvars,
-    bound_contextvars,
-)
+from structlog.contextvars import bound_contextvars
 
 class PosthogAPIClientError(Exception):
   pass
 
+class PosthogAPIResponseError(PosthogAPIClientError):
+  pass
+
 class RateLimitError(Exception):
   pass
 
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+# POST creates a flag, so it is not retried; PATCH only sets absolute values.
+RETRY_METHODS = ["GET", "PATCH"]
+# Listing only the flags changed at or after a point in time, oldest change
+# first and with deleted flags included, so removals are seen too. Posthog's
+# own list endpoint ignores these; PosthogAdapter notices and stops sending them.
+UPDATED_AFTER_PARAM = "updated_after"
+ORDER_PARAM = "order"
+INCLUDE_DELETED_PARAM = "include_deleted"
+STREAM_CHUNK_SIZE = 16384
+
 class PosthogAPIClient:
-  def __init__(self, api_base=None, api_key=None, project_id=None):
+  def __init__(self, api_base=None, api_key=None, project_id=None, pool_size=10, connect_timeout=3.05, read_timeout=10, max_retries=3, backoff_factor=0.5, session=None, logger=None, instrumenter=None, project_api_key=None, stream_lists=False):
     if api_base is None:
       self.api_base = os.environ.get("POSTHOG_API_BASE", "https://app.posthog.com")
     else:
@@ -35,22 +50,31 @@ class PosthogAPIClient:
     else:
       self.project_id = project_id
 
-    bind_contextvars(klass="PosthogAPIClient", project_id=project_id)
-    project_root = os.path.abspath(os.getenv('PROJECT_ROOT', '.'))
-    logs_dir_path = Path(project_root, 'logs')
-    logs_dir_path.mkdir(parents=True, exist_ok=True)
-    log_file = logs_dir_path.joinpath('development').with_suffix('.log').open('at')
-    structlog.configure(
-      processors=[
-        merge_contextvars,
-        structlog.processors.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.dict_tracebacks,
-        structlog.processors.JSONRenderer(),
-      ],
-      logger_factory=structlog.WriteLoggerFactory(file=log_file),
-    )
-    self.logger = structlog.get_logger()
+    # The project's public token, only needed for /decide.
+    if project_api_key is None:
+      self.project_api_key = os.environ.get('POSTHOG_PROJECT_API_KEY')
+    else:
+      self.project_api_key = project_api_key
+
+    self.timeout = (connect_timeout, read_timeout)
+    # Decode list pages flag by flag from the socket, keeping only the
+    # fields in json_stream.FLAG_FIELDS.
+    self.stream_lists = stream_lists
+    self.instrumenter = instrumenter
+    # Flag key to Posthog id, so mutations can PATCH without listing first.
+    self._ids = {}
+    self._index_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+    # Page path to the ETag, Last-Modified and response of its last 200.
+    self._validators = {}
+    self._conditional_stats = {"requests": 0, "not_modified": 0}
+    if session is None:
+      self.session = self._build_session(pool_size, max_retries, backoff_factor)
+    else:
+      self.session = session
+
+    if logger is None:
+      logger = log.get_logger()
+    self.logger = logger.bind(klass="PosthogAPIClient", project_id=self.project_id)
 
   def logger(self):
     return self.logger
@@ -64,11 +88,59 @@ class PosthogAPIClient:
   def project_id(self):
     return self.project_id
 
-  def list_features(self):
-    path = f'/api/projects/{self.project_id}/feature_flags'
+  def connection_stats(self):
+    requests_made = 0
+    connections_opened = 0
+    # The same HTTPAdapter is mounted for http:// and https://.
+    adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}
+    for adapter in adapters.values():
+      pools = adapter.poolmanager.pools
+      for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+          continue
+        requests_made += pool.num_requests
+        connections_opened += pool.num_connections
+    return {
+      "requests": requests_made,
+      "connections": connections_opened,
+      "reused": max(requests_made - connections_opened, 0)
+    }
+
+  def close(self):
+    self.session.close()
+
+  def list_features(self, path=None, params=None, conditional=False):
+    if path is None:
+      path = f'/api/projects/{self.project_id}/feature_flags'
+      if params:
+        path = f'{path}?{urlencode(params)}'
     with bound_contextvars(method="list_features"):
-      response = self._get(path)
-      return self._map_list_response("GET", path, response)
+      validator = self._validators.get(path) if conditional else None
+      response = self._get(path, self._conditional_headers(validator), stream=self.stream_lists)
+      # A streamed response holds its pooled connection until it is closed.
+      try:
+        if validator is not None:
+          self._conditional_stats["requests"] += 1
+          if response.status_code == 304:
+            self._conditional_stats["not_modified"] += 1
+            return dict(validator["response"], not_modified=True)
+        ret = self._map_list_response("GET", path, response)
+        if conditional and "data" in ret:
+          self._remember_validator(path, response, ret)
+        return ret
+      finally:
+        if self.stream_lists:
+          response.close()
+
+  def count_features(self):
+    response = self.list_features(params={"limit": 1})
+    if "errors" in response:
+      raise PosthogAPIResponseError(f"Posthog list request failed - {response['errors']}")
+    return response["count"]
+
+  def conditional_stats(self):
+    return dict(self._conditional_stats, validators=len(self._validators))
 
   def create_feature(self, name, description, deleted=False, active=False):
     with bound_contextvars(method="create_feature"):
@@ -80,27 +152,57 @@ class PosthogAPIClient:
         'active': active
       }
       response = self._post(path, payload)
+      ret = self._map_single_response("POST", path, response)
+      self._index_feature(ret.get("data"))
+      return ret
+
+  def decide(self, distinct_id, person_properties=None):
+    with bound_contextvars(method="decide"):
+      path = '/decide/?v=3'
+      payload = {
+        'token': self.project_api_key,
+        'distinct_id': distinct_id,
+        'person_properties': {key: value.isoformat() if isinstance(value, date) else value for key, value in (person_properties or {}).items()}
+      }
+      response = self._post(path, payload)
       return self._map_single_response("POST", path, response)
 
+  def iter_features(self, params=None, conditional=False):
+    for page in self.iter_pages(params, conditional):
+      yield from page["data"] or []
+
+  def iter_pages(self, params=None, conditional=False):
+    path = None
+    while True:
+      response = self.list_features(path, params if path is None else None, conditional)
+      if "errors" in response:
+        raise PosthogAPIResponseError(f"Posthog list request failed - {response['errors']}")
+      yield response
+      path = response["pagination"]["next"]
+      if path is None:
+        return
+
+  def iter_features_updated_since(self, updated_at):
+    params = {UPDATED_AFTER_PARAM: updated_at, ORDER_PARAM: "updated_at", INCLUDE_DELETED_PARAM: "true"}
+    return self.iter_features(params)
+
   def fetch_feature(self, key):
-    features = self.list_features().get("data", [])
-    for entry in features:
+    feature = self._fetch_indexed(key)
+    if feature is not None:
+      return feature
+    try:
+      for entry in self.iter_features():
         if "key" in entry and entry["key"] == key:
-            return entry
+          return entry
+    except PosthogAPIResponseError:
+      pass
     return None
 
   def delete_feature(self, key):
-    feature = self.fetch_feature(key)
-    if feature == None:
-      raise FeatureNotFound(f"Feature {key} not found")
-    else:
-      path = f'/api/projects/{self.project_id}/feature_flags/{feature["id"]}'
-      with bound_contextvars(method="delete_feature"):
-        payload = {
-          'deleted': True
-        }
-        response = self._patch(path, payload)
-        return self._map_single_response("PATCH", path, response)
+    with bound_contextvars(method="delete_feature"):
+      ret = self.update_feature(key, {'deleted': True})
+      self._ids.pop(key, None)
+      return ret
 
   def is_enabled(self, key):
     feature = self.fetch_feature(key)
@@ -110,51 +212,100 @@ class PosthogAPIClient:
       return feature["active"]
 
   def enable_feature(self, key):
-    feature = self.fetch_feature(key)
-    if feature == None:
-      raise FeatureNotFound(f"Feature {key} not found")
-    else:
-      path = f'/api/projects/{self.project_id}/feature_flags/{feature["id"]}'
-      with bound_contextvars(method="enable_feature"):
-        payload = {
-          'active': True
-        }
-        response = self._patch(path, payload)
-        return self._map_single_response("PATCH", path, response)
+    with bound_contextvars(method="enable_feature"):
+      return self.update_feature(key, {'active': True})
 
   def disable_feature(self, key):
+    with bound_contextvars(method="disable_feature"):
+      return self.update_feature(key, {'active': False})
+
+  def update_feature(self, key, payload):
+    feature_id = self.feature_id(key)
+    if feature_id == None:
+      raise FeatureNotFound(f"Feature {key} not found")
+    response = self._patch(self._feature_path(feature_id), payload)
+    if self._check_status_not_found(response.status_code):
+      # The cached id is stale, the flag was deleted or recreated elsewhere.
+      self._invalidate_id(key)
+      feature_id = self.feature_id(key)
+      if feature_id == None:
+        raise FeatureNotFound(f"Feature {key} not found")
+      response = self._patch(self._feature_path(feature_id), payload)
+    return self._map_single_response("PATCH", self._feature_path(feature_id), response)
+
+  def feature_id(self, key):
+    feature_id = self._ids.get(key)
+    if feature_id is not None:
+      self._index_stats["hits"] += 1
+      return feature_id
+    self._index_stats["misses"] += 1
     feature = self.fetch_feature(key)
     if feature == None:
-      raise FeatureNotFound(f"Feature {key} not found")
+      return None
+    return feature["id"]
+
+  # Like feature_id, but a cached id is confirmed with a request for that
+  # flag first, since another process may have deleted it.
+  def verified_feature_id(self, key):
+    feature = self._fetch_indexed(key)
+    if feature is not None:
+      return feature["id"]
+    return self.feature_id(key)
+
+  def index_stats(self):
+    # Every hit is a list request that a mutation did not have to make.
+    return dict(self._index_stats, size=len(self._ids), requests_saved=self._index_stats["hits"])
+
+  def _feature_path(self, feature_id):
+    return f'/api/projects/{self.project_id}/feature_flags/{feature_id}'
+
+  def _index_feature(self, feature):
+    if not feature or "key" not in feature or "id" not in feature:
+      return
+    if feature.get("deleted"):
+      self._ids.pop(feature["key"], None)
     else:
-      path = f'/api/projects/{self.project_id}/feature_flags/{feature["id"]}'
-      with bound_contextvars(method="disable_feature"):
-        payload = {
-          'active': False
-        }
-        response = self._patch(path, payload)
-        return self._map_single_response("PATCH", path, response)
+      self._ids[feature["key"]] = feature["id"]
+
+  # One request for the flag at its indexed id instead of a list scan. None
+  # when the id is unknown, or now belongs to a deleted or different flag.
+  def _fetch_indexed(self, key):
+    feature_id = self._ids.get(key)
+    if feature_id is None:
+      return None
+    path = self._feature_path(feature_id)
+    feature = self._map_single_response("GET", path, self._get(path)).get("data")
+    if feature is not None and feature.get("key") == key and not feature.get("deleted"):
+      return feature
+    self._invalidate_id(key)
+    return None
+
+  def _invalidate_id(self, key):
+    if self._ids.pop(key, None) is not None:
+      self._index_stats["invalidations"] += 1
 
-  def _get(self, path):
+  def _get(self, path, extra_headers=None, stream=False):
     try:
-      return self.__get(path)
-    except requests.ConnectionError as err:
+      return self.__get(path, extra_headers, stream)
+    except (requests.ConnectionError, requests.Timeout) as err:
       self._log_posthog_connection_error(err)
 
-  def __get(self, path):
+  def __get(self, path, extra_headers=None, stream=False):
     with bound_contextvars(method="get"):
-      url = f"{self.api_base}{path}"
-      headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {self.api_key}"
-      }
-      response = requests.get(url, headers=headers)
+      url = self._url(path)
+      headers = self._get_headers()
+      if extra_headers:
+        headers.update(extra_headers)
+      if stream:
+        response = self._send("GET", self.session.get, url, headers=headers, timeout=self.timeout, stream=True)
+      else:
+        response = self._send("GET", self.session.get, url, headers=headers, timeout=self.timeout)
       return response
 
   def _post(self, path, payload):
     try:
       return self.__post(path, payload)
-    except requests.ConnectionError as err:
+    except (requests.ConnectionError, requests.Timeout) as err:
       self._log_posthog_connection_error(err)
 
   def __post(self, path, payload):
@@ -162,13 +313,13 @@ class PosthogAPIClient:
     with bound_contextvars(method="post", url=url):
       json_payload = json.dumps(payload)
       headers = self._get_headers()
-      response = requests.post(url, data=json_payload, headers=headers)
+      response = self._send("POST", self.session.post, url, data=json_payload, headers=headers, timeout=self.timeout)
       return response
 
   def _patch(self, path, payload):
     try:
       return self.__patch(path, payload)
-    except requests.ConnectionError as err:
+    except (requests.ConnectionError, requests.Timeout) as err:
       self._log_posthog_connection_error(err)
 
   def __patch(self, path, payload):
@@ -176,8 +327,62 @@ class PosthogAPIClient:
     with bound_contextvars(method="patch", url=url):
       json_payload = json.dumps(payload)
       headers = self._get_headers()
-      response = requests.patch(url, data=json_payload, headers=headers)
+      response = self._send("PATCH", self.session.patch, url, data=json_payload, headers=headers, timeout=self.timeout)
+      return response
+
+  def _send(self, method, send, url, **kwargs):
+    if self.instrumenter is None:
+      return send(url, **kwargs)
+    started = time.perf_counter()
+    status = "error"
+    try:
+      response = send(url, **kwargs)
+      status = response.status_code
       return response
+    finally:
+      self.instrumenter("http_request", {"method": method, "status": status, "duration": time.perf_counter() - started})
+
+  def _conditional_headers(self, validator):
+    if validator is None:
+      return None
+    headers = {}
+    if validator["etag"] is not None:
+      headers["If-None-Match"] = validator["etag"]
+    if validator["last_modified"] is not None:
+      headers["If-Modified-Since"] = validator["last_modified"]
+    return headers
+
+  def _remember_validator(self, path, response, ret):
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not isinstance(etag, str):
+      etag = None
+    if not isinstance(last_modified, str):
+      last_modified = None
+    if etag is None and last_modified is None:
+      self._validators.pop(path, None)
+    else:
+      self._validators[path] = {"etag": etag, "last_modified": last_modified, "response": ret}
+
+  def _build_session(self, pool_size, max_retries, backoff_factor):
+    retry = Retry(
+      total=max_retries,
+      status_forcelist=RETRY_STATUSES,
+      allowed_methods=RETRY_METHODS,
+      backoff_factor=backoff_factor,
+      respect_retry_after_header=True,
+      raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+  def _url(self, path):
+    if path.startswith("http://") or path.startswith("https://"):
+      return path
+    return f"{self.api_base}{path}"
 
   def _get_headers(self):
     return {
@@ -188,6 +393,9 @@ class PosthogAPIClient:
   def _check_status_ok(self, code):
     return code == 200 or code == 201
 
+  def _check_status_not_found(self, code):
+    return code == 404
+
   def _check_status_too_many_requests(self, code):
     return code == 429
 
@@ -195,7 +403,7 @@ class PosthogAPIClient:
     ret = None
     if self._check_status_ok(response.status_code):
       data = response.json()
-      self.logger.info("request successful", method=method, path=path, status_code=response.status_code, response=data)
+      self.logger.debug("request successful", method=method, path=path, status_code=response.status_code, response=data)
       ret = self._map_single_response_success(data)
     elif self._check_status_too_many_requests(response.status_code):
       data = response.json()
@@ -210,9 +418,12 @@ class PosthogAPIClient:
   def _map_list_response(self, method, path, response):
     ret = None
     if self._check_status_ok(response.status_code):
-      data = response.json()
-      self.logger.info("request successful", method=method, path=path, status_code=response.status_code, response=data)
+      data = self._decode_list(response)
+      # A page holds every flag's filters; log its size, not its body.
+      self.logger.debug("request successful", method=method, path=path, status_code=response.status_code, count=len(data.get("results") or []))
       ret = self._map_list_response_success(data)
+      for feature in ret["data"] or []:
+        self._index_feature(feature)
     elif self._check_status_too_many_requests(response.status_code):
       data = response.json()
       self.logger.info("request failed", method=method, path=path, status_code=response.status_code, response=data)
@@ -223,6 +434,14 @@ class PosthogAPIClient:
       ret = self._map_error_response(response.status_code, data)
     return ret
 
+  def _decode_list(self, response):
+    if not self.stream_lists:
+      return response.json()
+    try:
+      return json_stream.load_list(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+    except ValueError as err:
+      raise PosthogAPIClientError(f"Posthog list response could not be decoded - {err}")
+
   def _map_error_response(self, code, data):
     return {
       "errors": [
@@ -243,6 +462,7 @@ class PosthogAPIClient:
   def _map_list_response_success(self, data):
     return {
       "data": data.get("results"),
+      "count": data.get("count"),
       "pagination": {
         "next": data.get("next"),
         "previous": data.get("previous")
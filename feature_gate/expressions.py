@@ -0,0 +1,152 @@
+import functools
+import json
+import operator
+
+class InvalidExpression(ValueError):
+  pass
+
+COMPARISONS = {
+  "Equal": operator.eq,
+  "NotEqual": operator.ne,
+  "GreaterThan": operator.gt,
+  "GreaterThanOrEqualTo": operator.ge,
+  "LessThan": operator.lt,
+  "LessThanOrEqualTo": operator.le,
+}
+
+CONVERSIONS = {
+  "Boolean": bool,
+  "Number": float,
+  "String": str,
+}
+
+def properties_for(actor):
+  return getattr(actor, "properties", None) or {}
+
+def evaluate(expression, properties):
+  # Reference interpreter that walks the expression on every call. Used to
+  # check compiled expressions and as the baseline in benchmarks.
+  if not isinstance(expression, dict):
+    return expression
+  name, args = _unpack(expression)
+  if name == "Any":
+    return any(evaluate(arg, properties) for arg in args)
+  if name == "All":
+    return all(evaluate(arg, properties) for arg in args)
+  if name == "Property":
+    return properties.get(evaluate(args[0], properties))
+  if name in CONVERSIONS:
+    return _convert(CONVERSIONS[name], evaluate(args[0], properties))
+  if name in COMPARISONS:
+    return _compare(COMPARISONS[name], evaluate(args[0], properties), evaluate(args[1], properties))
+  raise InvalidExpression(f"Unknown expression {name}")
+
+def compile(expression):
+  return _compile_json(json.dumps(expression, sort_keys=True))
+
+@functools.lru_cache(maxsize=1024)
+def _compile_json(expression_json):
+  return _compile(json.loads(expression_json))
+
+def _compile(expression):
+  if not isinstance(expression, dict):
+    return lambda properties: expression
+  name, args = _unpack(expression)
+  if name == "Any":
+    return _compile_any([_compile(arg) for arg in args])
+  if name == "All":
+    return _compile_all([_compile(arg) for arg in args])
+  if name == "Property":
+    return _compile_property(args)
+  if name in CONVERSIONS:
+    _check_arity(name, args, 1)
+    convert = CONVERSIONS[name]
+    value = _compile(args[0])
+    return lambda properties: _convert(convert, value(properties))
+  if name in COMPARISONS:
+    return _compile_comparison(name, args)
+  raise InvalidExpression(f"Unknown expression {name}")
+
+def _compile_any(children):
+  def any_of(properties):
+    for child in children:
+      if child(properties):
+        return True
+    return False
+  return any_of
+
+def _compile_all(children):
+  def all_of(properties):
+    for child in children:
+      if not child(properties):
+        return False
+    return True
+  return all_of
+
+def _compile_property(args):
+  _check_arity("Property", args, 1)
+  if isinstance(args[0], dict):
+    name = _compile(args[0])
+    return lambda properties: properties.get(name(properties))
+  name = args[0]
+  return lambda properties: properties.get(name)
+
+def _compile_comparison(name, args):
+  _check_arity(name, args, 2)
+  compare = COMPARISONS[name]
+  left, right = args
+  # The common shape is a property compared to a constant, which compiles to
+  # a single dict lookup and comparison.
+  if _is_property(left) and not isinstance(right, dict):
+    key = left["Property"][0] if isinstance(left["Property"], list) else left["Property"]
+    return lambda properties: _compare(compare, properties.get(key), right)
+  left_value = _compile(left)
+  right_value = _compile(right)
+  return lambda properties: _compare(compare, left_value(properties), right_value(properties))
+
+def _is_property(expression):
+  if not isinstance(expression, dict) or list(expression) != ["Property"]:
+    return False
+  args = expression["Property"]
+  key = args[0] if isinstance(args, list) and len(args) == 1 else args
+  return isinstance(key, str)
+
+def _compare(compare, left, right):
+  try:
+    return compare(left, right)
+  except TypeError:
+    return False
+
+def _convert(convert, value):
+  try:
+    return convert(value)
+  except (TypeError, ValueError):
+    return None
+
+def _unpack(expression):
+  if len(expression) != 1:
+    raise InvalidExpression(f"Expression must have exactly one operator, got {list(expression)}")
+  name, args = next(iter(expression.items()))
+  if not isinstance(args, list):
+    args = [args]
+  return name, args
+
+def _check_arity(name, args, arity):
+  if len(args) != arity:
+    raise InvalidExpression(f"{name} takes {arity} argument(s), got {len(args)}")
+
+def add(expression, other):
+  if expression is None:
+    return other
+  if list(expression) == ["Any"]:
+    args = expression["Any"] if isinstance(expression["Any"], list) else [expression["Any"]]
+    return {"Any": args + [other]}
+  return {"Any": [expression, other]}
+
+def remove(expression, other):
+  if expression is None or expression == other:
+    return None
+  if list(expression) == ["Any"]:
+    args = expression["Any"] if isinstance(expression["Any"], list) else [expression["Any"]]
+    return {"Any": [arg for arg in args if arg != other]}
+  return expression
@@ -1,8 +1,12 @@
+import sys
+
 class Feature:
+  __slots__ = ("_name", "_key", "_description")
+
   def __init__(self, name, key, description):
-    self._name = name
-    self._key = key
-    self._description = description
+    object.__setattr__(self, "_name", name)
+    object.__setattr__(self, "_key", sys.intern(key) if isinstance(key, str) else key)
+    object.__setattr__(self, "_description", description)
 
   @property
   def name(self):
@@ -15,3 +19,23 @@ class Feature:
   @property
   def description(self):
     return self._description
+
+  def __setattr__(self, name, value):
+    raise AttributeError(f"{type(self).__name__} is immutable")
+
+  def __delattr__(self, name):
+    raise AttributeError(f"{type(self).__name__} is immutable")
+
+  def __eq__(self, other):
+    if not isinstance(other, Feature):
+      return NotImplemented
+    return self._key == other._key
+
+  def __hash__(self):
+    return hash(self._key)
+
+  def __reduce__(self):
+    return (Feature, (self._name, self._key, self._description))
+
+  def __repr__(self):
+    return f"Feature(name={self._name!r}, key={self._key!r}, description={self._description!r})"
@@ -0,0 +1,158 @@
+import sys
+
+from feature_gate import expressions, groups, rollout, transfer
+from feature_gate.actor import actor_id
+
+FIELDS = ("key", "name", "description", "enabled", "actors", "groups", "expression", "percentage")
+
+# Most flags have no group gate, so they share one empty set and one
+# compiled empty GroupSet.
+NO_NAMES = frozenset()
+NO_GROUPS = groups.GroupSet()
+
+class FlagState:
+  __slots__ = ("key", "name", "description", "enabled", "actor_layers", "groups", "expression", "percentage", "group_set", "compiled_expression")
+
+  def __init__(self, key, name=None, description="", enabled=False, actors=(), groups=(), expression=None, percentage=0, group_set=None, compiled_expression=None, actor_layers=None):
+    init = object.__setattr__
+    init(self, "key", sys.intern(key) if isinstance(key, str) else key)
+    init(self, "name", key if name is None else name)
+    init(self, "description", description)
+    init(self, "enabled", bool(enabled))
+    if actor_layers is None:
+      actors = frozenset(actors)
+      actor_layers = (actors,) if actors else ()
+    init(self, "actor_layers", actor_layers)
+    init(self, "groups", frozenset(groups) if groups else NO_NAMES)
+    init(self, "expression", expression)
+    init(self, "percentage", percentage)
+    if group_set is None:
+      group_set = _group_set(self.groups)
+    init(self, "group_set", group_set)
+    if compiled_expression is None and expression is not None:
+      compiled_expression = expressions.compile(expression)
+    init(self, "compiled_expression", compiled_expression)
+
+  @classmethod
+  def from_record(cls, entry):
+    gates = entry["gates"]
+    return cls(
+      entry["key"],
+      entry.get("name"),
+      entry.get("description", ""),
+      enabled=gates["boolean"],
+      actors=gates["actors"],
+      groups=gates["groups"],
+      expression=gates["expression"],
+      percentage=gates["percentage_of_actors"],
+    )
+
+  # Actor ids are kept as a few frozensets of decreasing size, merged like a
+  # binary counter, so adding one actor copies O(log n) ids on average.
+  @property
+  def actors(self):
+    layers = self.actor_layers
+    if len(layers) <= 1:
+      return layers[0] if layers else NO_NAMES
+    return NO_NAMES.union(*layers)
+
+  def with_actor(self, id):
+    layers = self.actor_layers
+    if any(id in layer for layer in layers):
+      return self
+    layers = list(layers)
+    layer = frozenset((id,))
+    while layers and len(layers[-1]) <= len(layer):
+      layer = layers.pop() | layer
+    layers.append(layer)
+    return self.replace(actor_layers=tuple(layers))
+
+  def without_actor(self, id):
+    if not any(id in layer for layer in self.actor_layers):
+      return self
+    return self.replace(actors=self.actors - {id})
+
+  def replace(self, **changes):
+    fields = {name: getattr(self, name) for name in FIELDS if name != "actors"}
+    fields.update(changes)
+    # Compiled gates carry over unless the gate they compile changed.
+    if "actors" not in changes and "actor_layers" not in changes:
+      fields["actor_layers"] = self.actor_layers
+    if "groups" not in changes:
+      fields["group_set"] = self.group_set
+    if "expression" not in changes:
+      fields["compiled_expression"] = self.compiled_expression
+    return FlagState(**fields)
+
+  def disabled(self):
+    return FlagState(self.key, self.name, self.description)
+
+  # rollout buckets the percentage of actors gate; anything with the
+  # is_actor_enabled and enabled_actors functions of feature_gate.rollout.
+  def is_enabled(self, actor=None, rollout=rollout):
+    if self.enabled:
+      return True
+    if actor is None:
+      return False
+    id = actor_id(actor)
+    for layer in self.actor_layers:
+      if id in layer:
+        return True
+    if self.group_set and self.group_set(actor):
+      return True
+    expression = self.compiled_expression
+    if expression is not None and expression(expressions.properties_for(actor)):
+      return True
+    percentage = self.percentage
+    return percentage > 0 and rollout.is_actor_enabled(self.key, percentage, id)
+
+  def is_enabled_for_actors(self, actors, rollout=rollout):
+    if self.enabled:
+      return [True] * len(actors)
+    ids = [actor_id(actor) for actor in actors]
+    enabled = rollout.enabled_actors(self.key, self.percentage, ids)
+    for layer in self.actor_layers:
+      enabled = [on or id in layer for on, id in zip(enabled, ids)]
+    if self.group_set:
+      group_set = self.group_set
+      enabled = [on or group_set(actor) for on, actor in zip(enabled, actors)]
+    expression = self.compiled_expression
+    if expression is not None:
+      properties_for = expressions.properties_for
+      enabled = [on or bool(expression(properties_for(actor))) for on, actor in zip(enabled, actors)]
+    return enabled
+
+  def to_record(self):
+    return transfer.record(
+      self.key,
+      self.name,
+      self.description,
+      boolean=self.enabled,
+      actors=sorted(self.actors),
+      groups=sorted(self.groups),
+      percentage_of_actors=self.percentage,
+      expression=self.expression,
+    )
+
+  def __setattr__(self, name, value):
+    raise AttributeError("FlagState is immutable, use replace()")
+
+  def __delattr__(self, name):
+    raise AttributeError("FlagState is immutable, use replace()")
+
+  def __eq__(self, other):
+    if not isinstance(other, FlagState):
+      return NotImplemented
+    return self.key == other.key
+
+  def __hash__(self):
+    return hash(self.key)
+
+  def __reduce__(self):
+    return (FlagState, tuple(getattr(self, name) for name in FIELDS))
+
+  def __repr__(self):
+    return f"FlagState(key={self.key!r}, enabled={self.enabled!r}, actors={len(self.actors)}, groups={sorted(self.groups)!r}, percentage={self.percentage!r})"
+
+def _group_set(names):
+  return groups.GroupSet(names) if names else NO_GROUPS
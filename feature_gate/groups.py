@@ -0,0 +1,54 @@
+class GroupNotRegistered(ValueError):
+  pass
+
+_registry = {}
+_version = 0
+
+def register(name, predicate):
+  global _version
+  _registry[name] = predicate
+  _version += 1
+
+def unregister(name):
+  global _version
+  _registry.pop(name, None)
+  _version += 1
+
+def is_registered(name):
+  return name in _registry
+
+def registered():
+  return list(_registry)
+
+def check_registered(name):
+  if name not in _registry:
+    raise GroupNotRegistered(f"Group {name} is not registered.")
+  return name
+
+class GroupSet:
+  __slots__ = ("names", "_version", "_match")
+
+  def __init__(self, names=()):
+    self.names = frozenset(names)
+    self._version = None
+    self._match = None
+
+  def __call__(self, actor):
+    # Predicates are looked up once and reused until the registry changes.
+    if self._version != _version:
+      self._compile()
+    return self._match(actor)
+
+  def __bool__(self):
+    return bool(self.names)
+
+  def _compile(self):
+    predicates = tuple(_registry[name] for name in sorted(self.names) if name in _registry)
+    if not predicates:
+      self._match = lambda actor: False
+    elif len(predicates) == 1:
+      predicate = predicates[0]
+      self._match = lambda actor: bool(predicate(actor))
+    else:
+      self._match = lambda actor: any(predicate(actor) for predicate in predicates)
+    self._version = _version
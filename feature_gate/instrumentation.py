@@ -0,0 +1,110 @@
+import bisect
+import threading
+
+# Upper bounds in seconds, from an in-process lookup to a slow HTTP call.
+LATENCY_BUCKETS = (0.00001, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# An instrumenter is any callable taking (event, payload). Events:
+#   evaluation    feature, result    one per Client.is_enabled
+#   adapter_call  operation, duration  one per adapter read made by Client
+#   http_request  method, status, duration  one per Posthog API request
+#   cache         result (hit, stale or miss)  one per snapshot cache read
+class Metrics:
+  def __init__(self, buckets=LATENCY_BUCKETS):
+    self.buckets = tuple(buckets)
+    self._lock = threading.Lock()
+    self._counters = {}
+    self._histograms = {}
+
+  def __call__(self, event, payload):
+    if event == "evaluation":
+      self._count("feature_gate_evaluations_total", (("feature", payload["feature"]), ("result", "true" if payload["result"] else "false")))
+    elif event == "adapter_call":
+      self._observe("feature_gate_adapter_duration_seconds", (("operation", payload["operation"]),), payload["duration"])
+    elif event == "http_request":
+      self._count("feature_gate_http_requests_total", (("method", payload["method"]), ("status", str(payload["status"]))))
+      self._observe("feature_gate_http_request_duration_seconds", (("method", payload["method"]),), payload["duration"])
+    elif event == "cache":
+      self._count("feature_gate_cache_requests_total", (("result", payload["result"]),))
+
+  def counter(self, name, **labels):
+    return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+  def histogram(self, name, **labels):
+    with self._lock:
+      values = self._histograms.get((name, tuple(sorted(labels.items()))))
+      if values is None:
+        return None
+      return {"buckets": dict(zip(self.buckets, values[:-2])), "sum": values[-2], "count": values[-1]}
+
+  def evaluations(self, feature):
+    enabled = self.counter("feature_gate_evaluations_total", feature=feature, result="true")
+    disabled = self.counter("feature_gate_evaluations_total", feature=feature, result="false")
+    return {"count": enabled + disabled, "true_ratio": enabled / (enabled + disabled) if enabled + disabled else None}
+
+  def cache_hit_rate(self):
+    counts = {result: self.counter("feature_gate_cache_requests_total", result=result) for result in ("hit", "stale", "miss")}
+    total = sum(counts.values())
+    if not total:
+      return None
+    # A stale read is still served from the snapshot without waiting.
+    return (counts["hit"] + counts["stale"]) / total
+
+  def reset(self):
+    with self._lock:
+      self._counters = {}
+      self._histograms = {}
+
+  def prometheus(self):
+    with self._lock:
+      counters = sorted(self._counters.items())
+      histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+    lines = []
+    typed = set()
+    for (name, labels), value in counters:
+      if name not in typed:
+        typed.add(name)
+        lines.append(f"# TYPE {name} counter")
+      lines.append(f"{name}{_labels(labels)} {value}")
+    for (name, labels), values in histograms:
+      if name not in typed:
+        typed.add(name)
+        lines.append(f"# TYPE {name} histogram")
+      cumulative = 0
+      for bound, count in zip(self.buckets, values[:-2]):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+      lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+      lines.append(f"{name}_sum{_labels(labels)} {_number(values[-2])}")
+      lines.append(f"{name}_count{_labels(labels)} {values[-1]}")
+    return "\n".join(lines) + "\n"
+
+  def _count(self, name, labels):
+    key = (name, labels)
+    with self._lock:
+      self._counters[key] = self._counters.get(key, 0) + 1
+
+  def _observe(self, name, labels, duration):
+    key = (name, labels)
+    index = bisect.bisect_left(self.buckets, duration)
+    with self._lock:
+      values = self._histograms.get(key)
+      if values is None:
+        # One count per bucket, then sum and count.
+        values = self._histograms[key] = [0] * len(self.buckets) + [0.0, 0]
+      if index < len(self.buckets):
+        values[index] += 1
+      values[-2] += duration
+      values[-1] += 1
+
+def _labels(labels):
+  if not labels:
+    return ""
+  pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+  return f"{{{pairs}}}"
+
+def _escape(value):
+  return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value):
+  return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,114 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+import structlog
+
+from pathlib import Path
+from structlog.contextvars import merge_contextvars
+
+LOGGER_NAME = "feature_gate"
+
+_logger = None
+_listener = None
+
+def configure(mode="stdlib", level=None, path=None, handler=None):
+  global _logger, _listener
+  shutdown()
+  if mode == "null":
+    # Everything below CRITICAL is a no-op; CRITICAL is returned, not written.
+    _logger = structlog.wrap_logger(
+      structlog.ReturnLogger(),
+      processors=[],
+      wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL),
+    ).bind()
+  elif mode == "stdlib":
+    stdlib_logger = logging.getLogger(LOGGER_NAME)
+    if not stdlib_logger.handlers:
+      stdlib_logger.addHandler(logging.NullHandler())
+    _logger = _wrap(stdlib_logger, level)
+  elif mode == "queue":
+    if handler is None:
+      if path is None:
+        path = Path("logs").joinpath(LOGGER_NAME).with_suffix(".log")
+      Path(path).parent.mkdir(parents=True, exist_ok=True)
+      handler = logging.FileHandler(path, mode="a", delay=True)
+    # Records are handed to a queue and written by a listener thread, so
+    # logging never blocks the caller on I/O.
+    records = queue.SimpleQueue()
+    stdlib_logger = logging.getLogger(f"{LOGGER_NAME}.queue")
+    stdlib_logger.handlers = [logging.handlers.QueueHandler(records)]
+    stdlib_logger.propagate = False
+    stdlib_logger.setLevel(logging.DEBUG)
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+    _logger = _wrap(stdlib_logger, logging.INFO if level is None else level)
+  else:
+    raise ValueError(f"Unknown logging mode {mode}")
+  return _logger
+
+def get_logger(**initial_values):
+  if _logger is None:
+    configure()
+  if initial_values:
+    return _logger.bind(**initial_values)
+  return _logger
+
+def shutdown():
+  global _listener
+  if _listener is not None:
+    _listener.stop()
+    _listener = None
+
+class Sampler:
+  def __init__(self, every=1, first=None, interval=60, clock=time.monotonic):
+    self.every = every
+    self.first = first
+    self.interval = interval
+    self.clock = clock
+    self._lock = threading.Lock()
+    self._calls = 0
+    self._windows = {}
+
+  # Keep 1 in every `every` calls, and at most `first` per key per interval.
+  def __call__(self, key):
+    with self._lock:
+      self._calls += 1
+      if self._calls % self.every:
+        return False
+      if self.first is None:
+        return True
+      now = self.clock()
+      started_at, count = self._windows.get(key, (None, 0))
+      if started_at is None or now - started_at >= self.interval:
+        started_at, count = now, 0
+      if count >= self.first:
+        return False
+      self._windows[key] = (started_at, count + 1)
+      return True
+
+# Without a level, every call asks the stdlib logger, so levels the app
+# sets after feature_gate is configured still apply.
+def _wrap(logger, level):
+  if level is None:
+    filters = [structlog.stdlib.filter_by_level]
+    wrapper_class = structlog.stdlib.BoundLogger
+  else:
+    filters = []
+    wrapper_class = structlog.make_filtering_bound_logger(level)
+  return structlog.wrap_logger(
+    logger,
+    processors=filters + [
+      merge_contextvars,
+      structlog.processors.add_log_level,
+      structlog.processors.TimeStamper(fmt="iso"),
+      structlog.processors.dict_tracebacks,
+      structlog.processors.JSONRenderer(),
+    ],
+    wrapper_class=wrapper_class,
+  ).bind()
+
+atexit.register(shutdown)
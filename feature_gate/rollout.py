@@ -0,0 +1,52 @@
+import hashlib
+import sys
+
+# Recorded by adapters that store percentage gates, so readers bucket actors
+# the way the writer did; see by_name().
+NAME = "feature_gate"
+
+# Buckets per percent, so rollouts can be set to a thousandth of a percent.
+SCALE = 1_000
+BUCKETS = 100 * SCALE
+
+def validate_percentage(percentage):
+  if not 0 <= percentage <= 100:
+    raise ValueError(f"Percentage must be between 0 and 100, got {percentage}")
+  return percentage
+
+# The separator keeps ("ab", "1") and ("a", "b1") apart, and a keyed digest
+# (unlike crc32, which is linear) keeps buckets for different flags unrelated.
+def bucket(feature_key, actor_id):
+  digest = hashlib.blake2b(f"{feature_key}.{actor_id}".encode(), digest_size=8).digest()
+  return int.from_bytes(digest, "big") % BUCKETS
+
+def is_actor_enabled(feature_key, percentage, actor_id):
+  # Actors are enabled when their bucket falls under the threshold, so raising
+  # the percentage only ever adds actors and never reshuffles enabled ones.
+  return bucket(feature_key, actor_id) < percentage * SCALE
+
+def enabled_actors(feature_key, percentage, actor_ids):
+  threshold = percentage * SCALE
+  if threshold <= 0:
+    return [False] * len(actor_ids)
+  if threshold >= BUCKETS:
+    return [True] * len(actor_ids)
+  # The feature key prefix is hashed once and each actor continues from a
+  # copy, which is equal to hashing the whole key.
+  prefix = hashlib.blake2b(f"{feature_key}.".encode(), digest_size=8)
+  from_bytes = int.from_bytes
+  enabled = []
+  for actor_id in actor_ids:
+    digest = prefix.copy()
+    digest.update(str(actor_id).encode())
+    enabled.append(from_bytes(digest.digest(), "big") % BUCKETS < threshold)
+  return enabled
+
+# The rollout a stored NAME refers to: this module, or Posthog's hash.
+def by_name(name):
+  if name == NAME:
+    return sys.modules[__name__]
+  from feature_gate.adapters import posthog_evaluation
+  if name == posthog_evaluation.ROLLOUT.NAME:
+    return posthog_evaluation.ROLLOUT
+  raise ValueError(f"Unknown rollout {name!r}")
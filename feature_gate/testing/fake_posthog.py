@@ -0,0 +1,281 @@
+import json
+import math
+import random
+import threading
+import time
+
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+PAGE_SIZE = 100
+
+# A local stand-in for the /api/projects/{id}/feature_flags endpoints that
+# PosthogAPIClient uses, for load and latency testing on one machine.
+class FakePosthogHandler(BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+  # Headers and body go out in separate writes; without this, keep-alive
+  # requests stall on Nagle plus delayed ACKs.
+  disable_nagle_algorithm = True
+
+  def do_GET(self):
+    url = urlsplit(self.path)
+    if self._reject():
+      return
+    flag_id = self._flag_id(url.path)
+    if flag_id is not None:
+      with self.server.lock:
+        flag = self.server.by_id.get(flag_id)
+      self._respond_flag(flag)
+      return
+    query = {name: values[0] for name, values in parse_qs(url.query).items()}
+    offset = int(query.pop("offset", "0"))
+    limit = int(query.pop("limit", str(self.server.page_size)))
+    with self.server.lock:
+      version = self.server.version
+      modified_at = self.server.modified_at
+      flags = self.server.select(query)
+    validators = {"ETag": f'"v{version}"', "Last-Modified": formatdate(modified_at, usegmt=True)}
+    if self.headers.get("If-None-Match") == validators["ETag"]:
+      self._respond(304, None, validators)
+      return
+    page = flags[offset:offset + limit]
+    next_url = None
+    if offset + limit < len(flags):
+      next_url = self._page_url(url.path, query, limit, offset + limit)
+    previous_url = None
+    if offset > 0:
+      previous_url = self._page_url(url.path, query, limit, max(offset - limit, 0))
+    self._respond(200, {"count": len(flags), "next": next_url, "previous": previous_url, "results": page}, validators)
+
+  def _page_url(self, path, query, limit, offset):
+    return f"{self.server.url}{path}?{urlencode(dict(query, limit=limit, offset=offset))}"
+
+  def do_POST(self):
+    payload = self._read()
+    if self._reject():
+      return
+    with self.server.lock:
+      if payload["key"] in self.server.flags:
+        flag = None
+      else:
+        flag = self.server.create(payload["key"], payload.get("name"), payload.get("active", False), payload.get("filters"))
+    if flag is None:
+      self._respond(400, {"type": "validation_error", "code": "unique", "detail": "There is already a feature flag with this key.", "attr": "key"})
+    else:
+      self._respond(201, flag)
+
+  def do_PATCH(self):
+    payload = self._read()
+    if self._reject():
+      return
+    flag_id = self._flag_id(urlsplit(self.path).path)
+    with self.server.lock:
+      flag = self.server.by_id.get(flag_id)
+      if flag is not None:
+        flag.update(payload)
+        self.server.touch(flag)
+        if flag["deleted"]:
+          self.server.flags.pop(flag["key"], None)
+          self.server.by_id.pop(flag_id, None)
+          self.server.deleted[flag["key"]] = flag
+    self._respond_flag(flag)
+
+  def _reject(self):
+    server = self.server
+    server.record(self.command)
+    if server.latency or server.jitter:
+      time.sleep(server.latency + server.random.uniform(0, server.jitter))
+    retry_after = server.throttle()
+    if retry_after is not None:
+      self._respond(429, {"type": "throttled_error", "code": "throttled", "detail": f"Request was throttled. Expected available in {retry_after} seconds.", "attr": None}, {"Retry-After": str(retry_after)})
+      return True
+    if server.error_rate and server.random.random() < server.error_rate:
+      self._respond(server.error_status, {"type": "server_error", "code": "error", "detail": "A server error occurred.", "attr": None})
+      return True
+    return False
+
+  def _flag_id(self, path):
+    last = path.rstrip("/").rsplit("/", 1)[-1]
+    return int(last) if last.isdigit() else None
+
+  def _read(self):
+    return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+  def _respond_flag(self, flag):
+    if flag is None:
+      self._respond(404, {"type": "invalid_request", "code": "not_found", "detail": "Not found.", "attr": None})
+    else:
+      self._respond(200, flag)
+
+  def _respond(self, status, body, headers=None):
+    payload = b"" if body is None else json.dumps(body).encode()
+    # Counted before the reply is sent, so callers see it once they have it.
+    self.server.record_status(status)
+    self.send_response(status)
+    for name, value in (headers or {}).items():
+      self.send_header(name, value)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(payload)))
+    self.end_headers()
+    self.wfile.write(payload)
+
+  def log_message(self, format, *args):
+    pass
+
+class FakePosthogServer(ThreadingHTTPServer):
+  daemon_threads = True
+
+  # latency and jitter are seconds added to every request; rate_limit is
+  # requests per second (with a burst of the same size) before 429s;
+  # error_rate is the fraction of requests answered with error_status.
+  # Like Posthog, the list ignores updated_after, order and include_deleted
+  # unless incremental_params is True.
+  def __init__(self, host="127.0.0.1", port=0, latency=0, jitter=0, rate_limit=None, page_size=PAGE_SIZE, error_rate=0, error_status=500, seed=None, clock=time.monotonic, incremental_params=False):
+    super().__init__((host, port), FakePosthogHandler)
+    self.latency = latency
+    self.jitter = jitter
+    self.rate_limit = rate_limit
+    self.page_size = page_size
+    self.error_rate = error_rate
+    self.error_status = error_status
+    self.incremental_params = incremental_params
+    self.random = random.Random(seed)
+    self.clock = clock
+    self.lock = threading.Lock()
+    self.flags = {}
+    self.by_id = {}
+    # Deleted flags are kept as tombstones, listed only with include_deleted.
+    self.deleted = {}
+    self.version = 0
+    self.modified_at = time.time()
+    self._next_id = 1
+    self._tokens = rate_limit
+    self._refilled_at = clock()
+    self._stats = {"requests": 0, "methods": {}, "statuses": {}}
+    self._thread = None
+
+  @property
+  def url(self):
+    host, port = self.server_address
+    return f"http://{host}:{port}"
+
+  def create(self, key, name=None, active=False, filters=None):
+    flag = {
+      "id": self._next_id,
+      "key": key,
+      "name": name or key,
+      "filters": filters or {"groups": [{"properties": [], "rollout_percentage": None}]},
+      "deleted": False,
+      "active": active,
+    }
+    self._next_id += 1
+    self.flags[key] = flag
+    self.by_id[flag["id"]] = flag
+    self.deleted.pop(key, None)
+    self.touch(flag)
+    return flag
+
+  # Every change bumps the version behind the list's ETag and stamps the flag.
+  def touch(self, flag):
+    self.version += 1
+    self.modified_at = time.time()
+    flag["updated_at"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+  # Removes a flag without leaving a tombstone, as a hard delete would.
+  def purge(self, key):
+    with self.lock:
+      flag = self.flags.pop(key, None) or self.deleted.pop(key, None)
+      if flag is not None:
+        self.by_id.pop(flag["id"], None)
+        self.version += 1
+        self.modified_at = time.time()
+
+  def select(self, query):
+    flags = list(self.flags.values())
+    if not self.incremental_params:
+      return flags
+    if "updated_after" in query:
+      if query.get("include_deleted") == "true":
+        flags.extend(self.deleted.values())
+      flags = [flag for flag in flags if flag["updated_at"] >= query["updated_after"]]
+    if query.get("order") == "updated_at":
+      flags.sort(key=lambda flag: flag["updated_at"])
+    return flags
+
+  def seed(self, count, prefix="flag_"):
+    with self.lock:
+      for i in range(count):
+        self.create(f"{prefix}{i}", active=i % 2 == 0)
+
+  def stats(self):
+    with self.lock:
+      return {
+        "requests": self._stats["requests"],
+        "methods": dict(self._stats["methods"]),
+        "statuses": dict(self._stats["statuses"]),
+      }
+
+  def record(self, method):
+    with self.lock:
+      self._stats["requests"] += 1
+      self._stats["methods"][method] = self._stats["methods"].get(method, 0) + 1
+
+  def record_status(self, status):
+    with self.lock:
+      self._stats["statuses"][status] = self._stats["statuses"].get(status, 0) + 1
+
+  # Token bucket; returns the whole seconds to wait, or None to let the request through.
+  def throttle(self):
+    if self.rate_limit is None:
+      return None
+    with self.lock:
+      now = self.clock()
+      self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled_at) * self.rate_limit)
+      self._refilled_at = now
+      if self._tokens >= 1:
+        self._tokens -= 1
+        return None
+      return max(math.ceil((1 - self._tokens) / self.rate_limit), 1)
+
+  def start(self):
+    self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    self._thread.start()
+    return self
+
+  def stop(self):
+    self.shutdown()
+    self.server_close()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *exc):
+    self.stop()
+
+def main(argv=None):
+  import argparse
+
+  parser = argparse.ArgumentParser(description="Serve a fake Posthog feature flags API")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8000)
+  parser.add_argument("--flags", type=int, default=100, help="number of flags to seed")
+  parser.add_argument("--latency", type=float, default=0)
+  parser.add_argument("--jitter", type=float, default=0)
+  parser.add_argument("--rate-limit", type=float)
+  parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+  parser.add_argument("--error-rate", type=float, default=0)
+  args = parser.parse_args(argv)
+  server = FakePosthogServer(args.host, args.port, latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit, page_size=args.page_size, error_rate=args.error_rate)
+  server.seed(args.flags)
+  print(f"Serving {args.flags} flags on {server.url}/api/projects/<id>/feature_flags")
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+
+if __name__ == "__main__":
+  main()
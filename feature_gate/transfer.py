@@ -0,0 +1,174 @@
+import json
+import re
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from feature_gate.clients.posthog_api_client import RateLimitError
+from feature_gate.feature import Feature
+
+FORMAT = "feature_gate"
+VERSION = 1
+
+class InvalidExport(ValueError):
+  pass
+
+def default_gates():
+  return {
+    "boolean": False,
+    "actors": [],
+    "groups": [],
+    "percentage_of_actors": 0,
+    "expression": None
+  }
+
+def record(key, name=None, description=None, **gates):
+  return {
+    "key": key,
+    "name": key if name is None else name,
+    "description": "" if description is None else description,
+    "gates": dict(default_gates(), **gates)
+  }
+
+def records(adapter):
+  if hasattr(adapter, "export"):
+    yield from adapter.export()
+    return
+  for key, enabled in adapter.evaluate_all().items():
+    yield record(key, boolean=enabled)
+
+def dump(records, fp):
+  fp.write(json.dumps({"format": FORMAT, "version": VERSION}) + "\n")
+  count = 0
+  for entry in records:
+    fp.write(json.dumps(entry, sort_keys=True) + "\n")
+    count += 1
+  return count
+
+def load(fp):
+  header = None
+  for line in fp:
+    line = line.strip()
+    if not line:
+      continue
+    if header is None:
+      header = json.loads(line)
+      if header.get("format") != FORMAT or header.get("version") != VERSION:
+        raise InvalidExport(f"Unsupported export header {header}")
+      continue
+    entry = json.loads(line)
+    yield record(entry["key"], entry.get("name"), entry.get("description"), **entry.get("gates", {}))
+  if header is None:
+    raise InvalidExport("Export is empty")
+
+def changes(adapter, current, entry):
+  key = entry["key"]
+  gates = entry["gates"]
+  ops = []
+  if current is None:
+    ops.append((adapter.add, Feature(entry["name"], key, entry["description"])))
+    current_gates = default_gates()
+  else:
+    current_gates = current["gates"]
+  # Disabling first, since a boolean disable may clear the other gates; the
+  # rest are then written as if starting from none.
+  if current_gates["boolean"] and not gates["boolean"]:
+    ops.append((adapter.disable, key))
+    current_gates = default_gates()
+  if hasattr(adapter, "enable_actor"):
+    for actor in sorted(set(gates["actors"]) - set(current_gates["actors"])):
+      ops.append((adapter.enable_actor, key, actor))
+    for actor in sorted(set(current_gates["actors"]) - set(gates["actors"])):
+      ops.append((adapter.disable_actor, key, actor))
+  if hasattr(adapter, "enable_group"):
+    for group in sorted(set(gates["groups"]) - set(current_gates["groups"])):
+      ops.append((adapter.enable_group, key, group))
+    for group in sorted(set(current_gates["groups"]) - set(gates["groups"])):
+      ops.append((adapter.disable_group, key, group))
+  if hasattr(adapter, "enable_percentage_of_actors") and gates["percentage_of_actors"] != current_gates["percentage_of_actors"]:
+    if gates["percentage_of_actors"]:
+      ops.append((adapter.enable_percentage_of_actors, key, gates["percentage_of_actors"]))
+    else:
+      ops.append((adapter.disable_percentage_of_actors, key))
+  if hasattr(adapter, "enable_expression") and gates["expression"] != current_gates["expression"]:
+    if gates["expression"] is None:
+      ops.append((adapter.disable_expression, key))
+    else:
+      ops.append((adapter.enable_expression, key, gates["expression"]))
+  if gates["boolean"] and not current_gates["boolean"]:
+    ops.append((adapter.enable, key))
+  writes = ops[1:] if current is None else ops
+  if writes and hasattr(adapter, "write_gates"):
+    # Adapters that pay a request per gate write set them all at once.
+    ops = ops[:len(ops) - len(writes)] + [(adapter.write_gates, key, gates)]
+  return ops
+
+def apply(adapter, entries, batch_size=100, max_workers=4, prune=False, retries=5):
+  if hasattr(adapter, "batch"):
+    # In-process adapters gain nothing from worker threads, and a batch
+    # publishes every change as one snapshot.
+    with adapter.batch():
+      return _apply(adapter, entries, batch_size, 1, prune, retries)
+  return _apply(adapter, entries, batch_size, max_workers, prune, retries)
+
+def _apply(adapter, entries, batch_size, max_workers, prune, retries):
+  current = {entry["key"]: entry for entry in records(adapter)}
+  summary = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "writes": 0}
+  seen = set()
+  entries = iter(entries)
+  executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+  try:
+    while True:
+      batch = list(islice(entries, batch_size))
+      if not batch:
+        break
+      work = []
+      for entry in batch:
+        seen.add(entry["key"])
+        existing = current.get(entry["key"])
+        ops = changes(adapter, existing, entry)
+        if not ops:
+          summary["unchanged"] += 1
+          continue
+        summary["added" if existing is None else "updated"] += 1
+        summary["writes"] += len(ops)
+        work.append(ops)
+      _run(executor, work, retries)
+    if prune:
+      removed = [[(adapter.remove, key)] for key in current if key not in seen]
+      summary["removed"] = len(removed)
+      summary["writes"] += len(removed)
+      _run(executor, removed, retries)
+  finally:
+    if executor is not None:
+      executor.shutdown(wait=True)
+  return summary
+
+def _run(executor, work, retries):
+  if executor is None:
+    for ops in work:
+      _run_ops(ops, retries)
+    return
+  for future in [executor.submit(_run_ops, ops, retries) for ops in work]:
+    future.result()
+
+def _run_ops(ops, retries):
+  for fn, *args in ops:
+    _call_with_backoff(fn, args, retries)
+
+def _call_with_backoff(fn, args, retries):
+  attempt = 0
+  while True:
+    try:
+      return fn(*args)
+    except RateLimitError as err:
+      attempt += 1
+      if attempt > retries:
+        raise
+      time.sleep(_retry_after(err, attempt))
+
+def _retry_after(error, attempt):
+  match = re.search(r"(\d+) seconds?", str(error))
+  if match:
+    return int(match.group(1))
+  return 2 ** (attempt - 1)
@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+from feature_gate.async_client import AsyncClient
+from feature_gate.adapters.async_memory import AsyncMemoryAdapter
+from feature_gate.client import FeatureNotFound
+from feature_gate.feature import Feature
+
+def configured_client():
+  return AsyncClient(AsyncMemoryAdapter())
+
+def build_feature():
+  return Feature("test_feature", "test_feature", "This is a test feature")
+
+def test_adapter_returns_the_configured_adapter():
+  adapter = AsyncMemoryAdapter()
+  client = AsyncClient(adapter)
+  assert client.adapter == adapter
+
+def test_add_enable_disable_and_remove_a_feature():
+  async def scenario():
+    client = configured_client()
+    assert await client.add(build_feature())
+    assert await client.features() == ["test_feature"]
+    assert not await client.is_enabled("test_feature")
+    assert await client.enable("test_feature")
+    assert await client.is_enabled("test_feature")
+    assert await client.disable("test_feature")
+    assert not await client.is_enabled("test_feature")
+    assert await client.remove("test_feature")
+    assert await client.features() == []
+  asyncio.run(scenario())
+
+def test_is_enabled_raises_when_the_feature_does_not_exist():
+  async def scenario():
+    client = configured_client()
+    with pytest.raises(FeatureNotFound):
+      await client.is_enabled("test_feature")
+  asyncio.run(scenario())
+
+def test_is_enabled_many_and_evaluate_all():
+  async def scenario():
+    client = configured_client()
+    await client.add(build_feature())
+    await client.enable("test_feature")
+    assert await client.is_enabled_many(["test_feature"]) == {"test_feature": True}
+    assert await client.evaluate_all() == {"test_feature": True}
+  asyncio.run(scenario())
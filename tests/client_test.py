@@ -1,5 +1,10 @@
+import gc
 import pytest
+import threading
+import weakref
+from feature_gate import log
 from feature_gate.client import Client
+from feature_gate.instrumentation import Metrics
 from tests.fixtures.null_adapter import NullAdapter
 from unittest.mock import Mock, patch
 
@@ -49,3 +54,224 @@ def test_delegates_disable_to_the_adapter():
     client = Client(adapter)
     client.disable('feature')
     mock_disable.assert_called_once_with('feature')
+
+def test_is_enabled_many_falls_back_to_is_enabled_per_feature():
+  with patch.object(NullAdapter, 'is_enabled', side_effect=[True, False]) as mock_is_enabled:
+    client = Client(NullAdapter())
+    assert client.is_enabled_many(['a', 'b']) == {'a': True, 'b': False}
+    assert mock_is_enabled.call_count == 2
+
+def test_is_enabled_many_delegates_to_the_adapter_when_supported():
+  adapter = NullAdapter()
+  adapter.is_enabled_many = Mock(return_value={'a': True})
+  client = Client(adapter)
+  assert client.is_enabled_many(['a']) == {'a': True}
+  adapter.is_enabled_many.assert_called_once_with(['a'])
+
+def test_evaluate_all_falls_back_to_features():
+  with patch.object(NullAdapter, 'features', return_value=['a', 'b']), patch.object(NullAdapter, 'is_enabled', side_effect=[False, True]):
+    client = Client(NullAdapter())
+    assert client.evaluate_all() == {'a': False, 'b': True}
+
+def test_evaluate_all_delegates_to_the_adapter_when_supported():
+  adapter = NullAdapter()
+  adapter.evaluate_all = Mock(return_value={'a': True})
+  client = Client(adapter)
+  assert client.evaluate_all() == {'a': True}
+
+def test_is_memoizing_is_false_outside_memoize():
+  client = Client(NullAdapter())
+  assert not client.is_memoizing()
+  with client.memoize():
+    assert client.is_memoizing()
+  assert not client.is_memoizing()
+
+def test_memoize_is_per_client():
+  client = Client(NullAdapter())
+  other = Client(NullAdapter())
+  with client.memoize():
+    assert not other.is_memoizing()
+    with other.memoize():
+      assert client.is_memoizing()
+      assert other.is_memoizing()
+    assert not other.is_memoizing()
+    assert client.is_memoizing()
+
+def test_clients_are_released_after_memoizing():
+  client = Client(NullAdapter())
+  with client.memoize():
+    client.is_enabled('feature')
+  ref = weakref.ref(client)
+  del client
+  gc.collect()
+  assert ref() is None
+
+def test_memoize_reads_each_feature_from_the_adapter_once():
+  with patch.object(NullAdapter, 'is_enabled', return_value=True) as mock_is_enabled, patch.object(NullAdapter, 'features', return_value=['feature']) as mock_features:
+    client = Client(NullAdapter())
+    with client.memoize():
+      for _ in range(3):
+        assert client.is_enabled('feature')
+        assert client.features() == ['feature']
+    mock_is_enabled.assert_called_once_with('feature')
+    mock_features.assert_called_once()
+    client.is_enabled('feature')
+    assert mock_is_enabled.call_count == 2
+
+def test_memoize_works_as_a_decorator():
+  with patch.object(NullAdapter, 'is_enabled', return_value=True) as mock_is_enabled:
+    client = Client(NullAdapter())
+    @client.memoize()
+    def handle_request():
+      assert client.is_memoizing()
+      return [client.is_enabled('feature') for _ in range(3)]
+    assert handle_request() == [True, True, True]
+    mock_is_enabled.assert_called_once()
+
+def test_writes_expire_the_memo():
+  with patch.object(NullAdapter, 'is_enabled', side_effect=[False, True]) as mock_is_enabled:
+    client = Client(NullAdapter())
+    with client.memoize():
+      assert not client.is_enabled('feature')
+      client.enable('feature')
+      assert client.is_enabled('feature')
+    assert mock_is_enabled.call_count == 2
+
+def test_preload_all_serves_reads_from_one_bulk_fetch():
+  adapter = NullAdapter()
+  adapter.evaluate_all = Mock(return_value={'a': True, 'b': False})
+  with patch.object(NullAdapter, 'is_enabled') as mock_is_enabled, patch.object(NullAdapter, 'features') as mock_features:
+    client = Client(adapter)
+    with client.memoize():
+      client.preload_all()
+      assert client.is_enabled('a')
+      assert not client.is_enabled('b')
+      assert client.is_enabled_many(['a', 'b']) == {'a': True, 'b': False}
+      assert client.features() == ['a', 'b']
+    adapter.evaluate_all.assert_called_once()
+    mock_is_enabled.assert_not_called()
+    mock_features.assert_not_called()
+
+def test_preload_fetches_only_missing_features():
+  adapter = NullAdapter()
+  adapter.is_enabled_many = Mock(side_effect=[{'a': True}, {'b': False}])
+  client = Client(adapter)
+  with client.memoize():
+    client.preload(['a'])
+    assert client.is_enabled_many(['a', 'b']) == {'a': True, 'b': False}
+  adapter.is_enabled_many.assert_any_call(['b'])
+
+def test_memo_is_isolated_per_thread():
+  client = Client(NullAdapter())
+  seen = []
+  with client.memoize():
+    thread = threading.Thread(target=lambda: seen.append(client.is_memoizing()))
+    thread.start()
+    thread.join()
+  assert seen == [False]
+
+def test_delegates_is_enabled_with_an_actor_to_the_adapter():
+  with patch.object(NullAdapter, 'is_enabled', return_value=True) as mock_is_enabled:
+    client = Client(NullAdapter())
+    client.is_enabled('feature', 'user_1')
+    mock_is_enabled.assert_called_once_with('feature', 'user_1')
+
+def test_memoize_keys_actor_checks_by_actor():
+  with patch.object(NullAdapter, 'is_enabled', side_effect=[True, False]) as mock_is_enabled:
+    client = Client(NullAdapter())
+    with client.memoize():
+      assert client.is_enabled('feature', 'user_1')
+      assert not client.is_enabled('feature', 'user_2')
+      assert client.is_enabled('feature', 'user_1')
+    assert mock_is_enabled.call_count == 2
+
+def test_is_enabled_for_actors_falls_back_to_is_enabled_per_actor():
+  with patch.object(NullAdapter, 'is_enabled', side_effect=[True, False]):
+    client = Client(NullAdapter())
+    assert client.is_enabled_for_actors('feature', ['a', 'b']) == [True, False]
+
+def test_is_enabled_counts_checks_per_feature():
+  with patch.object(NullAdapter, 'is_enabled', side_effect=[True, False, True]):
+    client = Client(NullAdapter())
+    for _ in range(3):
+      client.is_enabled('feature')
+  assert client.check_stats() == {'feature': {'checks': 3, 'enabled': 2}}
+
+def test_check_stats_merge_checks_from_every_thread():
+  with patch.object(NullAdapter, 'is_enabled', return_value=True):
+    client = Client(NullAdapter())
+    threads = [threading.Thread(target=lambda: [client.is_enabled('feature') for _ in range(100)]) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    assert client.check_stats(reset=True) == {'feature': {'checks': 400, 'enabled': 400}}
+    client.is_enabled('feature')
+    assert client.check_stats() == {'feature': {'checks': 1, 'enabled': 1}}
+
+def test_check_stats_keep_the_checks_of_threads_that_ended():
+  with patch.object(NullAdapter, 'is_enabled', return_value=True):
+    client = Client(NullAdapter())
+    for _ in range(50):
+      thread = threading.Thread(target=lambda: client.is_enabled('feature'))
+      thread.start()
+      thread.join()
+    assert len(client._thread_checks) == 0
+    assert client.check_stats() == {'feature': {'checks': 50, 'enabled': 50}}
+    client.is_enabled('feature')
+    assert len(client._thread_checks) == 1
+    assert client.check_stats() == {'feature': {'checks': 51, 'enabled': 51}}
+
+def test_log_check_stats_logs_one_line_and_resets():
+  client = Client(NullAdapter())
+  client.is_enabled('feature')
+  with patch.object(client, 'logger') as mock_logger:
+    assert client.log_check_stats() == {'feature': {'checks': 1, 'enabled': 0}}
+  mock_logger.info.assert_called_once_with("feature checks", checks={'feature': {'checks': 1, 'enabled': 0}})
+  assert client.check_stats() == {}
+
+def test_adapter_loggers_only_need_info():
+  class InfoLogger:
+    def info(self, msg, **kwargs):
+      pass
+  adapter = NullAdapter()
+  adapter.logger = InfoLogger()
+  with patch.object(NullAdapter, 'is_enabled', return_value=True):
+    client = Client(adapter)
+    assert client.is_enabled('feature')
+    assert client.is_enabled_many(['feature']) == {'feature': True}
+
+def test_is_enabled_logs_only_sampled_checks():
+  client = Client(NullAdapter(), sampler=log.Sampler(every=2))
+  with patch.object(client, 'logger') as mock_logger:
+    mock_logger.is_enabled_for.return_value = True
+    for _ in range(4):
+      client.is_enabled('feature')
+  assert mock_logger.debug.call_count == 2
+
+def test_is_enabled_skips_sampling_when_debug_is_disabled():
+  sampler = Mock()
+  client = Client(NullAdapter(), sampler=sampler)
+  with patch.object(client, 'logger') as mock_logger:
+    mock_logger.is_enabled_for.return_value = False
+    client.is_enabled('feature')
+  sampler.assert_not_called()
+  mock_logger.debug.assert_not_called()
+
+def test_instrumenter_sees_evaluations_and_adapter_latency():
+  metrics = Metrics()
+  with patch.object(NullAdapter, 'is_enabled', return_value=True):
+    client = Client(NullAdapter(), instrumenter=metrics)
+    with client.memoize():
+      client.is_enabled('feature')
+      client.is_enabled('feature')
+  assert metrics.evaluations('feature') == {'count': 2, 'true_ratio': 1.0}
+  assert metrics.histogram('feature_gate_adapter_duration_seconds', operation='is_enabled')['count'] == 1
+
+def test_instrumenter_times_bulk_reads():
+  metrics = Metrics()
+  adapter = NullAdapter()
+  adapter.evaluate_all = Mock(return_value={'a': True})
+  client = Client(adapter, instrumenter=metrics)
+  client.evaluate_all()
+  assert metrics.histogram('feature_gate_adapter_duration_seconds', operation='evaluate_all')['count'] == 1
@@ -0,0 +1,15 @@
+from feature_gate.actor import Actor, actor_id
+
+def test_id_is_stringified():
+  assert Actor(42).id == "42"
+
+def test_properties_default_to_empty():
+  assert Actor("alice").properties == {}
+
+def test_actor_id_accepts_actors_objects_with_an_id_and_plain_ids():
+  class User:
+    id = 7
+  assert actor_id(Actor("alice")) == "alice"
+  assert actor_id(User()) == "7"
+  assert actor_id(12) == "12"
+  assert actor_id("bob") == "bob"
@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+import time
+
+from feature_gate.adapters.async_posthog import AsyncPosthogAdapter
+from feature_gate.async_client import AsyncClient
+from feature_gate.client import FeatureNotFound
+from tests.fixtures.http_server import ScriptedServer
+from tests.fixtures.posthog_api_client.mocks import load_response
+
+def configured_client(server, **options):
+  adapter = AsyncPosthogAdapter(api_base=server.url, api_key="api_key", project_id="project_id", **options)
+  return AsyncClient(adapter)
+
+def test_is_enabled_returns_the_flag_state():
+  with ScriptedServer(default=(200, {}, load_response('funnel_is_enabled'), 0)) as server:
+    client = configured_client(server)
+    try:
+      assert asyncio.run(client.is_enabled("funnel_test")) == True
+    finally:
+      client.adapter.close()
+
+def test_is_enabled_raises_when_the_feature_does_not_exist():
+  with ScriptedServer() as server:
+    client = configured_client(server)
+    try:
+      with pytest.raises(FeatureNotFound):
+        asyncio.run(client.is_enabled("funnel_test"))
+    finally:
+      client.adapter.close()
+
+def test_concurrent_checks_share_the_connection_pool():
+  delay = 0.1
+  with ScriptedServer(default=(200, {}, load_response('funnel_is_enabled'), delay)) as server:
+    client = configured_client(server, max_concurrency=10)
+    async def check_many():
+      return await asyncio.gather(*[client.is_enabled("funnel_test") for _ in range(10)])
+    try:
+      started = time.monotonic()
+      assert asyncio.run(check_many()) == [True] * 10
+      assert time.monotonic() - started < delay * 5
+      stats = client.adapter.client.connection_stats()
+      assert stats["requests"] == 10
+      assert stats["connections"] <= 10
+    finally:
+      client.adapter.close()
@@ -1,6 +1,11 @@
 import pytest
-from feature_gate.client import Client, FeatureNotFound
+import threading
+import time
+
+from feature_gate.client import Client, FeatureNotFound, ReadOnlyError
 from feature_gate.adapters.memory import MemoryAdapter
+from feature_gate import groups
+from feature_gate.actor import Actor
 from feature_gate.feature import Feature
 
 def configured_client():
@@ -66,3 +71,232 @@ def test_remove_feature_not_found():
   client = configured_client()
   with pytest.raises(FeatureNotFound):
     client.remove("test_feature")
+
+def test_add_feature_twice_keeps_a_single_entry():
+  client = configured_client()
+  feature = build_feature()
+  assert client.add(feature)
+  client.enable("test_feature")
+  assert client.add(feature)
+  assert client.features() == ["test_feature"]
+  assert client.is_enabled("test_feature")
+
+def test_features_are_listed_in_insertion_order():
+  client = configured_client()
+  for key in ["charlie", "alpha", "bravo"]:
+    client.add(Feature(key, key, key))
+  client.remove("alpha")
+  client.add(Feature("alpha", "alpha", "alpha"))
+  assert client.features() == ["charlie", "bravo", "alpha"]
+
+def test_feature_not_found_message_includes_the_key():
+  client = configured_client()
+  with pytest.raises(FeatureNotFound) as e:
+    client.is_enabled("test_feature")
+  assert str(e.value) == "Feature test_feature not found."
+
+def test_is_enabled_many_returns_a_mapping():
+  client = configured_client()
+  client.add(Feature("a", "a", "a"))
+  client.add(Feature("b", "b", "b"))
+  client.enable("b")
+  assert client.is_enabled_many(["a", "b"]) == {"a": False, "b": True}
+  assert client.evaluate_all() == {"a": False, "b": True}
+
+def test_is_enabled_many_raises_when_a_feature_does_not_exist():
+  client = configured_client()
+  client.add(build_feature())
+  with pytest.raises(FeatureNotFound):
+    client.is_enabled_many(["test_feature", "missing"])
+
+def test_percentage_of_actors_enables_a_stable_share_of_actors():
+  client = configured_client()
+  client.add(build_feature())
+  client.enable_percentage_of_actors("test_feature", 50)
+  results = [client.is_enabled("test_feature", f"user_{i}") for i in range(1_000)]
+  assert 400 < sum(results) < 600
+  assert results == [client.is_enabled("test_feature", f"user_{i}") for i in range(1_000)]
+  assert not client.is_enabled("test_feature")
+
+def test_is_enabled_for_actors_matches_single_checks():
+  client = configured_client()
+  client.add(build_feature())
+  client.enable_percentage_of_actors("test_feature", 30)
+  actors = [f"user_{i}" for i in range(500)]
+  assert client.is_enabled_for_actors("test_feature", actors) == [client.is_enabled("test_feature", actor) for actor in actors]
+
+def test_boolean_gate_enables_every_actor():
+  client = configured_client()
+  client.add(build_feature())
+  client.enable("test_feature")
+  assert client.is_enabled("test_feature", "user_1")
+  assert client.is_enabled_for_actors("test_feature", ["a", "b"]) == [True, True]
+
+def test_disable_clears_the_percentage_of_actors():
+  client = configured_client()
+  client.add(build_feature())
+  client.enable_percentage_of_actors("test_feature", 100)
+  assert client.is_enabled("test_feature", "user_1")
+  client.disable("test_feature")
+  assert not client.is_enabled("test_feature", "user_1")
+
+def test_disable_percentage_of_actors():
+  client = configured_client()
+  client.add(build_feature())
+  client.enable_percentage_of_actors("test_feature", 100)
+  client.disable_percentage_of_actors("test_feature")
+  assert not client.is_enabled("test_feature", "user_1")
+
+def test_enable_percentage_of_actors_rejects_invalid_percentages():
+  client = configured_client()
+  client.add(build_feature())
+  with pytest.raises(ValueError):
+    client.enable_percentage_of_actors("test_feature", 150)
+
+def test_actor_gate_enables_listed_actors():
+  client = configured_client()
+  client.add(build_feature())
+  client.enable_actor("test_feature", Actor("alice"))
+  assert client.is_enabled("test_feature", Actor("alice"))
+  assert client.is_enabled("test_feature", "alice")
+  assert not client.is_enabled("test_feature", "bob")
+  client.disable_actor("test_feature", "alice")
+  assert not client.is_enabled("test_feature", "alice")
+
+def test_group_gate_enables_actors_matching_the_group():
+  groups.register("admins", lambda actor: actor.properties.get("admin", False))
+  try:
+    client = configured_client()
+    client.add(build_feature())
+    client.enable_group("test_feature", "admins")
+    assert client.is_enabled("test_feature", Actor("alice", {"admin": True}))
+    assert not client.is_enabled("test_feature", Actor("bob"))
+    assert client.is_enabled_for_actors("test_feature", [Actor("alice", {"admin": True}), Actor("bob")]) == [True, False]
+    client.disable_group("test_feature", "admins")
+    assert not client.is_enabled("test_feature", Actor("alice", {"admin": True}))
+  finally:
+    groups.unregister("admins")
+
+def test_enable_group_raises_when_the_group_is_not_registered():
+  client = configured_client()
+  client.add(build_feature())
+  with pytest.raises(groups.GroupNotRegistered):
+    client.enable_group("test_feature", "unknown")
+
+def test_actor_gate_stays_fast_with_many_actors():
+  client = configured_client()
+  client.add(build_feature())
+  adapter = client.adapter
+  for i in range(200_000):
+    adapter.enable_actor("test_feature", i)
+  assert client.is_enabled("test_feature", 199_999)
+  assert not client.is_enabled("test_feature", 200_000)
+
+def test_expression_gate_enables_actors_matching_the_expression():
+  client = configured_client()
+  client.add(build_feature())
+  expression = {"Equal": [{"Property": ["plan"]}, "pro"]}
+  client.enable_expression("test_feature", expression)
+  assert client.expression("test_feature") == expression
+  assert client.is_enabled("test_feature", Actor("alice", {"plan": "pro"}))
+  assert not client.is_enabled("test_feature", Actor("bob", {"plan": "basic"}))
+  assert not client.is_enabled("test_feature", "carol")
+  assert client.is_enabled_for_actors("test_feature", [Actor("alice", {"plan": "pro"}), Actor("bob")]) == [True, False]
+  client.disable_expression("test_feature")
+  assert not client.is_enabled("test_feature", Actor("alice", {"plan": "pro"}))
+
+def test_add_and_remove_expression():
+  client = configured_client()
+  client.add(build_feature())
+  pro = {"Equal": [{"Property": ["plan"]}, "pro"]}
+  adult = {"GreaterThanOrEqualTo": [{"Property": ["age"]}, 18]}
+  client.add_expression("test_feature", pro)
+  client.add_expression("test_feature", adult)
+  assert client.is_enabled("test_feature", Actor("bob", {"age": 30}))
+  client.remove_expression("test_feature", adult)
+  assert not client.is_enabled("test_feature", Actor("bob", {"age": 30}))
+  assert client.is_enabled("test_feature", Actor("alice", {"plan": "pro"}))
+
+def test_writes_publish_a_new_snapshot():
+  adapter = MemoryAdapter()
+  adapter.add(build_feature())
+  snapshot = adapter._features
+  adapter.enable("test_feature")
+  assert adapter._features is not snapshot
+  assert not snapshot["test_feature"].enabled
+  assert adapter.is_enabled("test_feature")
+
+def test_batch_publishes_its_writes_together():
+  adapter = MemoryAdapter()
+  adapter.add(build_feature())
+  with adapter.batch():
+    adapter.add(Feature("other", "other", ""))
+    adapter.enable("other")
+    adapter.enable_actor("test_feature", "alice")
+    assert adapter.features() == ["test_feature"]
+  assert adapter.features() == ["test_feature", "other"]
+  assert adapter.is_enabled("other")
+  assert adapter.is_enabled("test_feature", "alice")
+
+def test_batch_discards_its_writes_when_it_raises():
+  adapter = MemoryAdapter()
+  adapter.add(build_feature())
+  with pytest.raises(FeatureNotFound):
+    with adapter.batch():
+      adapter.enable("test_feature")
+      adapter.enable("missing")
+  assert not adapter.is_enabled("test_feature")
+
+def test_read_only_adapter_rejects_writes():
+  adapter = MemoryAdapter()
+  adapter.add(build_feature())
+  adapter.enable("test_feature")
+  adapter.read_only = True
+  client = Client(adapter)
+  assert client.is_read_only()
+  assert client.is_enabled("test_feature")
+  with pytest.raises(ReadOnlyError):
+    client.disable("test_feature")
+  with pytest.raises(ReadOnlyError):
+    client.add(Feature("other", "other", ""))
+  with pytest.raises(ReadOnlyError):
+    with adapter.batch():
+      pass
+  assert client.features() == ["test_feature"]
+
+def test_client_is_not_read_only_by_default():
+  assert not configured_client().is_read_only()
+
+def test_concurrent_readers_see_consistent_snapshots():
+  adapter = MemoryAdapter()
+  for i in range(50):
+    adapter.add(Feature(f"flag_{i}", f"flag_{i}", ""))
+  keys = [f"flag_{i}" for i in range(50)]
+  stop = threading.Event()
+  torn = []
+
+  def write():
+    on = True
+    while not stop.is_set():
+      with adapter.batch():
+        for key in keys:
+          if on:
+            adapter.enable(key)
+          else:
+            adapter.disable(key)
+      on = not on
+
+  def read():
+    while not stop.is_set():
+      values = set(adapter.evaluate_all().values())
+      if len(values) > 1:
+        torn.append(values)
+
+  threads = [threading.Thread(target=write) for _ in range(2)] + [threading.Thread(target=read) for _ in range(4)]
+  for thread in threads:
+    thread.start()
+  time.sleep(0.3)
+  stop.set()
+  for thread in threads:
+    thread.join()
+  assert torn == []
@@ -0,0 +1,165 @@
+import pytest
+
+from datetime import datetime, timedelta, timezone
+from feature_gate import groups
+from feature_gate.actor import Actor
+from feature_gate.adapters import posthog_evaluation
+
+def build_flag(active=True, groups=None):
+  return {
+    "key": "funnel_test",
+    "active": active,
+    "filters": {"groups": groups if groups is not None else [{"properties": [], "rollout_percentage": None}]}
+  }
+
+def test_rollout_hash_is_between_zero_and_one():
+  values = [posthog_evaluation.rollout_hash("funnel_test", f"user_{i}") for i in range(100)]
+  assert all(0 <= value <= 1 for value in values)
+  assert posthog_evaluation.rollout_hash("funnel_test", "user_1") == posthog_evaluation.rollout_hash("funnel_test", "user_1")
+
+def test_inactive_flags_are_disabled_for_everyone():
+  assert not posthog_evaluation.is_enabled_for(build_flag(active=False), "user_1")
+
+def test_null_rollout_enables_everyone():
+  assert posthog_evaluation.is_enabled_for(build_flag(), "user_1")
+
+def test_rollout_percentage_enables_a_share_of_actors():
+  flag = build_flag(groups=[{"properties": [], "rollout_percentage": 30}])
+  enabled = sum(posthog_evaluation.is_enabled_for(flag, f"user_{i}") for i in range(5_000))
+  assert 1_250 < enabled < 1_750
+
+def test_zero_rollout_enables_nobody():
+  flag = build_flag(groups=[{"properties": [], "rollout_percentage": 0}])
+  assert not any(posthog_evaluation.is_enabled_for(flag, f"user_{i}") for i in range(100))
+
+def test_with_rollout_percentage_replaces_the_unfiltered_condition():
+  property_condition = {"properties": [{"key": "email", "value": "a@b.c"}], "rollout_percentage": 100}
+  flag = build_flag(groups=[{"properties": [], "rollout_percentage": 10}, property_condition])
+  filters = posthog_evaluation.with_rollout_percentage(flag, 25)
+  assert filters["groups"] == [property_condition, {"properties": [], "rollout_percentage": 25}]
+
+def test_with_rollout_percentage_keeps_the_boolean_gate_of_an_active_flag():
+  catch_all = {"properties": [], "rollout_percentage": None}
+  filters = posthog_evaluation.with_rollout_percentage(build_flag(groups=[catch_all]), 25)
+  assert filters["groups"] == [catch_all, {"properties": [], "rollout_percentage": 25}]
+
+def test_with_rollout_percentage_drops_the_conditions_of_an_inactive_flag():
+  filters = posthog_evaluation.with_rollout_percentage(build_flag(active=False), 25)
+  assert filters["groups"] == [{"properties": [], "rollout_percentage": 25}]
+
+def test_is_enabled_for_everyone_needs_an_unconditional_condition():
+  assert posthog_evaluation.is_enabled_for_everyone(build_flag())
+  assert posthog_evaluation.is_enabled_for_everyone(build_flag(groups=[]))
+  assert not posthog_evaluation.is_enabled_for_everyone(build_flag(active=False))
+  assert not posthog_evaluation.is_enabled_for_everyone(build_flag(groups=[{"properties": [], "rollout_percentage": 30}]))
+
+def test_distinct_id_condition_matches_listed_actors():
+  flag = build_flag(groups=[{"properties": [{"key": "distinct_id", "type": "person", "operator": "exact", "value": ["alice", "bob"]}], "rollout_percentage": 100}])
+  evaluate = posthog_evaluation.compile_flag(flag)
+  assert evaluate(Actor("alice"))
+  assert evaluate("bob")
+  assert not evaluate("carol")
+
+def test_group_condition_uses_registered_predicates():
+  groups.register("admins", lambda actor: actor.properties.get("admin", False))
+  try:
+    flag = build_flag(groups=[{"properties": [{"key": "feature_gate_groups", "type": "person", "operator": "exact", "value": ["admins"]}], "rollout_percentage": 100}])
+    evaluate = posthog_evaluation.compile_flag(flag)
+    assert evaluate(Actor("alice", {"admin": True}))
+    assert not evaluate(Actor("bob"))
+  finally:
+    groups.unregister("admins")
+
+def test_with_property_value_adds_and_removes_values():
+  flag = build_flag()
+  flag["filters"] = posthog_evaluation.with_property_value(flag, "distinct_id", "alice", True)
+  flag["filters"] = posthog_evaluation.with_property_value(flag, "distinct_id", "bob", True)
+  assert flag["filters"]["groups"][-1] == {
+    "properties": [{"key": "distinct_id", "type": "person", "operator": "exact", "value": ["alice", "bob"]}],
+    "rollout_percentage": 100
+  }
+  flag["filters"] = posthog_evaluation.with_property_value(flag, "distinct_id", "alice", False)
+  flag["filters"] = posthog_evaluation.with_property_value(flag, "distinct_id", "bob", False)
+  assert flag["filters"]["groups"] == [{"properties": [], "rollout_percentage": None}]
+
+def build_property_flag(*properties, rollout_percentage=100):
+  return build_flag(groups=[{"properties": list(properties), "rollout_percentage": rollout_percentage}])
+
+def person(key, operator, value):
+  return {"key": key, "type": "person", "operator": operator, "value": value}
+
+@pytest.mark.parametrize("operator,value,actual,expected", [
+  ("exact", ["Pro", "team"], "pro", True),
+  ("exact", "pro", "free", False),
+  ("exact", True, True, True),
+  ("is_not", ["pro"], "free", True),
+  ("is_not", ["pro"], "PRO", False),
+  ("icontains", "@Deft", "alice@deft.services", True),
+  ("not_icontains", "@deft", "bob@example.com", True),
+  ("regex", "^user_[0-9]+$", "user_42", True),
+  ("regex", "(", "user_42", False),
+  ("not_regex", "^user_", "admin", True),
+  ("gt", "10", 11, True),
+  ("gt", 10, "9", True),
+  ("gte", 10, 10, True),
+  ("lt", "10", 9.5, True),
+  ("lte", 10, 11, False),
+  ("is_date_before", "2024-01-01", "2023-12-31T12:00:00Z", True),
+  ("is_date_after", "2024-01-01", "2023-12-31", False),
+])
+def test_property_operators_match_posthog(operator, value, actual, expected):
+  flag = build_property_flag(person("plan", operator, value))
+  assert posthog_evaluation.is_enabled_for(flag, Actor("alice", {"plan": actual})) == expected
+
+def test_relative_dates_are_measured_from_now():
+  flag = build_property_flag(person("signed_up_at", "is_date_after", "-7d"))
+  recent = datetime.now(timezone.utc) - timedelta(days=1)
+  assert posthog_evaluation.is_enabled_for(flag, Actor("alice", {"signed_up_at": recent}))
+  assert not posthog_evaluation.is_enabled_for(flag, Actor("bob", {"signed_up_at": "2020-01-01"}))
+
+def test_is_set_and_is_not_set():
+  is_set = build_property_flag(person("email", "is_set", "is_set"))
+  is_not_set = build_property_flag(person("email", "is_not_set", "is_not_set"))
+  alice = Actor("alice", {"email": "alice@deft.services"})
+  assert posthog_evaluation.is_enabled_for(is_set, alice)
+  assert posthog_evaluation.compile_flag(is_set)(Actor("bob")) is None
+  assert posthog_evaluation.compile_flag(is_not_set)(alice) is None
+  assert posthog_evaluation.compile_flag(is_not_set)(Actor("bob")) is None
+
+def test_distinct_id_is_a_person_property():
+  flag = build_property_flag(person("distinct_id", "icontains", "admin_"))
+  assert posthog_evaluation.is_enabled_for(flag, "admin_1")
+  assert not posthog_evaluation.is_enabled_for(flag, "user_1")
+
+def test_every_property_in_a_condition_must_match():
+  flag = build_property_flag(person("plan", "exact", "pro"), person("country", "exact", "NZ"))
+  assert posthog_evaluation.is_enabled_for(flag, Actor("alice", {"plan": "pro", "country": "nz"}))
+  assert not posthog_evaluation.is_enabled_for(flag, Actor("bob", {"plan": "pro", "country": "AU"}))
+
+def test_any_condition_can_match():
+  flag = build_flag(groups=[
+    {"properties": [person("plan", "exact", "pro")], "rollout_percentage": 100},
+    {"properties": [person("plan", "exact", "team")], "rollout_percentage": 100},
+  ])
+  assert posthog_evaluation.is_enabled_for(flag, Actor("alice", {"plan": "team"}))
+
+def test_condition_rollout_applies_after_properties_match():
+  flag = build_property_flag(person("plan", "exact", "pro"), rollout_percentage=0)
+  assert not posthog_evaluation.is_enabled_for(flag, Actor("alice", {"plan": "pro"}))
+
+def test_missing_properties_cohorts_and_unknown_operators_are_inconclusive():
+  assert posthog_evaluation.compile_flag(build_property_flag(person("plan", "exact", "pro")))(Actor("alice")) is None
+  assert posthog_evaluation.compile_flag(build_property_flag({"key": "id", "type": "cohort", "value": 1}))(Actor("alice")) is None
+  assert posthog_evaluation.compile_flag(build_property_flag(person("version", "semver_gt", "1.0.0")))(Actor("alice", {"version": "2.0.0"})) is None
+
+def test_a_definite_match_wins_over_inconclusive_conditions():
+  flag = build_flag(groups=[
+    {"properties": [{"key": "id", "type": "cohort", "value": 1}], "rollout_percentage": 100},
+    {"properties": [person("plan", "exact", "pro")], "rollout_percentage": 100},
+  ])
+  assert posthog_evaluation.compile_flag(flag)(Actor("alice", {"plan": "pro"})) is True
+
+def test_group_flags_are_inconclusive():
+  flag = build_flag()
+  flag["filters"]["aggregation_group_type_index"] = 0
+  assert posthog_evaluation.compile_flag(flag)("alice") is None
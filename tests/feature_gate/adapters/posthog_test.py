@@ -1,11 +1,17 @@
 import pytest
+import json
 import requests
 
+from feature_gate import transfer
+from feature_gate.adapters import posthog_evaluation
 from feature_gate.adapters.posthog import PosthogAdapter
 from feature_gate.clients.posthog_api_client import RateLimitError
-from feature_gate.client import Client, FeatureNotFound
+from feature_gate.client import Client, FeatureNotFound, UnsupportedGateError
+from feature_gate.actor import Actor
 from feature_gate.feature import Feature
-from tests.fixtures.posthog_api_client.mocks import build_feature_from_mocks, mock_add_feature_funnel, mock_disable_feature_funnel, mock_enable_feature_funnel, mock_features_when_empty, mock_features_when_error_returned, mock_features_when_funnel, mock_funnel_is_disabled, mock_funnel_is_enabled, mock_remove_feature_funnel, mock_rate_limiting_error
+from feature_gate.groups import GroupNotRegistered
+from feature_gate.testing.fake_posthog import FakePosthogServer
+from tests.fixtures.posthog_api_client.mocks import build_feature_from_mocks, mock_add_feature_funnel, mock_disable_feature_funnel, mock_enable_feature_funnel, mock_features_page, mock_features_when_empty, mock_features_when_error_returned, mock_features_when_funnel, mock_flag_with_filters, mock_decide, mock_funnel_is_disabled, mock_funnel_is_enabled, mock_remove_feature_funnel, mock_rate_limiting_error
 from unittest.mock import patch
 
 def configured_client():
@@ -26,8 +32,8 @@ def test_client_returns_api_client():
 def test_add_returns_true_when_feature_does_not_exist():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_features_when_empty()):
-    with patch.object(requests, 'post', return_value=mock_add_feature_funnel()) as network_mock:
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_empty()):
+    with patch.object(requests.Session, 'post', return_value=mock_add_feature_funnel()) as network_mock:
       resp = client.add(feature)
       assert resp == True
       network_mock.assert_called_once()
@@ -35,8 +41,8 @@ def test_add_returns_true_when_feature_does_not_exist():
 def test_add_returns_true_when_feature_does_exist():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_features_when_funnel()):
-    with patch.object(requests, 'post', return_value=mock_add_feature_funnel()) as network_mock:
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()):
+    with patch.object(requests.Session, 'post', return_value=mock_add_feature_funnel()) as network_mock:
       resp = client.add(feature)
       assert resp == True
       network_mock.assert_not_called()
@@ -44,8 +50,8 @@ def test_add_returns_true_when_feature_does_exist():
 def test_remove_returns_true_when_feature_does_exist():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_features_when_funnel()):
-    with patch.object(requests, 'patch', return_value=mock_remove_feature_funnel()) as network_mock:
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()):
+    with patch.object(requests.Session, 'patch', return_value=mock_remove_feature_funnel()) as network_mock:
       resp = client.remove(feature.key)
       assert resp == True
       network_mock.assert_called_once()
@@ -53,36 +59,36 @@ def test_remove_returns_true_when_feature_does_exist():
 def test_remove_returns_true_when_feature_does_exist():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_features_when_empty()):
-    with patch.object(requests, 'patch', return_value=mock_remove_feature_funnel()) as network_mock:
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_empty()):
+    with patch.object(requests.Session, 'patch', return_value=mock_remove_feature_funnel()) as network_mock:
       resp = client.remove(feature.key)
       assert resp == True
       network_mock.assert_not_called()
 
 def test_features_returns_list_of_features():
   client = configured_client()
-  with patch.object(requests, 'get', return_value=mock_features_when_funnel()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()):
     resp = client.features()
     assert resp == ["funnel_test"]
 
 def test_is_enabled_returns_true_when_feature_is_enabled():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_funnel_is_enabled()):
+  with patch.object(requests.Session, 'get', return_value=mock_funnel_is_enabled()):
     resp = client.is_enabled(feature.key)
     assert resp == True
 
 def test_is_enabled_returns_false_when_feature_is_disabled():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_funnel_is_disabled()):
+  with patch.object(requests.Session, 'get', return_value=mock_funnel_is_disabled()):
     resp = client.is_enabled(feature.key)
     assert resp == False
 
 def test_is_enabled_raises_an_error_when_the_feature_does_not_exist():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_features_when_empty()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_empty()):
     try:
       resp = client.is_enabled(feature.key)
     except FeatureNotFound as e:
@@ -91,7 +97,7 @@ def test_is_enabled_raises_an_error_when_the_feature_does_not_exist():
 def test_is_enabled_raises_an_error_when_the_api_response_returns_an_error_status():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_features_when_error_returned()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_error_returned()):
     try:
       resp = client.is_enabled(feature.key)
     except FeatureNotFound as e:
@@ -100,7 +106,7 @@ def test_is_enabled_raises_an_error_when_the_api_response_returns_an_error_statu
 def test_is_enabled_raises_an_error_when_rate_limited():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_rate_limiting_error()):
+  with patch.object(requests.Session, 'get', return_value=mock_rate_limiting_error()):
     try:
       resp = client.is_enabled(feature.key)
     except RateLimitError as e:
@@ -109,8 +115,8 @@ def test_is_enabled_raises_an_error_when_rate_limited():
 def test_enable_returns_true_when_feature_exists():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_features_when_funnel()):
-    with patch.object(requests, 'patch', return_value=mock_enable_feature_funnel()) as network_mock:
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()):
+    with patch.object(requests.Session, 'patch', return_value=mock_enable_feature_funnel()) as network_mock:
       resp = client.enable(feature.key)
       assert resp == True
       network_mock.assert_called_once()
@@ -118,8 +124,8 @@ def test_enable_returns_true_when_feature_exists():
 def test_enable_raises_error_when_feature_does_not_exist():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_features_when_empty()):
-    with patch.object(requests, 'patch', return_value=mock_enable_feature_funnel()) as network_mock:
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_empty()):
+    with patch.object(requests.Session, 'patch', return_value=mock_enable_feature_funnel()) as network_mock:
       try:
         resp = client.enable(feature.key)
       except FeatureNotFound as e:
@@ -129,8 +135,8 @@ def test_enable_raises_error_when_feature_does_not_exist():
 def test_disable_returns_true_when_feature_exists():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_features_when_funnel()):
-    with patch.object(requests, 'patch', return_value=mock_disable_feature_funnel()) as network_mock:
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()):
+    with patch.object(requests.Session, 'patch', return_value=mock_disable_feature_funnel()) as network_mock:
       resp = client.disable(feature.key)
       assert resp == True
       network_mock.assert_called_once()
@@ -138,10 +144,301 @@ def test_disable_returns_true_when_feature_exists():
 def test_disable_raises_error_when_feature_does_not_exist():
   client = configured_client()
   feature = build_feature_from_mocks()
-  with patch.object(requests, 'get', return_value=mock_features_when_empty()):
-    with patch.object(requests, 'patch', return_value=mock_disable_feature_funnel()) as network_mock:
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_empty()):
+    with patch.object(requests.Session, 'patch', return_value=mock_disable_feature_funnel()) as network_mock:
       try:
         resp = client.disable(feature.key)
       except FeatureNotFound as e:
         assert str(e) == "Feature funnel_test not found"
       network_mock.assert_not_called()
+
+def cached_client():
+  adapter = PosthogAdapter(api_key="api_key", project_id="project_id", cache=True, background_refresh=False)
+  return Client(adapter)
+
+def test_cached_is_enabled_fetches_the_flag_list_once():
+  client = cached_client()
+  with patch.object(requests.Session, 'get', return_value=mock_funnel_is_enabled()) as network_mock:
+    assert client.is_enabled("funnel_test") == True
+    assert client.is_enabled("funnel_test") == True
+    assert client.features() == ["funnel_test"]
+    network_mock.assert_called_once()
+
+def test_cached_is_enabled_raises_when_the_feature_does_not_exist():
+  client = cached_client()
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_empty()):
+    with pytest.raises(FeatureNotFound):
+      client.is_enabled("funnel_test")
+
+def test_cached_enable_updates_the_snapshot():
+  client = cached_client()
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()) as network_mock:
+    assert client.is_enabled("funnel_test") == False
+    with patch.object(requests.Session, 'patch', return_value=mock_enable_feature_funnel()):
+      client.enable("funnel_test")
+    assert client.is_enabled("funnel_test") == True
+    network_mock.assert_called_once()
+
+def test_cached_remove_drops_the_feature_from_the_snapshot():
+  client = cached_client()
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()):
+    assert client.features() == ["funnel_test"]
+    with patch.object(requests.Session, 'patch', return_value=mock_remove_feature_funnel()):
+      client.remove("funnel_test")
+    assert client.features() == []
+
+def test_snapshot_age_is_none_without_cache():
+  client = configured_client()
+  assert client.adapter.snapshot_age() is None
+
+def test_is_enabled_many_makes_a_single_request():
+  client = configured_client()
+  with patch.object(requests.Session, 'get', return_value=mock_features_page(["a", "b", "c"])) as network_mock:
+    assert client.is_enabled_many(["a", "c"]) == {"a": False, "c": False}
+    network_mock.assert_called_once()
+
+def test_is_enabled_many_raises_when_a_feature_does_not_exist():
+  client = configured_client()
+  with patch.object(requests.Session, 'get', return_value=mock_features_page(["a"])):
+    with pytest.raises(FeatureNotFound):
+      client.is_enabled_many(["a", "missing"])
+
+def test_evaluate_all_returns_every_flag():
+  client = configured_client()
+  with patch.object(requests.Session, 'get', return_value=mock_funnel_is_enabled()) as network_mock:
+    assert client.evaluate_all() == {"funnel_test": True}
+    network_mock.assert_called_once()
+
+def test_enable_percentage_of_actors_patches_the_rollout_percentage():
+  client = configured_client()
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()):
+    with patch.object(requests.Session, 'patch', return_value=mock_enable_feature_funnel()) as network_mock:
+      assert client.enable_percentage_of_actors("funnel_test", 25)
+      payload = json.loads(network_mock.call_args.kwargs["data"])
+      assert payload == {"active": True, "filters": {"groups": [{"properties": [], "rollout_percentage": 25}]}}
+
+def test_is_enabled_with_an_actor_evaluates_release_conditions():
+  client = configured_client()
+  with patch.object(requests.Session, 'get', return_value=mock_funnel_is_enabled()):
+    assert client.is_enabled("funnel_test", "user_1") == True
+  with patch.object(requests.Session, 'get', return_value=mock_funnel_is_disabled()):
+    assert client.is_enabled("funnel_test", "user_1") == False
+    assert client.is_enabled_for_actors("funnel_test", ["user_1", "user_2"]) == [False, False]
+
+def test_enable_actor_patches_a_distinct_id_release_condition():
+  client = configured_client()
+  # funnel_test is listed inactive, with Posthog's default catch-all condition.
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()):
+    with patch.object(requests.Session, 'patch', return_value=mock_enable_feature_funnel()) as network_mock:
+      assert client.enable_actor("funnel_test", "alice")
+      payload = json.loads(network_mock.call_args.kwargs["data"])
+      assert payload["active"] == True
+      assert payload["filters"]["groups"] == [{
+        "properties": [{"key": "distinct_id", "type": "person", "operator": "exact", "value": ["alice"]}],
+        "rollout_percentage": 100
+      }]
+      enabled = dict(payload, key="funnel_test")
+      assert posthog_evaluation.is_enabled_for(enabled, "alice")
+      assert not posthog_evaluation.is_enabled_for(enabled, "bob")
+
+def test_enable_actor_on_a_disabled_flag_enables_only_that_actor():
+  with FakePosthogServer() as server:
+    server.create("beta", active=False)
+    adapter = fake_posthog_adapter(server)
+    assert adapter.enable_actor("beta", "alice")
+    assert adapter.is_enabled("beta", "alice")
+    assert not adapter.is_enabled("beta", "bob")
+    assert not adapter.is_enabled("beta")
+    assert adapter.enable_actor("beta", "carol")
+    assert adapter.is_enabled("beta", "alice") and adapter.is_enabled("beta", "carol")
+    assert not adapter.is_enabled("beta", "bob")
+
+def test_enable_group_raises_when_the_group_is_not_registered():
+  client = configured_client()
+  with pytest.raises(GroupNotRegistered):
+    client.enable_group("funnel_test", "unknown")
+
+def test_cached_actor_checks_reuse_the_compiled_flag():
+  client = cached_client()
+  with patch.object(requests.Session, 'get', return_value=mock_funnel_is_enabled()):
+    assert client.is_enabled("funnel_test", "alice")
+    compiled = client.adapter._compiled["funnel_test"]
+    assert client.is_enabled("funnel_test", "bob")
+    assert client.adapter._compiled["funnel_test"] is compiled
+
+def test_remove_after_listing_makes_a_single_patch():
+  client = configured_client()
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()) as get_mock:
+    assert client.features() == ["funnel_test"]
+    with patch.object(requests.Session, 'patch', return_value=mock_remove_feature_funnel()) as patch_mock:
+      assert client.remove("funnel_test")
+      patch_mock.assert_called_once()
+    get_mock.assert_called_once()
+
+def test_export_maps_release_conditions_to_gates():
+  client = configured_client()
+  with patch.object(requests.Session, 'get', return_value=mock_funnel_is_enabled()):
+    records = list(client.adapter.export())
+  assert records == [{
+    "key": "funnel_test",
+    "name": "funnel_test",
+    "description": "This is a feature flag tests a conversion funnel",
+    "gates": {"boolean": True, "actors": [], "groups": [], "percentage_of_actors": 0, "expression": None}
+  }]
+
+ROLLOUT_CONDITION = {"groups": [{"properties": [], "rollout_percentage": 50}, {"properties": [{"key": "distinct_id", "type": "person", "operator": "exact", "value": ["alice"]}], "rollout_percentage": 100}]}
+
+def test_export_maps_an_inactive_flag_to_default_gates():
+  client = configured_client()
+  with patch.object(requests.Session, 'get', return_value=mock_flag_with_filters(ROLLOUT_CONDITION, active=False)):
+    records = list(client.adapter.export())
+  assert records[0]["gates"] == {"boolean": False, "actors": [], "groups": [], "percentage_of_actors": 0, "expression": None}
+
+def test_export_maps_an_active_flag_without_conditions_to_the_boolean_gate():
+  client = configured_client()
+  with patch.object(requests.Session, 'get', return_value=mock_flag_with_filters({"groups": []})):
+    records = list(client.adapter.export())
+  assert records[0]["gates"]["boolean"]
+
+EMAIL_CONDITION = {"groups": [{"properties": [{"key": "email", "type": "person", "operator": "icontains", "value": "@deft.services"}], "rollout_percentage": 100}]}
+COHORT_CONDITION = {"groups": [{"properties": [{"key": "id", "type": "cohort", "value": 42}], "rollout_percentage": 100}]}
+
+def cross_checked_client(cross_check):
+  adapter = PosthogAdapter(api_key="api_key", project_id="project_id", project_api_key="phc_token", cache=True, background_refresh=False, cross_check=cross_check)
+  return Client(adapter)
+
+def test_cached_actor_checks_match_person_properties_locally():
+  client = cached_client()
+  with patch.object(requests.Session, 'get', return_value=mock_flag_with_filters(EMAIL_CONDITION)) as get_mock:
+    assert client.is_enabled("funnel_test", Actor("alice", {"email": "alice@deft.services"}))
+    assert not client.is_enabled("funnel_test", Actor("bob", {"email": "bob@example.com"}))
+    assert not client.is_enabled("funnel_test", Actor("carol"))
+    get_mock.assert_called_once()
+
+def test_cross_check_counts_mismatches_with_decide():
+  client = cross_checked_client(1)
+  with patch.object(requests.Session, 'get', return_value=mock_flag_with_filters(EMAIL_CONDITION)):
+    with patch.object(requests.Session, 'post', return_value=mock_decide({"funnel_test": False})) as post_mock:
+      assert client.is_enabled("funnel_test", Actor("alice", {"email": "alice@deft.services"}))
+      payload = json.loads(post_mock.call_args.kwargs["data"])
+      assert payload == {"token": "phc_token", "distinct_id": "alice", "person_properties": {"email": "alice@deft.services", "distinct_id": "alice"}}
+  assert client.adapter.cross_check_stats() == {"checked": 1, "mismatches": 1, "inconclusive": 0, "errors": 0}
+
+def test_cross_check_uses_decide_for_inconclusive_flags():
+  client = cross_checked_client(0.0001)
+  with patch.object(requests.Session, 'get', return_value=mock_flag_with_filters(COHORT_CONDITION)):
+    with patch.object(requests.Session, 'post', return_value=mock_decide({"funnel_test": True})):
+      assert client.is_enabled("funnel_test", Actor("alice"))
+  assert client.adapter.cross_check_stats()["inconclusive"] == 1
+
+def test_inconclusive_flags_are_disabled_without_cross_check():
+  client = cached_client()
+  with patch.object(requests.Session, 'get', return_value=mock_flag_with_filters(COHORT_CONDITION)):
+    with patch.object(requests.Session, 'post') as post_mock:
+      assert not client.is_enabled("funnel_test", Actor("alice"))
+      post_mock.assert_not_called()
+
+def fake_posthog_adapter(server, **options):
+  return PosthogAdapter(api_key="api_key", project_id="1", api_base=server.url, max_retries=0, cache=True, background_refresh=False, **options)
+
+def test_cached_refresh_keeps_the_snapshot_when_nothing_changed():
+  with FakePosthogServer(page_size=2) as server:
+    server.seed(5)
+    adapter = fake_posthog_adapter(server)
+    adapter.refresh()
+    snapshot = adapter.cache.peek()
+    adapter.refresh()
+    assert adapter.cache.peek() is snapshot
+    assert adapter.refresh_stats()["not_modified"] == 1
+    assert server.stats()["statuses"][304] == 3
+
+def test_incremental_refresh_merges_changes_and_deletions():
+  with FakePosthogServer(page_size=5, incremental_params=True) as server:
+    server.seed(20)
+    adapter = fake_posthog_adapter(server, incremental=True)
+    adapter.refresh()
+    writer = PosthogAdapter(api_key="api_key", project_id="1", api_base=server.url, max_retries=0)
+    writer.enable("flag_1")
+    writer.remove("flag_2")
+    requests_before = server.stats()["requests"]
+    adapter.refresh()
+    assert len(adapter.features()) == 19 and "flag_2" not in adapter.features()
+    assert adapter.is_enabled("flag_1")
+    assert adapter.refresh_stats()["incremental"] == 1
+    # One page of changes and one count, not the four pages of the full list.
+    assert server.stats()["requests"] - requests_before == 2
+
+def test_incremental_refresh_falls_back_when_a_deletion_is_missed():
+  with FakePosthogServer(incremental_params=True) as server:
+    server.seed(3)
+    adapter = fake_posthog_adapter(server, incremental=True)
+    adapter.refresh()
+    server.purge("flag_1")
+    adapter.refresh()
+    assert sorted(adapter.features()) == ["flag_0", "flag_2"]
+    assert adapter.refresh_stats()["fallbacks"] == 1
+
+def test_incremental_refresh_turns_itself_off_when_the_server_ignores_it():
+  with FakePosthogServer(page_size=5) as server:
+    server.seed(20)
+    adapter = fake_posthog_adapter(server, incremental=True)
+    adapter.refresh()
+    writer = PosthogAdapter(api_key="api_key", project_id="1", api_base=server.url, max_retries=0)
+    writer.enable("flag_1")
+    requests_before = server.stats()["requests"]
+    adapter.refresh()
+    assert not adapter.incremental
+    assert adapter.is_enabled("flag_1")
+    # One page to notice, then the four pages of a full refresh; no count.
+    assert server.stats()["requests"] - requests_before == 5
+    requests_before = server.stats()["requests"]
+    adapter.refresh()
+    assert server.stats()["requests"] - requests_before == 4
+    assert adapter.refresh_stats() == {"full": 3, "incremental": 0, "not_modified": 1, "fallbacks": 1}
+
+def test_checks_without_an_actor_need_the_flag_on_for_everyone():
+  with FakePosthogServer() as server:
+    server.create("checkout", active=False)
+    adapter = fake_posthog_adapter(server)
+    adapter.enable_percentage_of_actors("checkout", 30)
+    assert server.flags["checkout"]["filters"]["groups"] == [{"properties": [], "rollout_percentage": 30}]
+    assert not adapter.is_enabled("checkout")
+    assert adapter.is_enabled_many(["checkout"]) == {"checkout": False}
+    assert adapter.evaluate_all() == {"checkout": False}
+    adapter.enable("checkout")
+    assert adapter.is_enabled("checkout")
+    adapter.enable_percentage_of_actors("checkout", 10)
+    assert adapter.is_enabled("checkout")
+    assert posthog_evaluation.gates_from_flag(server.flags["checkout"])["percentage_of_actors"] == 10
+
+def test_import_writes_each_changed_flag_once():
+  with FakePosthogServer(page_size=5) as server:
+    server.seed(20)
+    server.create("beta", active=True)
+    adapter = PosthogAdapter(api_key="api_key", project_id="1", api_base=server.url, max_retries=0)
+    entries = [transfer.record("beta", actors=["alice", "bob"], percentage_of_actors=5), transfer.record("flag_0", boolean=True)]
+    summary = transfer.apply(adapter, entries, max_workers=1)
+    assert summary == {"added": 0, "updated": 1, "unchanged": 1, "removed": 0, "writes": 1}
+    # Five pages to diff against, then one GET by id and one PATCH for beta.
+    assert server.stats()["methods"] == {"GET": 6, "PATCH": 1}
+    assert adapter.is_enabled("beta", "alice")
+    assert not adapter.is_enabled("beta")
+    assert sum(adapter.is_enabled_for_actors("beta", [f"user_{i}" for i in range(1_000)])) < 100
+    assert posthog_evaluation.gates_from_flag(server.flags["beta"]) == entries[0]["gates"]
+
+def test_expression_gates_are_unsupported():
+  client = configured_client()
+  with pytest.raises(UnsupportedGateError, match="PosthogAdapter does not support expression gates"):
+    client.enable_expression("funnel_test", {"Equal": [{"Property": ["plan"]}, "pro"]})
+  with pytest.raises(UnsupportedGateError):
+    client.expression("funnel_test")
+
+def test_add_recreates_a_flag_deleted_by_another_process():
+  with FakePosthogServer() as server:
+    adapter = PosthogAdapter(api_key="api_key", project_id="1", api_base=server.url, max_retries=0)
+    feature = Feature("Checkout", "checkout", "New checkout")
+    adapter.add(feature)
+    other = PosthogAdapter(api_key="api_key", project_id="1", api_base=server.url, max_retries=0)
+    other.remove("checkout")
+    assert adapter.add(feature)
+    assert "checkout" in server.flags
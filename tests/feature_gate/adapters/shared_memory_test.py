@@ -0,0 +1,115 @@
+import multiprocessing
+import pytest
+import time
+from feature_gate.adapters import posthog_evaluation
+from feature_gate.adapters.shared_memory import SharedMemoryAdapter
+from feature_gate.client import Client, FeatureNotFound
+from feature_gate.feature import Feature
+
+@pytest.fixture
+def client():
+  adapter = SharedMemoryAdapter(capacity=16)
+  yield Client(adapter)
+  adapter.close()
+  adapter.unlink()
+
+def build_feature(key="test_feature"):
+  return Feature(key, key, "This is a test feature")
+
+def test_add_enable_disable_and_remove(client):
+  assert client.add(build_feature())
+  assert client.add(build_feature())
+  assert client.features() == ["test_feature"]
+  assert not client.is_enabled("test_feature")
+  assert client.enable("test_feature")
+  assert client.is_enabled("test_feature")
+  assert client.evaluate_all() == {"test_feature": True}
+  assert client.disable("test_feature")
+  assert not client.is_enabled("test_feature")
+  assert client.remove("test_feature")
+  assert client.features() == []
+
+def test_missing_features_raise(client):
+  with pytest.raises(FeatureNotFound):
+    client.is_enabled("test_feature")
+  with pytest.raises(FeatureNotFound):
+    client.enable("test_feature")
+
+def test_percentage_of_actors_matches_the_rollout_engine(client):
+  client.add(build_feature())
+  client.enable_percentage_of_actors("test_feature", 25)
+  enabled = sum(client.is_enabled("test_feature", f"user_{i}") for i in range(2_000))
+  assert 400 < enabled < 600
+
+def test_removed_slots_are_reused(client):
+  for i in range(16):
+    client.add(build_feature(f"flag_{i}"))
+  with pytest.raises(RuntimeError):
+    client.add(build_feature("one_too_many"))
+  client.remove("flag_3")
+  client.add(build_feature("one_too_many"))
+  assert not client.is_enabled("one_too_many")
+  with pytest.raises(FeatureNotFound):
+    client.is_enabled("flag_3")
+
+def test_rejects_keys_longer_than_a_slot(client):
+  with pytest.raises(ValueError):
+    client.add(build_feature("k" * 65))
+
+def test_attaching_by_name_sees_the_same_table(client):
+  client.add(build_feature())
+  client.enable("test_feature")
+  attached = SharedMemoryAdapter(name=client.adapter.name, create=False, lock=client.adapter.lock)
+  try:
+    assert attached.is_enabled("test_feature")
+    attached.disable("test_feature")
+    assert not client.is_enabled("test_feature")
+  finally:
+    attached.close()
+
+def test_attaching_requires_the_shared_lock(client):
+  with pytest.raises(ValueError, match="lock"):
+    SharedMemoryAdapter(name=client.adapter.name, create=False)
+
+def test_generation_is_8_byte_aligned(client):
+  from feature_gate.adapters import shared_memory
+  assert shared_memory.GENERATION_OFFSET % 8 == 0
+  assert shared_memory.HEADER.size <= shared_memory.GENERATION_OFFSET
+  client.add(build_feature())
+  assert shared_memory.GENERATION.unpack_from(client.adapter.shm.buf, shared_memory.GENERATION_OFFSET)[0] == 1
+
+def _wait_for_flag(adapter, ready, results):
+  ready.set()
+  for _ in range(2_000):
+    if adapter.is_enabled("test_feature"):
+      results.put(True)
+      return
+    time.sleep(0.005)
+  results.put(False)
+
+def test_forked_workers_see_updates_immediately(client):
+  context = multiprocessing.get_context("fork")
+  client.add(build_feature())
+  ready = context.Event()
+  results = context.Queue()
+  worker = context.Process(target=_wait_for_flag, args=(client.adapter, ready, results))
+  worker.start()
+  ready.wait(5)
+  client.enable("test_feature")
+  assert results.get(timeout=15)
+  worker.join(5)
+
+def test_attached_tables_bucket_with_the_creators_rollout():
+  adapter = SharedMemoryAdapter(capacity=4, rollout=posthog_evaluation.ROLLOUT)
+  try:
+    adapter.add(build_feature())
+    adapter.enable_percentage_of_actors("test_feature", 30)
+    attached = SharedMemoryAdapter(name=adapter.name, create=False, lock=adapter.lock)
+    assert attached.rollout is posthog_evaluation.ROLLOUT
+    actors = [f"user_{i}" for i in range(500)]
+    expected = posthog_evaluation.ROLLOUT.enabled_actors("test_feature", 30, actors)
+    assert [attached.is_enabled("test_feature", actor) for actor in actors] == expected
+    attached.close()
+  finally:
+    adapter.close()
+    adapter.unlink()
@@ -0,0 +1,93 @@
+import pytest
+import threading
+from feature_gate import transfer
+from feature_gate.actor import Actor
+from feature_gate.adapters import posthog_evaluation
+from feature_gate.adapters.memory import MemoryAdapter
+from feature_gate.adapters.snapshot_file import SnapshotFileAdapter, refresh_snapshot, write_snapshot
+from feature_gate.client import Client, FeatureNotFound, ReadOnlyError
+from feature_gate.feature import Feature
+
+def source_adapter():
+  adapter = MemoryAdapter()
+  adapter.add(Feature("Search", "search", "New search"))
+  adapter.add(Feature("Checkout", "checkout", "New checkout"))
+  adapter.enable("search")
+  adapter.enable_actor("checkout", "alice")
+  adapter.enable_percentage_of_actors("checkout", 12.5)
+  adapter.enable_expression("checkout", {"Equal": [{"Property": ["plan"]}, "pro"]})
+  return adapter
+
+def configured_client(tmp_path, source=None):
+  path = tmp_path / "flags.snapshot"
+  write_snapshot(path, transfer.records(source or source_adapter()))
+  return Client(SnapshotFileAdapter(path, check_interval=0))
+
+def test_reads_features_from_the_snapshot(tmp_path):
+  client = configured_client(tmp_path)
+  assert client.features() == ["search", "checkout"]
+  assert client.is_enabled("search")
+  assert not client.is_enabled("checkout")
+  assert client.evaluate_all() == {"search": True, "checkout": False}
+
+def test_evaluates_actor_gates(tmp_path):
+  source = source_adapter()
+  client = configured_client(tmp_path, source)
+  assert client.is_enabled("checkout", "alice")
+  assert client.is_enabled("checkout", Actor("bob", {"plan": "pro"}))
+  actors = [f"user_{i}" for i in range(500)]
+  assert [client.is_enabled("checkout", actor) for actor in actors] == [source.is_enabled("checkout", actor) for actor in actors]
+
+def test_export_round_trips_the_source(tmp_path):
+  source = source_adapter()
+  client = configured_client(tmp_path, source)
+  assert list(client.adapter.export()) == list(transfer.records(source))
+
+def test_is_enabled_raises_when_the_feature_does_not_exist(tmp_path):
+  client = configured_client(tmp_path)
+  with pytest.raises(FeatureNotFound):
+    client.is_enabled("missing")
+
+def test_writes_are_rejected(tmp_path):
+  client = configured_client(tmp_path)
+  assert client.is_read_only()
+  with pytest.raises(ReadOnlyError):
+    client.enable("checkout")
+  with pytest.raises(ReadOnlyError):
+    client.add(Feature("New", "new", "New flag"))
+
+def test_reloads_when_the_file_is_replaced(tmp_path):
+  source = source_adapter()
+  client = configured_client(tmp_path, source)
+  source.disable("search")
+  write_snapshot(client.adapter.path, transfer.records(source))
+  assert not client.is_enabled("search")
+
+def test_missing_file_is_an_empty_snapshot_until_written(tmp_path):
+  path = tmp_path / "flags.snapshot"
+  client = Client(SnapshotFileAdapter(path, check_interval=0))
+  assert client.features() == []
+  write_snapshot(path, transfer.records(source_adapter()))
+  assert client.features() == ["search", "checkout"]
+
+def test_finds_every_key_in_a_large_snapshot(tmp_path):
+  records = [transfer.record(f"flag_{i}", boolean=i % 2 == 0) for i in range(10_000)]
+  path = tmp_path / "flags.snapshot"
+  write_snapshot(path, records)
+  adapter = SnapshotFileAdapter(path)
+  assert all(adapter.is_enabled(f"flag_{i}") == (i % 2 == 0) for i in range(10_000))
+  with pytest.raises(FeatureNotFound):
+    adapter.is_enabled("flag_10000")
+
+def test_percentage_gates_use_the_rollout_of_the_source(tmp_path):
+  source = MemoryAdapter(rollout=posthog_evaluation.ROLLOUT)
+  source.add(Feature("Checkout", "checkout", "New checkout"))
+  source.enable_percentage_of_actors("checkout", 30)
+  path = tmp_path / "flags.snapshot"
+  stop = threading.Event()
+  stop.set()
+  refresh_snapshot(source, path, stop=stop)
+  adapter = SnapshotFileAdapter(path)
+  assert adapter.snapshot().rollout is posthog_evaluation.ROLLOUT
+  actors = [f"user_{i}" for i in range(500)]
+  assert [adapter.is_enabled("checkout", actor) for actor in actors] == source.is_enabled_for_actors("checkout", actors)
@@ -0,0 +1,122 @@
+import pytest
+from feature_gate import transfer
+from feature_gate.adapters.memory import MemoryAdapter
+from feature_gate.adapters.posthog import PosthogAdapter
+from feature_gate.adapters.sync import SyncAdapter
+from feature_gate.client import Client
+from feature_gate.feature import Feature
+from feature_gate.testing.fake_posthog import FakePosthogServer
+from unittest.mock import patch
+
+def build_remote():
+  remote = MemoryAdapter()
+  remote.add(Feature("Search", "search", "New search"))
+  remote.enable("search")
+  return remote
+
+def configured_client(remote, local=None):
+  adapter = SyncAdapter(local or MemoryAdapter(), remote, background=False)
+  return Client(adapter)
+
+def test_initial_sync_mirrors_the_remote():
+  client = configured_client(build_remote())
+  assert client.features() == ["search"]
+  assert client.is_enabled("search")
+  assert client.adapter.sync_stats()["last_diff_size"] == 1
+
+def test_initial_sync_removes_local_features_missing_from_the_remote():
+  local = MemoryAdapter()
+  local.add(Feature("Stale", "stale", "Stale flag"))
+  client = configured_client(build_remote(), local)
+  assert client.features() == ["search"]
+
+def test_reads_do_not_touch_the_remote():
+  remote = build_remote()
+  client = configured_client(remote)
+  with patch.object(remote, "is_enabled") as remote_is_enabled, patch.object(remote, "features") as remote_features:
+    client.is_enabled("search")
+    client.features()
+    remote_is_enabled.assert_not_called()
+    remote_features.assert_not_called()
+
+def test_sync_applies_only_the_remote_changes():
+  remote = build_remote()
+  remote.add(Feature("Checkout", "checkout", "New checkout"))
+  client = configured_client(remote)
+  remote.enable_actor("checkout", "alice")
+  remote.remove("search")
+  assert client.sync() == 2
+  assert client.features() == ["checkout"]
+  assert client.is_enabled("checkout", "alice")
+  assert client.sync() == 0
+
+def test_writes_go_to_the_remote_and_the_local_copy():
+  remote = build_remote()
+  client = configured_client(remote)
+  client.disable("search")
+  assert not remote.is_enabled("search")
+  assert not client.is_enabled("search")
+
+def test_sync_after_a_remove_through_the_adapter_keeps_syncing():
+  remote = build_remote()
+  remote.add(Feature("Checkout", "checkout", "New checkout"))
+  client = configured_client(remote)
+  client.remove("checkout")
+  client.sync()
+  remote.disable("search")
+  client.sync()
+  assert not client.is_enabled("search")
+  assert client.features() == ["search"]
+
+def test_sync_restores_local_writes_the_remote_did_not_keep():
+  remote = build_remote()
+  client = configured_client(remote)
+  client.disable("search")
+  remote.enable("search")
+  client.sync()
+  assert client.is_enabled("search")
+  with patch.object(remote, "enable_actor", side_effect=RuntimeError("remote down")):
+    with pytest.raises(RuntimeError):
+      client.enable_actor("search", "alice")
+  client.sync()
+  assert list(transfer.records(client.adapter.local)) == list(transfer.records(remote))
+
+def test_reads_keep_working_when_the_remote_fails():
+  remote = build_remote()
+  client = configured_client(remote)
+  with patch.object(remote, "export", side_effect=ConnectionError("outage")):
+    with pytest.raises(ConnectionError):
+      client.sync()
+    assert client.is_enabled("search")
+    assert client.adapter.sync_stats()["last_error"] == "outage"
+
+def test_sync_stats_report_timing():
+  client = configured_client(build_remote())
+  stats = client.adapter.sync_stats()
+  assert stats["last_synced_at"] is not None
+  assert stats["last_duration"] >= 0
+
+def test_background_sync_runs_on_an_interval():
+  remote = build_remote()
+  adapter = SyncAdapter(MemoryAdapter(), remote, interval=0.01)
+  try:
+    remote.add(Feature("Checkout", "checkout", "New checkout"))
+    for _ in range(200):
+      if "checkout" in adapter.features():
+        break
+      adapter._stop.wait(0.01)
+    assert "checkout" in adapter.features()
+  finally:
+    adapter.stop()
+
+def test_mirrored_posthog_rollouts_enable_the_same_actors():
+  with FakePosthogServer() as server:
+    server.create("checkout", active=True, filters={"groups": [{"properties": [], "rollout_percentage": 30}]})
+    remote = PosthogAdapter(api_key="api_key", project_id="1", api_base=server.url, max_retries=0, cache=True, background_refresh=False)
+    adapter = SyncAdapter(MemoryAdapter(), remote, background=False)
+    actors = [f"user_{i}" for i in range(500)]
+    local = [adapter.is_enabled("checkout", actor) for actor in actors]
+    assert local == [remote.is_enabled("checkout", actor) for actor in actors]
+    assert adapter.is_enabled_for_actors("checkout", actors) == local
+    assert 100 < sum(local) < 200
+    assert adapter.is_enabled("checkout") == remote.is_enabled("checkout") == False
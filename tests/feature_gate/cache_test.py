@@ -0,0 +1,114 @@
+import threading
+
+from feature_gate.cache import SnapshotCache
+
+class FakeClock:
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+class CountingLoader:
+  def __init__(self):
+    self.calls = 0
+    self.loaded = threading.Event()
+
+  def __call__(self):
+    self.calls += 1
+    self.loaded.set()
+    return {"flag": self.calls}
+
+def build_cache(loader, clock):
+  return SnapshotCache(loader, refresh_interval=30, max_stale=300, background=False, clock=clock)
+
+def test_get_loads_the_snapshot_once_while_fresh():
+  clock = FakeClock()
+  loader = CountingLoader()
+  cache = build_cache(loader, clock)
+  assert cache.get() == {"flag": 1}
+  clock.now = 10
+  assert cache.get() == {"flag": 1}
+  assert loader.calls == 1
+
+def test_concurrent_cold_reads_share_one_load():
+  clock = FakeClock()
+  started = threading.Event()
+  release = threading.Event()
+  calls = []
+
+  def loader():
+    calls.append(1)
+    started.set()
+    release.wait(5)
+    return {"flag": len(calls)}
+
+  cache = build_cache(loader, clock)
+  results = []
+  threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(20)]
+  for thread in threads:
+    thread.start()
+  started.wait(5)
+  release.set()
+  for thread in threads:
+    thread.join()
+  assert len(calls) == 1
+  assert results == [{"flag": 1}] * 20
+
+def test_age_reports_seconds_since_last_load():
+  clock = FakeClock()
+  cache = build_cache(CountingLoader(), clock)
+  assert cache.age() is None
+  cache.get()
+  clock.now = 12.5
+  assert cache.age() == 12.5
+
+def test_get_serves_stale_snapshot_while_revalidating():
+  clock = FakeClock()
+  loader = CountingLoader()
+  cache = build_cache(loader, clock)
+  cache.get()
+  loader.loaded.clear()
+  clock.now = 60
+  assert cache.get() == {"flag": 1}
+  assert loader.loaded.wait(1)
+  cache.refresh()
+  assert cache.get() == {"flag": 3}
+
+def test_get_refreshes_synchronously_past_max_stale():
+  clock = FakeClock()
+  loader = CountingLoader()
+  cache = build_cache(loader, clock)
+  cache.get()
+  clock.now = 301
+  assert cache.get() == {"flag": 2}
+
+def test_update_and_discard_do_not_mutate_the_previous_snapshot():
+  clock = FakeClock()
+  cache = build_cache(CountingLoader(), clock)
+  before = cache.get()
+  cache.update("other", 2)
+  cache.discard("flag")
+  assert cache.get() == {"other": 2}
+  assert before == {"flag": 1}
+
+def test_background_refresh_reloads_on_interval():
+  loader = CountingLoader()
+  cache = SnapshotCache(loader, refresh_interval=0.01, max_stale=1)
+  try:
+    assert loader.loaded.wait(1)
+  finally:
+    cache.stop()
+  assert loader.calls >= 1
+
+def test_instrumenter_sees_hits_stale_reads_and_misses():
+  clock = FakeClock()
+  events = []
+  cache = SnapshotCache(CountingLoader(), refresh_interval=30, max_stale=300, background=False, clock=clock, instrumenter=lambda event, payload: events.append(payload["result"]))
+  cache.get()
+  cache.get()
+  clock.now = 100
+  cache.get()
+  clock.now = 1000
+  cache.get()
+  assert events == ["miss", "hit", "stale", "miss"]
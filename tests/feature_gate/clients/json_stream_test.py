@@ -0,0 +1,63 @@
+import json
+import pytest
+import random
+
+from feature_gate.clients.json_stream import IncompleteJSON, load_list
+
+def build_body(count=20):
+  return {
+    "count": count,
+    "next": None,
+    "previous": None,
+    "results": [
+      {
+        "id": i,
+        "key": f"flag_{i}",
+        "name": "Ünïcode flag",
+        "active": i % 2 == 0,
+        "filters": {"groups": [{"properties": [], "rollout_percentage": 25}]},
+        "created_by": {"email": "patrick@deft.services"},
+        "tags": ["a", "b"],
+      }
+      for i in range(count)
+    ],
+  }
+
+def split(raw, rng, pieces):
+  cuts = sorted(rng.sample(range(1, len(raw)), pieces))
+  return [raw[start:end] for start, end in zip([0] + cuts, cuts + [len(raw)])]
+
+def test_decodes_the_same_as_json_whatever_the_chunking():
+  body = build_body()
+  raw = json.dumps(body, ensure_ascii=False, indent=2).encode()
+  rng = random.Random(7)
+  for _ in range(50):
+    data = load_list(split(raw, rng, rng.randint(1, 60)), fields=None)
+    assert data == body
+
+def test_keeps_only_the_requested_fields():
+  data = load_list([json.dumps(build_body(2)).encode()])
+  assert data["count"] == 2
+  assert data["results"][0] == {
+    "id": 0,
+    "key": "flag_0",
+    "name": "Ünïcode flag",
+    "active": True,
+    "filters": {"groups": [{"properties": [], "rollout_percentage": 25}]},
+  }
+
+def test_numbers_split_across_chunks_are_not_truncated():
+  assert load_list([b'{"count": 12', b'34, "results": []}']) == {"count": 1234, "results": []}
+
+def test_empty_objects_and_arrays():
+  assert load_list([b"{}"]) == {}
+  assert load_list([b'{"results": []}']) == {"results": []}
+
+@pytest.mark.parametrize("raw", [b'{"results": [{"id": 1}', b'{"count": 1', b""])
+def test_truncated_bodies_raise(raw):
+  with pytest.raises(IncompleteJSON):
+    load_list([raw])
+
+def test_malformed_bodies_raise():
+  with pytest.raises(json.JSONDecodeError):
+    load_list([b'{"count" 1}'])
@@ -1,9 +1,13 @@
 import pytest
 import requests
 
-from feature_gate.clients.posthog_api_client import PosthogAPIClient, PosthogAPIClientError
-from tests.fixtures.posthog_api_client.mocks import build_feature_from_mocks, load_response, mock_add_feature_funnel, mock_disable_feature_funnel, mock_enable_feature_funnel, mock_features_when_empty, mock_features_when_funnel, mock_funnel_is_disabled, mock_funnel_is_enabled, mock_remove_feature_funnel
-from unittest.mock import patch
+from feature_gate.client import FeatureNotFound
+from feature_gate.instrumentation import Metrics
+from feature_gate.clients.posthog_api_client import PosthogAPIClient, PosthogAPIClientError, PosthogAPIResponseError, RateLimitError
+from feature_gate.testing.fake_posthog import FakePosthogServer
+from tests.fixtures.http_server import ScriptedServer
+from tests.fixtures.posthog_api_client.mocks import build_feature_from_mocks, load_response, mock_add_feature_funnel, mock_disable_feature_funnel, mock_enable_feature_funnel, mock_features_page, mock_features_when_empty, mock_features_when_error_returned, mock_features_when_funnel, mock_funnel_is_disabled, mock_funnel_is_enabled, mock_not_found, mock_remove_feature_funnel
+from unittest.mock import Mock, patch
 
 def configured_client():
   return PosthogAPIClient(api_key="api_key", project_id="project_id")
@@ -21,7 +25,7 @@ def test_api_base_uses_default():
   assert client.api_base == "https://app.posthog.com"
 
 def test_list_features_returns_a_list_of_features():
-  with patch.object(requests, 'get', return_value=mock_features_when_funnel()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()):
     client = configured_client()
     response = client.list_features()
     assert "data" in response and "pagination" in response
@@ -29,8 +33,32 @@ def test_list_features_returns_a_list_of_features():
     assert response["data"][0]["key"] == "funnel_test"
     assert response["data"][0]["name"] == "This is a feature flag tests a conversion funnel"
 
+def test_list_features_logs_the_page_size_not_the_body():
+  with patch.object(requests.Session, 'get', return_value=mock_features_page(["a", "b"])):
+    client = configured_client()
+    with patch.object(client, 'logger') as mock_logger:
+      client.list_features()
+    mock_logger.debug.assert_called_once()
+    assert mock_logger.debug.call_args.kwargs["count"] == 2
+    assert "response" not in mock_logger.debug.call_args.kwargs
+
+def test_instrumenter_sees_each_http_request():
+  metrics = Metrics()
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()):
+    client = PosthogAPIClient(api_key="api_key", project_id="project_id", instrumenter=metrics)
+    client.list_features()
+  assert metrics.counter("feature_gate_http_requests_total", method="GET", status="200") == 1
+
+def test_instrumenter_records_connection_errors():
+  metrics = Metrics()
+  with patch.object(requests.Session, 'get', side_effect=requests.ConnectionError()):
+    client = PosthogAPIClient(api_key="api_key", project_id="project_id", instrumenter=metrics)
+    with pytest.raises(PosthogAPIClientError):
+      client.list_features()
+  assert metrics.counter("feature_gate_http_requests_total", method="GET", status="error") == 1
+
 def test_create_feature_returns_the_feature_created():
-  with patch.object(requests, 'post', return_value=mock_add_feature_funnel()):
+  with patch.object(requests.Session, 'post', return_value=mock_add_feature_funnel()):
     client = configured_client()
     feature = build_feature_from_mocks()
     response = client.create_feature(feature.key, feature.description)
@@ -39,7 +67,7 @@ def test_create_feature_returns_the_feature_created():
     assert response["data"]["deleted"] == False
 
 def test_fetch_feature_returns_the_feature():
-  with patch.object(requests, 'get', return_value=mock_features_when_funnel()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()):
     client = configured_client()
     feature = build_feature_from_mocks()
     response = client.fetch_feature(feature.key)
@@ -48,13 +76,13 @@ def test_fetch_feature_returns_the_feature():
     assert response["deleted"] == False
 
 def test_fetch_feature_returns_none_when_not_found():
-  with patch.object(requests, 'get', return_value=mock_features_when_empty()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_empty()):
     client = configured_client()
     response = client.fetch_feature("not_found")
     assert response == None
 
 def test_delete_feature_returns_the_feature_deleted():
-  with patch.object(requests, 'get', return_value=mock_features_when_funnel()), patch.object(requests, 'patch', return_value=mock_remove_feature_funnel()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()), patch.object(requests.Session, 'patch', return_value=mock_remove_feature_funnel()):
     client = configured_client()
     feature = build_feature_from_mocks()
     response = client.delete_feature(feature.key)
@@ -63,21 +91,21 @@ def test_delete_feature_returns_the_feature_deleted():
     assert response["data"]["deleted"] == True
 
 def test_is_enabled_returns_true_when_enabled():
-  with patch.object(requests, 'get', return_value=mock_funnel_is_enabled()):
+  with patch.object(requests.Session, 'get', return_value=mock_funnel_is_enabled()):
     client = configured_client()
     feature = build_feature_from_mocks()
     response = client.is_enabled(feature.key)
     assert response == True
 
 def test_is_enabled_returns_false_when_disabled():
-  with patch.object(requests, 'get', return_value=mock_funnel_is_disabled()):
+  with patch.object(requests.Session, 'get', return_value=mock_funnel_is_disabled()):
     client = configured_client()
     feature = build_feature_from_mocks()
     response = client.is_enabled(feature.key)
     assert response == False
 
 def test_enable_feature_returns_the_feature_enabled():
-  with patch.object(requests, 'get', return_value=mock_features_when_funnel()), patch.object(requests, 'patch', return_value=mock_enable_feature_funnel()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()), patch.object(requests.Session, 'patch', return_value=mock_enable_feature_funnel()):
     client = configured_client()
     feature = build_feature_from_mocks()
     response = client.enable_feature(feature.key)
@@ -86,7 +114,7 @@ def test_enable_feature_returns_the_feature_enabled():
     assert response["data"]["active"] == True
 
 def test_disable_feature_returns_the_feature_disabled():
-  with patch.object(requests, 'get', return_value=mock_features_when_funnel()), patch.object(requests, 'patch', return_value=mock_disable_feature_funnel()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()), patch.object(requests.Session, 'patch', return_value=mock_disable_feature_funnel()):
     client = configured_client()
     feature = build_feature_from_mocks()
     response = client.disable_feature(feature.key)
@@ -95,7 +123,7 @@ def test_disable_feature_returns_the_feature_disabled():
     assert response["data"]["active"] == False
 
 def test_enable_feature_raises_exception_when_not_found():
-  with patch.object(requests, 'get', return_value=mock_features_when_empty()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_empty()):
     client = configured_client()
     feature = build_feature_from_mocks()
     with pytest.raises(Exception) as e:
@@ -103,7 +131,7 @@ def test_enable_feature_raises_exception_when_not_found():
     assert str(e.value) == f"Feature {feature.key} not found"
 
 def test_disable_feature_raises_exception_when_not_found():
-  with patch.object(requests, 'get', return_value=mock_features_when_empty()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_empty()):
     client = configured_client()
     feature = build_feature_from_mocks()
     with pytest.raises(Exception) as e:
@@ -111,7 +139,7 @@ def test_disable_feature_raises_exception_when_not_found():
     assert str(e.value) == f"Feature {feature.key} not found"
 
 def test_is_enabled_raises_exception_when_not_found():
-  with patch.object(requests, 'get', return_value=mock_features_when_empty()):
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_empty()):
     client = configured_client()
     feature = build_feature_from_mocks()
     with pytest.raises(Exception) as e:
@@ -119,7 +147,7 @@ def test_is_enabled_raises_exception_when_not_found():
     assert str(e.value) == f"Feature {feature.key} not found"
 
 def test_raise_posthog_api_client_error_on_conncetion_errors():
-  with patch.object(requests, 'get', side_effect=requests.ConnectionError('Mocked error')):
+  with patch.object(requests.Session, 'get', side_effect=requests.ConnectionError('Mocked error')):
     try:
       client = configured_client()
       client.list_features()
@@ -128,9 +156,174 @@ def test_raise_posthog_api_client_error_on_conncetion_errors():
 
 def test_log_errors_on_posthog_connection():
   client = configured_client()
-  with patch.object(requests, 'get', side_effect=requests.ConnectionError('Mocked error')):
+  with patch.object(requests.Session, 'get', side_effect=requests.ConnectionError('Mocked error')):
     with patch.object(client.logger, 'error', side_effect=PosthogAPIClientError()) as mock_log:
       try:
         client.list_features()
       except PosthogAPIClientError as e:
         mock_log.assert_called_once()
+
+def test_iter_features_follows_next_links():
+  pages = [
+    mock_features_page(["a", "b"], next="https://app.posthog.com/api/projects/project_id/feature_flags?offset=2"),
+    mock_features_page(["c"]),
+  ]
+  with patch.object(requests.Session, 'get', side_effect=pages) as network_mock:
+    client = configured_client()
+    keys = [feature["key"] for feature in client.iter_features()]
+    assert keys == ["a", "b", "c"]
+    assert network_mock.call_args_list[1].args[0] == "https://app.posthog.com/api/projects/project_id/feature_flags?offset=2"
+
+def test_iter_features_is_lazy():
+  pages = [
+    mock_features_page(["a"], next="https://app.posthog.com/api/projects/project_id/feature_flags?offset=1"),
+    mock_features_page(["b"]),
+  ]
+  with patch.object(requests.Session, 'get', side_effect=pages) as network_mock:
+    client = configured_client()
+    features = client.iter_features()
+    assert next(features)["key"] == "a"
+    network_mock.assert_called_once()
+
+def test_iter_features_raises_on_error_status():
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_error_returned()):
+    client = configured_client()
+    with pytest.raises(PosthogAPIResponseError):
+      list(client.iter_features())
+
+def test_fetch_feature_finds_features_past_the_first_page():
+  pages = [
+    mock_features_page(["a"], next="https://app.posthog.com/api/projects/project_id/feature_flags?offset=1"),
+    mock_features_page(["funnel_test"]),
+  ]
+  with patch.object(requests.Session, 'get', side_effect=pages):
+    client = configured_client()
+    assert client.fetch_feature("funnel_test")["key"] == "funnel_test"
+
+def test_fetch_feature_stops_at_the_page_containing_the_key():
+  pages = [
+    mock_features_page(["funnel_test"], next="https://app.posthog.com/api/projects/project_id/feature_flags?offset=1"),
+    mock_features_page(["b"]),
+  ]
+  with patch.object(requests.Session, 'get', side_effect=pages) as network_mock:
+    client = configured_client()
+    assert client.fetch_feature("funnel_test")["key"] == "funnel_test"
+    network_mock.assert_called_once()
+
+def test_retries_rate_limited_requests_honoring_retry_after():
+  throttled = (429, {"Retry-After": "0"}, load_response('rate_limiting_error'), 0)
+  with ScriptedServer([throttled, throttled], default=(200, {}, load_response('get_features_when_funnel'), 0)) as server:
+    client = PosthogAPIClient(api_base=server.url, api_key="api_key", project_id="project_id", backoff_factor=0)
+    response = client.list_features()
+    assert response["data"][0]["key"] == "funnel_test"
+    assert len(server.requests) == 3
+
+def test_raises_rate_limit_error_when_retries_are_exhausted():
+  throttled = (429, {"Retry-After": "0"}, load_response('rate_limiting_error'), 0)
+  with ScriptedServer(default=throttled) as server:
+    client = PosthogAPIClient(api_base=server.url, api_key="api_key", project_id="project_id", max_retries=1, backoff_factor=0)
+    with pytest.raises(RateLimitError):
+      client.list_features()
+    assert len(server.requests) == 2
+
+def test_raises_posthog_api_client_error_on_read_timeout():
+  slow = (200, {}, load_response('get_features_when_empty'), 0.5)
+  with ScriptedServer(default=slow) as server:
+    client = PosthogAPIClient(api_base=server.url, api_key="api_key", project_id="project_id", read_timeout=0.05, max_retries=0)
+    with pytest.raises(PosthogAPIClientError):
+      client.list_features()
+
+def test_connection_stats_report_reused_connections():
+  with ScriptedServer() as server:
+    client = PosthogAPIClient(api_base=server.url, api_key="api_key", project_id="project_id")
+    for _ in range(3):
+      client.list_features()
+    assert client.connection_stats() == {"requests": 3, "connections": 1, "reused": 2}
+
+def test_mutations_use_ids_from_list_responses():
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()) as get_mock, patch.object(requests.Session, 'patch', return_value=mock_enable_feature_funnel()) as patch_mock:
+    client = configured_client()
+    client.list_features()
+    client.enable_feature("funnel_test")
+    client.disable_feature("funnel_test")
+    get_mock.assert_called_once()
+    assert patch_mock.call_count == 2
+    assert patch_mock.call_args.args[0] == "https://app.posthog.com/api/projects/project_id/feature_flags/31867"
+    assert client.index_stats()["requests_saved"] == 2
+
+def test_create_feature_indexes_the_created_id():
+  with patch.object(requests.Session, 'post', return_value=mock_add_feature_funnel()), patch.object(requests.Session, 'get') as get_mock, patch.object(requests.Session, 'patch', return_value=mock_enable_feature_funnel()):
+    client = configured_client()
+    client.create_feature("funnel_test", "This is a feature flag tests a conversion funnel")
+    client.enable_feature("funnel_test")
+    get_mock.assert_not_called()
+
+def test_delete_feature_drops_the_indexed_id():
+  with patch.object(requests.Session, 'get', return_value=mock_features_when_funnel()), patch.object(requests.Session, 'patch', return_value=mock_remove_feature_funnel()):
+    client = configured_client()
+    client.delete_feature("funnel_test")
+    assert client.index_stats()["size"] == 0
+
+def test_stale_ids_are_invalidated_on_not_found():
+  with patch.object(requests.Session, 'get', side_effect=[mock_features_when_funnel(), mock_features_when_empty()]), patch.object(requests.Session, 'patch', return_value=mock_not_found()) as patch_mock:
+    client = configured_client()
+    client.list_features()
+    with pytest.raises(FeatureNotFound):
+      client.enable_feature("funnel_test")
+    patch_mock.assert_called_once()
+    assert client.index_stats()["invalidations"] == 1
+    assert client.index_stats()["size"] == 0
+
+def test_stale_ids_are_re_resolved_and_retried():
+  moved = load_response('get_features_when_funnel')
+  moved["results"][0]["id"] = 40000
+  moved_response = Mock(status_code=200, json=Mock(return_value=moved))
+  with patch.object(requests.Session, 'get', side_effect=[mock_features_when_funnel(), moved_response]), patch.object(requests.Session, 'patch', side_effect=[mock_not_found(), mock_enable_feature_funnel()]) as patch_mock:
+    client = configured_client()
+    client.list_features()
+    response = client.enable_feature("funnel_test")
+    assert response["data"]["active"] == True
+    assert patch_mock.call_args.args[0].endswith("/feature_flags/40000")
+
+def test_stream_lists_decodes_pages_from_the_socket():
+  with FakePosthogServer(page_size=50) as server:
+    server.seed(120)
+    client = PosthogAPIClient(api_base=server.url, api_key="api_key", project_id="1", stream_lists=True)
+    features = list(client.iter_features())
+    assert [feature["key"] for feature in features] == [f"flag_{i}" for i in range(120)]
+    assert set(features[0]) == {"id", "key", "name", "active", "deleted", "filters", "updated_at"}
+    assert client.feature_id("flag_119") == features[119]["id"]
+    assert client.connection_stats()["connections"] == 1
+
+def test_stream_lists_reports_errors_without_streaming():
+  with FakePosthogServer(error_rate=1) as server:
+    client = PosthogAPIClient(api_base=server.url, api_key="api_key", project_id="1", stream_lists=True, max_retries=0)
+    assert client.list_features()["errors"][0]["status"] == 500
+
+def test_stream_lists_closes_not_modified_responses():
+  with FakePosthogServer() as server:
+    server.seed(3)
+    client = PosthogAPIClient(api_base=server.url, api_key="api_key", project_id="1", stream_lists=True)
+    client.list_features(conditional=True)
+    response = Mock(status_code=304)
+    with patch.object(client, "_get", return_value=response):
+      assert client.list_features(conditional=True)["not_modified"]
+    response.close.assert_called_once()
+
+def test_stream_lists_closes_responses_that_fail_to_decode():
+  client = PosthogAPIClient(api_key="api_key", project_id="1", stream_lists=True)
+  response = Mock(status_code=200)
+  response.iter_content.return_value = iter([b'{"count": 2, "results": [{"key": "a"},'])
+  with patch.object(client, "_get", return_value=response):
+    with pytest.raises(PosthogAPIClientError):
+      client.list_features()
+  response.close.assert_called_once()
+
+def test_stream_lists_reuses_the_connection_across_not_modified_pages():
+  with FakePosthogServer() as server:
+    server.seed(3)
+    client = PosthogAPIClient(api_base=server.url, api_key="api_key", project_id="1", stream_lists=True, pool_size=1)
+    for _ in range(20):
+      client.list_features(conditional=True)
+    assert client.conditional_stats()["not_modified"] == 19
+    assert client.connection_stats()["connections"] == 1
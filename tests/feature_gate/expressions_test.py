@@ -0,0 +1,61 @@
+import pytest
+from feature_gate import expressions
+
+def plan_is(plan):
+  return {"Equal": [{"Property": ["plan"]}, plan]}
+
+def age_over(age):
+  return {"GreaterThan": [{"Property": ["age"]}, age]}
+
+EXAMPLES = [
+  plan_is("basic"),
+  {"NotEqual": [{"Property": ["plan"]}, "basic"]},
+  age_over(21),
+  {"GreaterThanOrEqualTo": [{"Property": ["age"]}, 21]},
+  {"LessThan": [{"Property": ["age"]}, 21]},
+  {"LessThanOrEqualTo": [{"Property": ["age"]}, 21]},
+  {"Any": [plan_is("pro"), age_over(60)]},
+  {"All": [plan_is("basic"), age_over(18)]},
+  {"Equal": [{"Number": ["21"]}, {"Property": ["age"]}]},
+  {"Equal": [{"String": [{"Property": ["age"]}]}, "21"]},
+  {"Boolean": [{"Property": ["admin"]}]},
+  {"Property": [{"String": ["plan"]}]},
+]
+
+PROPERTIES = [
+  {},
+  {"plan": "basic", "age": 21},
+  {"plan": "pro", "age": 70, "admin": True},
+  {"plan": "basic", "age": "unknown"},
+]
+
+@pytest.mark.parametrize("expression", EXAMPLES)
+def test_compiled_expressions_agree_with_the_interpreter(expression):
+  compiled = expressions.compile(expression)
+  for properties in PROPERTIES:
+    assert compiled(properties) == expressions.evaluate(expression, properties)
+
+def test_compile_reuses_compiled_expressions():
+  assert expressions.compile(plan_is("basic")) is expressions.compile(plan_is("basic"))
+
+def test_comparisons_with_missing_properties_are_false():
+  assert not expressions.compile(age_over(21))({})
+
+def test_compile_rejects_unknown_operators():
+  with pytest.raises(expressions.InvalidExpression):
+    expressions.compile({"Unknown": [1]})
+
+def test_compile_rejects_wrong_arity():
+  with pytest.raises(expressions.InvalidExpression):
+    expressions.compile({"Equal": [1]})
+
+def test_add_wraps_expressions_in_any():
+  combined = expressions.add(plan_is("basic"), age_over(21))
+  assert combined == {"Any": [plan_is("basic"), age_over(21)]}
+  assert expressions.add(combined, plan_is("pro")) == {"Any": [plan_is("basic"), age_over(21), plan_is("pro")]}
+  assert expressions.add(None, plan_is("pro")) == plan_is("pro")
+
+def test_remove_drops_expressions_from_any():
+  combined = {"Any": [plan_is("basic"), age_over(21)]}
+  assert expressions.remove(combined, age_over(21)) == {"Any": [plan_is("basic")]}
+  assert expressions.remove(plan_is("basic"), plan_is("basic")) is None
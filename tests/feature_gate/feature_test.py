@@ -18,3 +18,30 @@ def test_key_returns_key_as_instantiated():
 def test_description_returns_description_as_instantiated():
   feature = feature_fixture()
   assert feature.description == "Enable phone sales funnel optimization"
+
+def test_feature_is_immutable():
+  feature = feature_fixture()
+  with pytest.raises(AttributeError):
+    feature.name = "Other"
+  with pytest.raises(AttributeError):
+    del feature.key
+
+def test_features_are_equal_and_hash_by_key():
+  feature = feature_fixture()
+  renamed = Feature("Other", "phone_sales", "Other description")
+  assert feature == renamed
+  assert len({feature, renamed}) == 1
+  assert feature != Feature("Phone Sales", "other", "")
+
+def test_key_is_interned():
+  key = "".join(["phone", "_", "sales"])
+  assert Feature("Phone Sales", key, "").key is feature_fixture().key
+
+def test_feature_pickles():
+  import pickle
+
+  feature = pickle.loads(pickle.dumps(feature_fixture()))
+  assert (feature.name, feature.key, feature.description) == ("Phone Sales", "phone_sales", "Enable phone sales funnel optimization")
+
+def test_feature_has_no_instance_dict():
+  assert not hasattr(feature_fixture(), "__dict__")
@@ -0,0 +1,84 @@
+import pickle
+import pytest
+
+from feature_gate import groups
+from feature_gate.actor import Actor
+from feature_gate.flag_state import FlagState
+
+def test_defaults_to_disabled():
+  state = FlagState("test_feature")
+  assert state.name == "test_feature"
+  assert not state.enabled
+  assert state.actors == frozenset()
+  assert not state.is_enabled("alice")
+
+def test_is_immutable():
+  state = FlagState("test_feature")
+  with pytest.raises(AttributeError):
+    state.enabled = True
+  with pytest.raises(AttributeError):
+    del state.key
+  assert not hasattr(state, "__dict__")
+
+def test_replace_returns_a_new_state():
+  state = FlagState("test_feature", "Test", "A test feature")
+  enabled = state.replace(enabled=True)
+  assert enabled.enabled
+  assert not state.enabled
+  assert (enabled.name, enabled.description) == ("Test", "A test feature")
+
+def test_replace_keeps_compiled_gates_that_did_not_change():
+  expression = {"Equal": [{"Property": ["plan"]}, "pro"]}
+  state = FlagState("test_feature", expression=expression)
+  assert state.replace(percentage=10).compiled_expression is state.compiled_expression
+  assert state.replace(expression=None).compiled_expression is None
+
+def test_states_without_groups_share_one_group_set():
+  assert FlagState("a").group_set is FlagState("b").group_set
+
+def test_with_actor_and_without_actor():
+  state = FlagState("test_feature")
+  for i in range(100):
+    state = state.with_actor(str(i))
+  assert state.actors == {str(i) for i in range(100)}
+  assert len(state.actor_layers) <= 7
+  assert state.is_enabled("42")
+  assert state.with_actor("42") is state
+  removed = state.without_actor("42")
+  assert not removed.is_enabled("42")
+  assert removed.is_enabled("43")
+  assert removed.without_actor("42") is removed
+
+def test_is_enabled_for_actors_matches_is_enabled():
+  groups.register("admins", lambda actor: actor.properties.get("admin", False))
+  try:
+    state = FlagState("test_feature", actors=["alice"], groups=["admins"], percentage=30)
+    state = state.with_actor("bob")
+    actors = [Actor(str(i), {"admin": i % 7 == 0}) for i in range(200)] + ["alice", "bob"]
+    assert state.is_enabled_for_actors(actors) == [state.is_enabled(actor) for actor in actors]
+  finally:
+    groups.unregister("admins")
+
+def test_disabled_clears_every_gate():
+  state = FlagState("test_feature", "Test", enabled=True, actors=["alice"], percentage=50).disabled()
+  assert (state.key, state.name) == ("test_feature", "Test")
+  assert not state.enabled
+  assert state.actors == frozenset()
+  assert state.percentage == 0
+
+def test_equal_and_hash_by_key():
+  state = FlagState("test_feature")
+  assert state == state.replace(enabled=True)
+  assert len({state, state.replace(enabled=True)}) == 1
+  assert state != FlagState("other")
+
+def test_key_is_interned():
+  key = "".join(["test", "_", "feature"])
+  assert FlagState(key).key is FlagState("test_feature").key
+
+def test_round_trips_through_records_and_pickle():
+  state = FlagState("test_feature", "Test", "", enabled=True, actors=["b", "a"], percentage=12.5)
+  record = state.to_record()
+  assert record["gates"]["actors"] == ["a", "b"]
+  for copy in (FlagState.from_record(record), pickle.loads(pickle.dumps(state))):
+    assert copy.to_record() == record
@@ -0,0 +1,52 @@
+import pytest
+from feature_gate import groups
+from feature_gate.actor import Actor
+
+@pytest.fixture(autouse=True)
+def registered_groups():
+  groups.register("admins", lambda actor: actor.properties.get("admin", False))
+  groups.register("staff", lambda actor: actor.properties.get("staff", False))
+  yield
+  groups.unregister("admins")
+  groups.unregister("staff")
+
+def test_register_makes_a_group_available():
+  assert groups.is_registered("admins")
+  assert "staff" in groups.registered()
+
+def test_check_registered_raises_for_unknown_groups():
+  with pytest.raises(groups.GroupNotRegistered):
+    groups.check_registered("unknown")
+
+def test_group_set_matches_any_of_its_groups():
+  group_set = groups.GroupSet(["admins", "staff"])
+  assert group_set(Actor("a", {"admin": True}))
+  assert group_set(Actor("b", {"staff": True}))
+  assert not group_set(Actor("c"))
+
+def test_empty_group_set_matches_nobody():
+  group_set = groups.GroupSet()
+  assert not group_set
+  assert not group_set(Actor("a", {"admin": True}))
+
+def test_group_set_compiles_predicates_once():
+  calls = []
+  groups.register("counted", lambda actor: calls.append(actor) or True)
+  try:
+    group_set = groups.GroupSet(["counted"])
+    group_set(Actor("a"))
+    compiled = group_set._match
+    group_set(Actor("b"))
+    assert group_set._match is compiled
+    assert len(calls) == 2
+  finally:
+    groups.unregister("counted")
+
+def test_group_set_picks_up_registry_changes():
+  group_set = groups.GroupSet(["late"])
+  assert not group_set(Actor("a"))
+  groups.register("late", lambda actor: True)
+  try:
+    assert group_set(Actor("a"))
+  finally:
+    groups.unregister("late")
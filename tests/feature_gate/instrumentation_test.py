@@ -0,0 +1,60 @@
+import pytest
+
+from feature_gate.instrumentation import Metrics
+
+def test_counts_evaluations_and_true_ratio():
+  metrics = Metrics()
+  for result in [True, True, False, True]:
+    metrics("evaluation", {"feature": "funnel", "result": result})
+  assert metrics.evaluations("funnel") == {"count": 4, "true_ratio": 0.75}
+  assert metrics.evaluations("other") == {"count": 0, "true_ratio": None}
+
+def test_observes_latency_in_buckets():
+  metrics = Metrics(buckets=[0.001, 0.01])
+  for duration in [0.0005, 0.005, 0.05]:
+    metrics("adapter_call", {"operation": "is_enabled", "duration": duration})
+  histogram = metrics.histogram("feature_gate_adapter_duration_seconds", operation="is_enabled")
+  assert histogram["buckets"] == {0.001: 1, 0.01: 1}
+  assert histogram["count"] == 3
+  assert histogram["sum"] == pytest.approx(0.0555)
+
+def test_counts_http_requests_by_status():
+  metrics = Metrics()
+  metrics("http_request", {"method": "GET", "status": 200, "duration": 0.1})
+  metrics("http_request", {"method": "GET", "status": 429, "duration": 0.1})
+  metrics("http_request", {"method": "GET", "status": 200, "duration": 0.1})
+  assert metrics.counter("feature_gate_http_requests_total", method="GET", status="200") == 2
+  assert metrics.histogram("feature_gate_http_request_duration_seconds", method="GET")["count"] == 3
+
+def test_cache_hit_rate_counts_stale_reads_as_hits():
+  metrics = Metrics()
+  assert metrics.cache_hit_rate() is None
+  for result in ["miss", "hit", "hit", "stale"]:
+    metrics("cache", {"result": result})
+  assert metrics.cache_hit_rate() == 0.75
+
+def test_ignores_unknown_events():
+  metrics = Metrics()
+  metrics("something_else", {})
+  assert metrics.prometheus() == "\n"
+
+def test_reset_clears_everything():
+  metrics = Metrics()
+  metrics("cache", {"result": "hit"})
+  metrics.reset()
+  assert metrics.cache_hit_rate() is None
+
+def test_exports_prometheus_text():
+  metrics = Metrics(buckets=[0.001, 0.01])
+  metrics("evaluation", {"feature": 'say "hi"', "result": True})
+  metrics("adapter_call", {"operation": "is_enabled", "duration": 0.005})
+  assert metrics.prometheus().splitlines() == [
+    '# TYPE feature_gate_evaluations_total counter',
+    'feature_gate_evaluations_total{feature="say \\"hi\\"",result="true"} 1',
+    '# TYPE feature_gate_adapter_duration_seconds histogram',
+    'feature_gate_adapter_duration_seconds_bucket{operation="is_enabled",le="0.001"} 0',
+    'feature_gate_adapter_duration_seconds_bucket{operation="is_enabled",le="0.01"} 1',
+    'feature_gate_adapter_duration_seconds_bucket{operation="is_enabled",le="+Inf"} 1',
+    'feature_gate_adapter_duration_seconds_sum{operation="is_enabled"} 0.005',
+    'feature_gate_adapter_duration_seconds_count{operation="is_enabled"} 1',
+  ]
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+
+import pytest
+
+from feature_gate import log
+from feature_gate.adapters.memory import MemoryAdapter
+from feature_gate.clients.posthog_api_client import PosthogAPIClient
+
+@pytest.fixture(autouse=True)
+def reset_logging():
+  yield
+  log.shutdown()
+  log._logger = None
+  logging.getLogger(log.LOGGER_NAME).setLevel(logging.NOTSET)
+
+def test_construction_does_no_filesystem_io(tmp_path, monkeypatch):
+  monkeypatch.chdir(tmp_path)
+  MemoryAdapter()
+  PosthogAPIClient(api_key="key", project_id="1")
+  assert os.listdir(tmp_path) == []
+
+def test_construction_does_not_reconfigure_logging():
+  logger = log.configure("null")
+  adapter = MemoryAdapter()
+  assert log.get_logger() is logger
+  assert adapter.logger is not logger
+
+def test_null_mode_drops_everything():
+  logger = log.configure("null")
+  assert logger.info("dropped") is None
+  assert not logger.is_enabled_for(logging.ERROR)
+
+def test_stdlib_mode_routes_through_the_feature_gate_logger(caplog):
+  caplog.set_level(logging.INFO, logger=log.LOGGER_NAME)
+  log.configure("stdlib")
+  MemoryAdapter().logger.info("hello", flag="x")
+  entry = json.loads(caplog.records[-1].getMessage())
+  assert entry["event"] == "hello"
+  assert entry["klass"] == "MemoryAdapter"
+  assert entry["flag"] == "x"
+
+def test_stdlib_mode_follows_the_stdlib_level():
+  logging.getLogger(log.LOGGER_NAME).setLevel(logging.WARNING)
+  logger = log.configure("stdlib")
+  assert not logger.is_enabled_for(logging.INFO)
+
+def test_stdlib_mode_follows_levels_set_after_configuring(caplog):
+  logging.getLogger(log.LOGGER_NAME).setLevel(logging.WARNING)
+  logger = MemoryAdapter().logger
+  logger.debug("dropped")
+  caplog.set_level(logging.DEBUG, logger=log.LOGGER_NAME)
+  assert logger.is_enabled_for(logging.DEBUG)
+  logger.debug("kept")
+  assert [json.loads(record.getMessage())["event"] for record in caplog.records] == ["kept"]
+
+def test_queue_mode_writes_on_a_listener_thread(tmp_path):
+  path = tmp_path.joinpath("logs", "feature_gate.log")
+  log.configure("queue", path=path)
+  assert not path.exists()
+  log.get_logger().info("queued", flag="x")
+  log.shutdown()
+  entry = json.loads(path.read_text().splitlines()[-1])
+  assert entry["event"] == "queued"
+
+def test_injected_logger_is_used():
+  logger = log.configure("null")
+  client = PosthogAPIClient(api_key="key", project_id="1", logger=logger)
+  assert client.logger._context == {"klass": "PosthogAPIClient", "project_id": "1"}
+
+class FakeClock:
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+def test_sampler_keeps_one_in_every_n():
+  sampler = log.Sampler(every=3)
+  assert [sampler("flag") for _ in range(6)] == [False, False, True, False, False, True]
+
+def test_sampler_keeps_the_first_k_per_key_per_interval():
+  clock = FakeClock()
+  sampler = log.Sampler(first=2, interval=60, clock=clock)
+  assert [sampler("a") for _ in range(3)] == [True, True, False]
+  assert sampler("b")
+  clock.now = 60
+  assert sampler("a")
+
+def test_unknown_mode_raises():
+  with pytest.raises(ValueError):
+    log.configure("syslog")
@@ -0,0 +1,58 @@
+import hashlib
+import pytest
+from feature_gate import rollout
+from feature_gate.adapters import posthog_evaluation
+
+def test_bucket_is_a_digest_of_feature_key_and_actor_id():
+  digest = hashlib.blake2b(b"search.user_1", digest_size=8).digest()
+  assert rollout.bucket("search", "user_1") == int.from_bytes(digest, "big") % 100_000
+
+def test_bucket_separates_feature_key_from_actor_id():
+  assert rollout.bucket("ab", "1") != rollout.bucket("a", "b1")
+
+def test_rollouts_on_different_flags_are_independent():
+  actor_ids = range(100_000)
+  search = rollout.enabled_actors("search", 10, actor_ids)
+  checkout = rollout.enabled_actors("checkout", 10, actor_ids)
+  overlap = sum(a and b for a, b in zip(search, checkout))
+  assert 900 < overlap < 1_100
+
+def test_is_actor_enabled_is_deterministic():
+  first = [rollout.is_actor_enabled("search", 50, f"user_{i}") for i in range(100)]
+  second = [rollout.is_actor_enabled("search", 50, f"user_{i}") for i in range(100)]
+  assert first == second
+
+def test_raising_the_percentage_keeps_enabled_actors_enabled():
+  actor_ids = [f"user_{i}" for i in range(2_000)]
+  previous = set()
+  for percentage in [0, 1, 5, 12.5, 33, 50, 99.999, 100]:
+    enabled = {actor_id for actor_id in actor_ids if rollout.is_actor_enabled("search", percentage, actor_id)}
+    assert previous <= enabled
+    previous = enabled
+  assert previous == set(actor_ids)
+
+def test_percentage_enables_roughly_that_share_of_actors():
+  actor_ids = range(20_000)
+  enabled = sum(rollout.enabled_actors("search", 25, actor_ids))
+  assert 4_500 < enabled < 5_500
+
+def test_enabled_actors_matches_is_actor_enabled():
+  actor_ids = list(range(1_000)) + ["alice", "bob"]
+  expected = [rollout.is_actor_enabled("search", 42.5, actor_id) for actor_id in actor_ids]
+  assert rollout.enabled_actors("search", 42.5, actor_ids) == expected
+
+def test_enabled_actors_short_circuits_at_the_bounds():
+  assert rollout.enabled_actors("search", 0, ["a", "b"]) == [False, False]
+  assert rollout.enabled_actors("search", 100, ["a", "b"]) == [True, True]
+
+def test_validate_percentage_rejects_out_of_range_values():
+  with pytest.raises(ValueError):
+    rollout.validate_percentage(101)
+  with pytest.raises(ValueError):
+    rollout.validate_percentage(-1)
+
+def test_by_name_finds_each_rollout():
+  assert rollout.by_name("feature_gate") is rollout
+  assert rollout.by_name("posthog") is posthog_evaluation.ROLLOUT
+  with pytest.raises(ValueError):
+    rollout.by_name("unknown")
@@ -0,0 +1,105 @@
+import pytest
+import requests
+
+from feature_gate.adapters.posthog import PosthogAdapter
+from feature_gate.clients.posthog_api_client import PosthogAPIClient, RateLimitError
+from feature_gate.feature import Feature
+from feature_gate.testing.fake_posthog import FakePosthogServer
+
+class FakeClock:
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+def build_client(server, **options):
+  return PosthogAPIClient(api_base=server.url, api_key="api_key", project_id="1", max_retries=0, **options)
+
+def test_client_pages_through_every_flag():
+  with FakePosthogServer(page_size=10) as server:
+    server.seed(25)
+    client = build_client(server)
+    assert [flag["key"] for flag in client.iter_features()] == [f"flag_{i}" for i in range(25)]
+    assert server.stats()["methods"] == {"GET": 3}
+
+def test_adapter_round_trips_writes():
+  with FakePosthogServer() as server:
+    adapter = PosthogAdapter(client=build_client(server))
+    adapter.add(Feature("funnel", "funnel", "A funnel"))
+    assert not adapter.is_enabled("funnel")
+    adapter.enable("funnel")
+    assert adapter.is_enabled("funnel")
+    adapter.remove("funnel")
+    assert adapter.features() == []
+
+def test_creating_a_duplicate_key_is_rejected():
+  with FakePosthogServer() as server:
+    server.seed(1)
+    response = build_client(server).create_feature("flag_0", "Flag")
+    assert response["errors"][0]["status"] == 400
+
+def test_rate_limit_answers_429_with_retry_after():
+  clock = FakeClock()
+  with FakePosthogServer(rate_limit=2, clock=clock) as server:
+    client = build_client(server)
+    client.list_features()
+    client.list_features()
+    response = requests.get(f"{server.url}/api/projects/1/feature_flags")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    with pytest.raises(RateLimitError):
+      client.list_features()
+    clock.now = 1
+    assert "data" in client.list_features()
+
+def test_error_rate_injects_server_errors():
+  with FakePosthogServer(error_rate=1) as server:
+    response = build_client(server).list_features()
+    assert response["errors"][0]["status"] == 500
+    assert server.stats()["statuses"] == {500: 1}
+
+def test_client_retries_injected_errors():
+  with FakePosthogServer(error_rate=0.5, seed=1) as server:
+    server.seed(1)
+    client = PosthogAPIClient(api_base=server.url, api_key="api_key", project_id="1", max_retries=10, backoff_factor=0)
+    for _ in range(5):
+      assert client.list_features()["data"][0]["key"] == "flag_0"
+    assert server.stats()["statuses"][500] > 0
+
+def test_latency_is_added_to_each_request():
+  with FakePosthogServer(latency=0.05) as server:
+    response = requests.get(f"{server.url}/api/projects/1/feature_flags")
+    assert response.elapsed.total_seconds() >= 0.05
+
+def test_unchanged_pages_answer_304():
+  with FakePosthogServer() as server:
+    server.seed(3)
+    client = build_client(server)
+    first = client.list_features(conditional=True)
+    second = client.list_features(conditional=True)
+    assert second["not_modified"]
+    assert second["data"] == first["data"]
+    assert server.stats()["statuses"] == {200: 1, 304: 1}
+    client.enable_feature("flag_1")
+    assert not client.list_features(conditional=True).get("not_modified")
+
+def test_lists_flags_updated_since_with_tombstones():
+  with FakePosthogServer(incremental_params=True) as server:
+    server.seed(3)
+    client = build_client(server)
+    updated_at = max(flag["updated_at"] for flag in client.iter_features())
+    client.enable_feature("flag_1")
+    client.delete_feature("flag_2")
+    changed = {flag["key"]: flag["deleted"] for flag in client.iter_features_updated_since(updated_at)}
+    assert changed == {"flag_1": False, "flag_2": True}
+    assert client.count_features() == 2
+
+def test_ignores_incremental_params_like_posthog():
+  with FakePosthogServer() as server:
+    server.seed(3)
+    client = build_client(server)
+    updated_at = max(flag["updated_at"] for flag in client.iter_features())
+    client.delete_feature("flag_2")
+    listed = [flag["key"] for flag in client.iter_features_updated_since(updated_at)]
+    assert listed == ["flag_0", "flag_1"]
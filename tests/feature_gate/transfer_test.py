@@ -0,0 +1,118 @@
+import io
+import json
+import pytest
+
+from feature_gate import transfer
+from feature_gate.adapters.memory import MemoryAdapter
+from feature_gate.client import Client
+from feature_gate.clients.posthog_api_client import RateLimitError
+from feature_gate.feature import Feature
+from unittest.mock import patch
+
+def populated_client():
+  client = Client(MemoryAdapter())
+  client.add(Feature("Search", "search", "New search"))
+  client.add(Feature("Checkout", "checkout", "New checkout"))
+  client.enable("search")
+  client.enable_actor("checkout", "alice")
+  client.enable_percentage_of_actors("checkout", 25)
+  client.enable_expression("checkout", {"Equal": [{"Property": ["plan"]}, "pro"]})
+  return client
+
+def exported(client):
+  fp = io.StringIO()
+  client.do_export(fp)
+  fp.seek(0)
+  return fp
+
+def test_export_writes_a_header_and_one_line_per_feature():
+  lines = exported(populated_client()).read().splitlines()
+  assert json.loads(lines[0]) == {"format": "feature_gate", "version": 1}
+  assert [json.loads(line)["key"] for line in lines[1:]] == ["search", "checkout"]
+
+def test_import_round_trips_every_gate():
+  source = populated_client()
+  target = Client(MemoryAdapter())
+  summary = target.do_import(exported(source), max_workers=1)
+  assert summary["added"] == 2
+  assert list(transfer.records(target.adapter)) == list(transfer.records(source.adapter))
+  assert target.is_enabled("checkout", "alice")
+
+def test_import_skips_unchanged_features():
+  source = populated_client()
+  target = Client(MemoryAdapter())
+  target.do_import(exported(source))
+  with patch.object(MemoryAdapter, "enable") as mock_enable, patch.object(MemoryAdapter, "add") as mock_add:
+    summary = target.do_import(exported(source))
+    mock_enable.assert_not_called()
+    mock_add.assert_not_called()
+  assert summary == {"added": 0, "updated": 0, "unchanged": 2, "removed": 0, "writes": 0}
+
+def test_import_only_writes_the_gates_that_changed():
+  source = populated_client()
+  target = Client(MemoryAdapter())
+  target.do_import(exported(source))
+  source.disable_actor("checkout", "alice")
+  summary = target.do_import(exported(source))
+  assert summary["updated"] == 1
+  assert summary["writes"] == 1
+  assert not target.is_enabled("checkout", "alice")
+
+def test_import_of_a_disabled_flag_keeps_its_other_gates():
+  source = Client(MemoryAdapter())
+  source.add(Feature("Search", "search", "New search"))
+  source.enable_actor("search", "a")
+  source.enable_percentage_of_actors("search", 25)
+  target = Client(MemoryAdapter())
+  target.do_import(exported(source))
+  target.enable("search")
+  target.do_import(exported(source))
+  assert not target.is_enabled("search")
+  assert target.is_enabled("search", "a")
+  assert list(transfer.records(target.adapter)) == list(transfer.records(source.adapter))
+
+def test_import_with_prune_removes_features_missing_from_the_export():
+  source = populated_client()
+  target = Client(MemoryAdapter())
+  target.add(Feature("Old", "old", "Old flag"))
+  summary = target.do_import(exported(source), prune=True)
+  assert summary["removed"] == 1
+  assert target.features() == ["search", "checkout"]
+
+def test_load_reads_lazily():
+  fp = io.StringIO('{"format": "feature_gate", "version": 1}\n{"key": "a"}\nnot json\n')
+  entries = transfer.load(fp)
+  assert next(entries)["key"] == "a"
+
+def test_load_rejects_unknown_formats():
+  with pytest.raises(transfer.InvalidExport):
+    list(transfer.load(io.StringIO('{"format": "other", "version": 1}\n')))
+
+def test_records_fall_back_to_evaluate_all():
+  class BooleanOnlyAdapter:
+    def evaluate_all(self):
+      return {"a": True}
+  assert list(transfer.records(BooleanOnlyAdapter())) == [transfer.record("a", boolean=True)]
+
+def test_apply_retries_rate_limited_writes():
+  adapter = MemoryAdapter()
+  calls = []
+  original_add = adapter.add
+  def flaky_add(feature):
+    calls.append(feature.key)
+    if len(calls) == 1:
+      raise RateLimitError("Request was throttled. Expected available in 0 seconds.")
+    return original_add(feature)
+  adapter.add = flaky_add
+  summary = transfer.apply(adapter, [transfer.record("a")], max_workers=1)
+  assert summary["added"] == 1
+  assert calls == ["a", "a"]
+  assert adapter.features() == ["a"]
+
+def test_apply_gives_up_after_the_retry_limit():
+  adapter = MemoryAdapter()
+  def throttled_add(feature):
+    raise RateLimitError("Request was throttled. Expected available in 0 seconds.")
+  adapter.add = throttled_add
+  with pytest.raises(RateLimitError):
+    transfer.apply(adapter, [transfer.record("a")], max_workers=2, retries=1)
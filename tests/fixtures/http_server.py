@@ -0,0 +1,59 @@
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+
+  def do_GET(self):
+    self._respond()
+
+  def do_PATCH(self):
+    self.rfile.read(int(self.headers.get("Content-Length", 0)))
+    self._respond()
+
+  def _respond(self):
+    self.server.requests.append(self.path)
+    status, headers, body, delay = self.server.script.pop(0) if self.server.script else self.server.default
+    if delay:
+      time.sleep(delay)
+    payload = json.dumps(body).encode()
+    self.send_response(status)
+    for name, value in headers.items():
+      self.send_header(name, value)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(payload)))
+    self.end_headers()
+    self.wfile.write(payload)
+
+  def log_message(self, format, *args):
+    pass
+
+class ScriptedServer:
+  def __init__(self, script=None, default=None):
+    self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    self.httpd.daemon_threads = True
+    self.httpd.handle_error = lambda request, client_address: None
+    self.httpd.script = list(script or [])
+    self.httpd.default = default or (200, {}, {"count": 0, "next": None, "previous": None, "results": []}, 0)
+    self.httpd.requests = []
+    self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+
+  @property
+  def url(self):
+    host, port = self.httpd.server_address
+    return f"http://{host}:{port}"
+
+  @property
+  def requests(self):
+    return self.httpd.requests
+
+  def __enter__(self):
+    self.thread.start()
+    return self
+
+  def __exit__(self, *exc):
+    self.httpd.shutdown()
+    self.httpd.server_close()
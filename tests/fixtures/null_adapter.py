@@ -14,7 +14,7 @@ class NullAdapter:
   def features(self):
     pass
 
-  def is_enabled(self, feature_key):
+  def is_enabled(self, feature_key, actor=None):
     pass
 
   def enable(self, feature_key):
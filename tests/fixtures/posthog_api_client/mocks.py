@@ -97,3 +97,43 @@ def mock_rate_limiting_error():
       return_value=load_response('rate_limiting_error')
     )
   )
+
+def mock_features_page(keys, next=None):
+  return Mock(
+    status_code=200,
+    json=Mock(
+      return_value={
+        "count": len(keys),
+        "next": next,
+        "previous": None,
+        "results": [{"id": i, "key": key, "name": key, "active": False, "deleted": False} for i, key in enumerate(keys)]
+      }
+    )
+  )
+
+def mock_not_found():
+  return Mock(
+    status_code=404,
+    json=Mock(
+      return_value={"type": "invalid_request", "code": "not_found", "detail": "Not found.", "attr": None}
+    )
+  )
+
+def mock_flag_with_filters(filters, key="funnel_test", active=True):
+  return Mock(
+    status_code=200,
+    json=Mock(
+      return_value={
+        "count": 1,
+        "next": None,
+        "previous": None,
+        "results": [{"id": 1, "key": key, "name": key, "active": active, "deleted": False, "filters": filters}]
+      }
+    )
+  )
+
+def mock_decide(feature_flags):
+  return Mock(
+    status_code=200,
+    json=Mock(return_value={"featureFlags": feature_flags})
+  )